@@ -2,7 +2,14 @@ import discord
 from discord.ext import commands
 import os
 from dotenv import load_dotenv
+from utils.constants import BACKEND_SQLITE
 from utils.data_manager import DataManager
+from utils.async_data_manager import AsyncDataManager
+from utils.sqlite_manager import SQLiteDataManager
+from utils.verification_scheduler import VerificationScheduler
+from utils.code_analyzer import CodeAnalyzer
+from utils.auto_xp import AutoXPCalculator
+from utils.ai_verifier import AIVerifier
 from utils.logger import setup_logging, get_logger
 import traceback
 import asyncio
@@ -23,8 +30,18 @@ intents.guilds = True
 bot = commands.Bot(command_prefix='!', intents=intents)
 
 # Initialize data manager
-data_manager = DataManager()
-bot.data_manager = data_manager
+if os.getenv('DATA_BACKEND', '').lower() == BACKEND_SQLITE:
+    data_manager = SQLiteDataManager()
+else:
+    data_manager = DataManager()
+# Cogs use the awaitable facade so disk I/O never runs on the event loop
+bot.data_manager = AsyncDataManager(data_manager)
+# One queue for every guild's AI reviews, so the Gemini quota is shared fairly
+bot.verification_scheduler = VerificationScheduler()
+# Stateless services shared by every ticket
+bot.code_analyzer = CodeAnalyzer()
+bot.xp_calculator = AutoXPCalculator()
+bot.ai_verifier = AIVerifier()
 
 @bot.event
 async def on_ready():
@@ -39,6 +56,12 @@ async def on_ready():
 
     logger.info('='*50)
 
+    # on_ready fires again after reconnects; the cache is already warm then
+    if not getattr(bot, 'warmed_up', False):
+        logger.info('🔥 Warming up guild data...')
+        await bot.data_manager.warm_up([guild.id for guild in bot.guilds])
+        bot.warmed_up = True
+
     # Wait a bit for all cogs to fully load
     await asyncio.sleep(2)
 
@@ -79,6 +102,7 @@ async def on_ready():
 @bot.event
 async def on_guild_join(guild):
     logger.info(f'✅ Joined new server: {guild.name} (ID: {guild.id}, Members: {guild.member_count})')
+    await bot.data_manager.warm_up([guild.id])
 
 async def load_cogs():
     """Load all cog extensions"""
@@ -107,7 +131,12 @@ async def main():
     logger.info('🚀 Starting TALAIT_BOT...')
     async with bot:
         await load_cogs()
-        await bot.start(os.getenv('DISCORD_TOKEN'))
+        try:
+            await bot.start(os.getenv('DISCORD_TOKEN'))
+        finally:
+            await bot.verification_scheduler.close()
+            # Persist anything still held in the DataManager cache
+            await bot.data_manager.close()
 
 if __name__ == '__main__':
     import asyncio
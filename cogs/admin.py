@@ -2,8 +2,9 @@ import discord
 from discord.ext import commands, tasks
 from discord import app_commands
 from datetime import datetime
-from utils.constants import ALLOWED_ROLES
+from utils.constants import ALLOWED_ROLES, LEDGER_COMPACT_MINUTES, AI_STATS_MINUTES
 from utils.logger import get_logger
+from utils.monthly_reset import MonthlyResetJob, next_month_start, month_key_before
 
 logger = get_logger("cogs.admin")
 
@@ -11,11 +12,17 @@ class Admin(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.data_manager = bot.data_manager
+        self.reset_job = MonthlyResetJob(self.data_manager)
         self.monthly_reset.start()
+        self.ledger_compaction.start()
+        self._verification_seen = (0, 0)
+        self.verification_stats.start()
         logger.info("Admin cog initialized")
 
     def cog_unload(self):
         self.monthly_reset.cancel()
+        self.ledger_compaction.cancel()
+        self.verification_stats.cancel()
         logger.info("Admin cog unloaded")
 
     @app_commands.command(name='removexp', description='Remove XP from a user')
@@ -26,14 +33,14 @@ class Admin(commands.Cog):
             await interaction.response.send_message('❌ Only trainers can use this!', ephemeral=True)
             return
 
-        user_data = self.data_manager.get_user(interaction.guild.id, user.id)
+        user_data = await self.data_manager.get_user(interaction.guild.id, user.id)
 
         if not user_data:
             await interaction.response.send_message('❌ User not found!', ephemeral=True)
             return
 
-        self.data_manager.remove_xp(interaction.guild.id, user.id, amount)
-        updated_data = self.data_manager.get_user(interaction.guild.id, user.id)
+        await self.data_manager.remove_xp(interaction.guild.id, user.id, amount)
+        updated_data = await self.data_manager.get_user(interaction.guild.id, user.id)
 
         logger.info(f"/removexp | Removed {amount} XP from {user.name} | By: {interaction.user.name} | New XP: {updated_data['xp']} | Guild: {interaction.guild.name}")
         await interaction.response.send_message(f'✅ Removed {amount} XP from {user.mention}. Current XP: {updated_data["xp"]}')
@@ -46,46 +53,79 @@ class Admin(commands.Cog):
             return
 
         month_key = self.data_manager.get_month_key()
-        self.data_manager.reset_monthly_leaderboard(interaction.guild.id)
+        await self.data_manager.reset_monthly_leaderboard(interaction.guild.id)
 
         logger.info(f"/resetmonth | Manual reset executed | By: {interaction.user.name} | Month: {month_key} | Guild: {interaction.guild.name}")
         await interaction.response.send_message(f'✅ Monthly leaderboard reset! Data saved to Hall of Fame for {month_key}')
 
     @app_commands.command(name='listusers', description='List all users in the leaderboard')
-    async def list_users(self, interaction: discord.Interaction):
+    @app_commands.describe(page='Page number (25 users per page, optional)')
+    async def list_users(self, interaction: discord.Interaction, page: int = 1):
         if not any(role.name.lower() in ALLOWED_ROLES for role in interaction.user.roles):
             await interaction.response.send_message('❌ Trainers only!', ephemeral=True)
             return
         
-        leaderboard = self.data_manager.get_leaderboard(interaction.guild.id)
+        total_users = await self.data_manager.get_user_count(interaction.guild.id)
         
-        if not leaderboard:
+        if not total_users:
             await interaction.response.send_message('❌ No users!', ephemeral=True)
             return
         
-        sorted_users = sorted(leaderboard.items(), key=lambda x: x[1]['xp'], reverse=True)
+        # Discord embeds hold at most 25 fields
+        page_size = 25
+        total_pages = (total_users + page_size - 1) // page_size
+        page = min(max(page, 1), total_pages)
+        offset = (page - 1) * page_size
+        page_users = await self.data_manager.get_top_users(interaction.guild.id, page_size, offset)
         
-        embed = discord.Embed(title=f'👥 All Users in {interaction.guild.name}', description=f'Total users: {len(sorted_users)}', color=discord.Color.blue())
+        embed = discord.Embed(title=f'👥 All Users in {interaction.guild.name}', description=f'Total users: {total_users}', color=discord.Color.blue())
         
-        for idx, (user_id, data) in enumerate(sorted_users[:25], 1):
+        for idx, (user_id, data) in enumerate(page_users, offset + 1):
             embed.add_field(name=f"{idx}. {data['username']}", value=f"{data['xp']} XP", inline=True)
         
+        embed.set_footer(text=f'Page {page}/{total_pages}')
+        
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
-    @tasks.loop(hours=24)
+    @tasks.loop()
     async def monthly_reset(self):
-        now = datetime.now()
+        # Sleep until the month boundary, then archive the month that just ended
+        boundary = next_month_start(datetime.now())
+        logger.info(f"Next automatic monthly reset | At: {boundary.isoformat()}")
+        await discord.utils.sleep_until(boundary)
 
-        if now.day == 1 and now.hour == 0:
-            logger.info("Automatic monthly reset task triggered")
-            for guild in self.bot.guilds:
-                month_key = self.data_manager.get_month_key()
-                self.data_manager.reset_monthly_leaderboard(guild.id)
-                logger.info(f'✅ Monthly reset completed | Guild: {guild.name} | Month: {month_key}')
+        logger.info("Automatic monthly reset task triggered")
+        await self.reset_job.run(month_key_before(boundary), [guild.id for guild in self.bot.guilds])
 
     @monthly_reset.before_loop
     async def before_monthly_reset(self):
         await self.bot.wait_until_ready()
+        await self.reset_job.resume([guild.id for guild in self.bot.guilds])
+
+    @tasks.loop(minutes=LEDGER_COMPACT_MINUTES)
+    async def ledger_compaction(self):
+        compacted = await self.data_manager.compact_ledgers()
+        if compacted:
+            logger.debug(f"XP ledger compaction | Guilds compacted: {compacted}")
+
+    @ledger_compaction.before_loop
+    async def before_ledger_compaction(self):
+        await self.bot.wait_until_ready()
+
+    @tasks.loop(minutes=AI_STATS_MINUTES)
+    async def verification_stats(self):
+        scheduler = self.bot.verification_scheduler
+        # Quiet periods are not logged: only when jobs arrived or are still queued/running
+        stats = scheduler.get_stats()
+        seen = (stats['submitted'], stats['rejected'])
+        if seen == self._verification_seen and not (stats['queue_depth'] or stats['running']):
+            return
+        self._verification_seen = seen
+        scheduler.log_stats()
+
+    @verification_stats.before_loop
+    async def before_verification_stats(self):
+        await self.bot.wait_until_ready()
 
 async def setup(bot):
     await bot.add_cog(Admin(bot))
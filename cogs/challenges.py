@@ -94,11 +94,10 @@ class Challenges(commands.Cog):
             'posted_at': datetime.now().isoformat(),
             'close_time': close_time.isoformat(),
             'duration_minutes': duration,
-            'status': 'active',
-            'submissions': []
+            'status': 'active'
         }
 
-        challenge_id = self.data_manager.create_challenge(interaction.guild.id, challenge_data)
+        challenge_id = await self.data_manager.create_challenge(interaction.guild.id, challenge_data)
 
         logger.info(f"/postchallenge | ID: {challenge_id} | Title: {title} | Difficulty: {difficulty.value} | Duration: {duration}min | Language: {lang_info['name']} | By: {interaction.user.name} | Guild: {interaction.guild.name}")
 
@@ -188,15 +187,15 @@ class Challenges(commands.Cog):
             await asyncio.sleep(duration_minutes * 60)
 
             # Get challenge data
-            challenge = self.data_manager.get_challenge_by_id(guild.id, challenge_id)
+            challenge = await self.data_manager.get_challenge_by_id(guild.id, challenge_id)
 
             if not challenge or challenge['status'] != 'active':
                 logger.debug(f'Auto-close skipped (already closed or not found) | Challenge ID: {challenge_id} | Guild: {guild.name}')
                 return
 
             # Close the challenge
-            self.data_manager.update_challenge(guild.id, challenge_id, {'status': 'closed'})
-            logger.info(f'✅ Challenge auto-closed | ID: {challenge_id} | Title: {challenge["title"]} | Submissions: {len(challenge.get("submissions", []))} | Guild: {guild.name}')
+            await self.data_manager.update_challenge(guild.id, challenge_id, {'status': 'closed'})
+            logger.info(f'✅ Challenge auto-closed | ID: {challenge_id} | Title: {challenge["title"]} | Submissions: {challenge.get("submission_count", 0)} | Guild: {guild.name}')
             
             # Format duration for message
             hours_msg = int(duration_minutes // 60)
@@ -214,7 +213,7 @@ class Challenges(commands.Cog):
                 description=f"**{challenge['title']}** has automatically closed after {duration_text}.",
                 color=discord.Color.red()
             )
-            embed.add_field(name='Total Submissions', value=str(len(challenge.get('submissions', []))), inline=True)
+            embed.add_field(name='Total Submissions', value=str(challenge.get('submission_count', 0)), inline=True)
             embed.add_field(name='Week', value=f"Week {challenge['week']}", inline=True)
             embed.add_field(name='Language', value=f'{lang_info["emoji"]} {lang_info["name"]}', inline=True)
             embed.add_field(
@@ -245,7 +244,7 @@ class Challenges(commands.Cog):
             await interaction.response.send_message('❌ Only trainers!', ephemeral=True)
             return
 
-        active_challenge = self.data_manager.get_active_challenge(interaction.guild.id)
+        active_challenge = await self.data_manager.get_active_challenge(interaction.guild.id)
         if not active_challenge:
             await interaction.response.send_message('❌ No active challenge!', ephemeral=True)
             return
@@ -256,7 +255,7 @@ class Challenges(commands.Cog):
             self.auto_close_tasks[task_key].cancel()
             del self.auto_close_tasks[task_key]
 
-        self.data_manager.update_challenge(interaction.guild.id, active_challenge['id'], {'status': 'closed'})
+        await self.data_manager.update_challenge(interaction.guild.id, active_challenge['id'], {'status': 'closed'})
 
         lang_key = active_challenge.get('language', 'any')
         lang_info = SUPPORTED_LANGUAGES.get(lang_key, SUPPORTED_LANGUAGES['any'])
@@ -266,7 +265,7 @@ class Challenges(commands.Cog):
             description=f"**{active_challenge['title']}** has been closed by {interaction.user.mention}.",
             color=discord.Color.red()
         )
-        embed.add_field(name='Total Submissions', value=str(len(active_challenge.get('submissions', []))), inline=True)
+        embed.add_field(name='Total Submissions', value=str(active_challenge.get('submission_count', 0)), inline=True)
         embed.add_field(name='Week', value=f"Week {active_challenge['week']}", inline=True)
         embed.add_field(name='Language', value=f'{lang_info["emoji"]} {lang_info["name"]}', inline=True)
         embed.set_footer(text=interaction.guild.name)
@@ -284,7 +283,7 @@ class Challenges(commands.Cog):
             await interaction.response.send_message('❌ Extension must be 1-1440 minutes (1 min to 24 hours)!', ephemeral=True)
             return
 
-        active_challenge = self.data_manager.get_active_challenge(interaction.guild.id)
+        active_challenge = await self.data_manager.get_active_challenge(interaction.guild.id)
         if not active_challenge:
             await interaction.response.send_message('❌ No active challenge!', ephemeral=True)
             return
@@ -301,7 +300,7 @@ class Challenges(commands.Cog):
         new_duration_minutes = active_challenge['duration_minutes'] + minutes
 
         # Update challenge
-        self.data_manager.update_challenge(interaction.guild.id, active_challenge['id'], {
+        await self.data_manager.update_challenge(interaction.guild.id, active_challenge['id'], {
             'close_time': new_close_time.isoformat(),
             'duration_minutes': new_duration_minutes
         })
@@ -359,7 +358,7 @@ class Challenges(commands.Cog):
 
     @app_commands.command(name='challengetimer', description='Check time remaining for active challenge')
     async def challenge_timer(self, interaction: discord.Interaction):
-        active_challenge = self.data_manager.get_active_challenge(interaction.guild.id)
+        active_challenge = await self.data_manager.get_active_challenge(interaction.guild.id)
         
         if not active_challenge:
             await interaction.response.send_message('❌ No active challenge!', ephemeral=True)
@@ -396,7 +395,7 @@ class Challenges(commands.Cog):
         
         embed.add_field(name='⏱️ Time Left', value=time_text, inline=True)
         embed.add_field(name='Closes At', value=close_time.strftime("%b %d at %I:%M %p"), inline=True)
-        embed.add_field(name='Submissions', value=str(len(active_challenge.get('submissions', []))), inline=True)
+        embed.add_field(name='Submissions', value=str(active_challenge.get('submission_count', 0)), inline=True)
         embed.add_field(name='Language', value=f'{lang_info["emoji"]} {lang_info["name"]}', inline=True)
         embed.add_field(name='Difficulty', value=active_challenge['difficulty'], inline=True)
         embed.add_field(name='Week', value=f"Week {active_challenge['week']}", inline=True)
@@ -422,8 +421,8 @@ class Challenges(commands.Cog):
             await interaction.response.send_message('❌ Only trainers!', ephemeral=True)
             return
 
-        challenge = self.data_manager.get_active_challenge(interaction.guild.id) or \
-                   self.data_manager.get_latest_challenge(interaction.guild.id)
+        challenge = await self.data_manager.get_active_challenge(interaction.guild.id) or \
+                   await self.data_manager.get_latest_challenge(interaction.guild.id)
         if not challenge:
             await interaction.response.send_message('❌ No challenge found!', ephemeral=True)
             return
@@ -431,22 +430,21 @@ class Challenges(commands.Cog):
         week_key = f"week_{challenge['week']}"
         winners = []
 
-        self.data_manager.ensure_user(interaction.guild.id, first.id, first.name)
-        self.data_manager.add_xp(interaction.guild.id, first.id, 10, week_key)
-        self.data_manager.add_badge(interaction.guild.id, first.id, f"🥇 Winner W{challenge['week']}")
-        winners.append(f"🥇 {first.mention} - **10 XP**")
+        # One load and one commit for all winners instead of a write per call
+        async with self.data_manager.transaction(interaction.guild.id) as txn:
+            txn.add_xp(first.id, 10, week_key, first.name)
+            txn.add_badge(first.id, f"🥇 Winner W{challenge['week']}")
+            winners.append(f"🥇 {first.mention} - **10 XP**")
 
-        if second:
-            self.data_manager.ensure_user(interaction.guild.id, second.id, second.name)
-            self.data_manager.add_xp(interaction.guild.id, second.id, 7, week_key)
-            self.data_manager.add_badge(interaction.guild.id, second.id, f"🥈 2nd Place W{challenge['week']}")
-            winners.append(f"🥈 {second.mention} - **7 XP**")
+            if second:
+                txn.add_xp(second.id, 7, week_key, second.name)
+                txn.add_badge(second.id, f"🥈 2nd Place W{challenge['week']}")
+                winners.append(f"🥈 {second.mention} - **7 XP**")
 
-        if third:
-            self.data_manager.ensure_user(interaction.guild.id, third.id, third.name)
-            self.data_manager.add_xp(interaction.guild.id, third.id, 5, week_key)
-            self.data_manager.add_badge(interaction.guild.id, third.id, f"🥉 3rd Place W{challenge['week']}")
-            winners.append(f"🥉 {third.mention} - **5 XP**")
+            if third:
+                txn.add_xp(third.id, 5, week_key, third.name)
+                txn.add_badge(third.id, f"🥉 3rd Place W{challenge['week']}")
+                winners.append(f"🥉 {third.mention} - **5 XP**")
 
         lang_key = challenge.get('language', 'any')
         lang_info = SUPPORTED_LANGUAGES.get(lang_key, SUPPORTED_LANGUAGES['any'])
@@ -462,7 +460,7 @@ class Challenges(commands.Cog):
 
     @app_commands.command(name='activechallenge', description='View the current active challenge')
     async def active_challenge(self, interaction: discord.Interaction):
-        challenge = self.data_manager.get_active_challenge(interaction.guild.id)
+        challenge = await self.data_manager.get_active_challenge(interaction.guild.id)
         
         if not challenge:
             await interaction.response.send_message('❌ No active challenge!', ephemeral=True)
@@ -479,7 +477,7 @@ class Challenges(commands.Cog):
         embed.add_field(name='Difficulty', value=challenge["difficulty"], inline=True)
         embed.add_field(name='Week', value=f'Week {challenge["week"]}', inline=True)
         embed.add_field(name='Language', value=f'{lang_info["emoji"]} {lang_info["name"]}', inline=True)
-        embed.add_field(name='Submissions', value=str(len(challenge.get("submissions", []))), inline=True)
+        embed.add_field(name='Submissions', value=str(challenge.get("submission_count", 0)), inline=True)
         
         # Show time remaining
         if 'close_time' in challenge:
@@ -2,7 +2,6 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from datetime import datetime
-from collections import defaultdict
 from utils.constants import XP_VALUES
 from utils.logger import get_logger
 
@@ -14,6 +13,22 @@ class Leaderboard(commands.Cog):
         self.data_manager = bot.data_manager
         logger.info("Leaderboard cog initialized")
 
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if before.name != after.name:
+            await self._rename(after.guild.id, after)
+
+    @commands.Cog.listener()
+    async def on_user_update(self, before: discord.User, after: discord.User):
+        # Usernames are stored per guild; refresh every guild we share
+        if before.name != after.name:
+            for guild in after.mutual_guilds:
+                await self._rename(guild.id, after)
+
+    async def _rename(self, guild_id: int, user):
+        if await self.data_manager.rename_user(guild_id, user.id, user.name):
+            logger.info(f"Username refreshed | User: {user.name} | ID: {user.id} | Guild: {guild_id}")
+
     @app_commands.command(name='addxp', description='Add XP to a user')
     @app_commands.describe(user='The user to add XP to', position='Position or participation (1st, 2nd, 3rd, participation)', week='Week number (optional, defaults to current week)')
     async def add_xp(self, interaction: discord.Interaction, user: discord.Member, position: str, week: int = None):
@@ -34,10 +49,9 @@ class Leaderboard(commands.Cog):
         week_key = f"week_{week}"
         xp_amount = XP_VALUES[position]
 
-        self.data_manager.ensure_user(interaction.guild.id, user.id, user.name)
-        self.data_manager.add_xp(interaction.guild.id, user.id, xp_amount, week_key)
+        await self.data_manager.add_xp(interaction.guild.id, user.id, xp_amount, week_key, user.name)
 
-        user_data = self.data_manager.get_user(interaction.guild.id, user.id)
+        user_data = await self.data_manager.get_user(interaction.guild.id, user.id)
 
         logger.info(f"/addxp | User: {user.name} | Position: {position} | XP: +{xp_amount} | Week: {week} | By: {interaction.user.name} | Guild: {interaction.guild.name}")
 
@@ -49,53 +63,49 @@ class Leaderboard(commands.Cog):
         await interaction.response.send_message(embed=embed)
 
     @app_commands.command(name='leaderboard', description='View the current monthly leaderboard')
-    async def leaderboard_cmd(self, interaction: discord.Interaction):
-        leaderboard = self.data_manager.get_leaderboard(interaction.guild.id)
+    @app_commands.describe(page='Page number (10 users per page, optional)')
+    async def leaderboard_cmd(self, interaction: discord.Interaction, page: int = 1):
+        total_users = await self.data_manager.get_user_count(interaction.guild.id)
 
-        if not leaderboard:
+        if not total_users:
             await interaction.response.send_message('📊 The leaderboard is empty!')
             return
 
-        sorted_users = sorted(leaderboard.items(), key=lambda x: x[1]['xp'], reverse=True)
+        page_size = 10
+        total_pages = (total_users + page_size - 1) // page_size
+        page = min(max(page, 1), total_pages)
+        offset = (page - 1) * page_size
+        top_users = await self.data_manager.get_top_users(interaction.guild.id, page_size, offset)
         month_key = self.data_manager.get_month_key()
 
-        logger.info(f"/leaderboard | User: {interaction.user.name} | Total users: {len(sorted_users)} | Guild: {interaction.guild.name}")
+        logger.info(f"/leaderboard | User: {interaction.user.name} | Total users: {total_users} | Page: {page} | Guild: {interaction.guild.name}")
 
         embed = discord.Embed(title=f'🏆 {interaction.guild.name} Leaderboard', description=f'**{month_key}**', color=discord.Color.gold())
 
         medals = ['🥇', '🥈', '🥉']
 
-        for idx, (user_id, data) in enumerate(sorted_users[:10]):
+        for idx, (user_id, data) in enumerate(top_users, offset):
             medal = medals[idx] if idx < 3 else f'**{idx + 1}.**'
             username = data['username']
             xp = data['xp']
             embed.add_field(name=f'{medal} {username}', value=f'{xp} XP', inline=False)
 
-        embed.set_footer(text=f'{interaction.guild.name} • Monthly Rankings')
+        embed.set_footer(text=f'{interaction.guild.name} • Monthly Rankings • Page {page}/{total_pages}')
         await interaction.response.send_message(embed=embed)
 
     @app_commands.command(name='halloffame', description='View the all-time Hall of Fame')
     async def hall_of_fame_cmd(self, interaction: discord.Interaction):
-        hall_of_fame = self.data_manager.get_hall_of_fame(interaction.guild.id)
+        top_users = await self.data_manager.get_hall_of_fame_top(interaction.guild.id, 10)
         
-        if not hall_of_fame:
+        if not top_users:
             await interaction.response.send_message('🏛️ The Hall of Fame is empty!')
             return
         
-        all_users = defaultdict(lambda: {'username': '', 'total_xp': 0})
-        
-        for month, users in hall_of_fame.items():
-            for user_id, data in users.items():
-                all_users[user_id]['username'] = data['username']
-                all_users[user_id]['total_xp'] += data.get('xp', 0)
-        
-        sorted_users = sorted(all_users.items(), key=lambda x: x[1]['total_xp'], reverse=True)
-        
         embed = discord.Embed(title=f'🏛️ {interaction.guild.name} Hall of Fame', description='All-time champions', color=discord.Color.purple())
         
         medals = ['🥇', '🥈', '🥉']
         
-        for idx, (user_id, data) in enumerate(sorted_users[:10]):
+        for idx, (user_id, data) in enumerate(top_users):
             medal = medals[idx] if idx < 3 else f'**{idx + 1}.**'
             username = data['username']
             xp = data['total_xp']
@@ -108,7 +118,7 @@ class Leaderboard(commands.Cog):
     @app_commands.describe(user='User to check (optional)')
     async def stats(self, interaction: discord.Interaction, user: discord.Member = None):
         target_user = user or interaction.user
-        user_data = self.data_manager.get_user(interaction.guild.id, target_user.id)
+        user_data = await self.data_manager.get_user(interaction.guild.id, target_user.id)
         
         if not user_data:
             await interaction.response.send_message(f'❌ {target_user.mention} has no stats yet!', ephemeral=True)
@@ -118,7 +128,7 @@ class Leaderboard(commands.Cog):
         embed.add_field(name='Current Month XP', value=f'{user_data["xp"]} XP', inline=True)
         embed.add_field(name='Total XP', value=f'{user_data["total_xp"]} XP', inline=True)
         
-        rank = self.data_manager.get_user_rank(interaction.guild.id, target_user.id)
+        rank = await self.data_manager.get_user_rank(interaction.guild.id, target_user.id)
         embed.add_field(name='Current Rank', value=f'#{rank}', inline=True)
         
         embed.set_footer(text=f'Server: {interaction.guild.name}')
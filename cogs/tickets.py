@@ -3,9 +3,7 @@ from discord.ext import commands
 from discord import app_commands
 from datetime import datetime
 from utils.constants import ALLOWED_ROLES
-from utils.code_analyzer import CodeAnalyzer
-from utils.auto_xp import AutoXPCalculator
-from utils.ai_verifier import AIVerifier
+from utils.verification_scheduler import VerificationQueueFull
 from utils.logger import get_logger
 import traceback
 
@@ -22,12 +20,12 @@ class Tickets(commands.Cog):
         await interaction.response.defer(ephemeral=True)
         
         try:
-            active_challenge = self.data_manager.get_active_challenge(interaction.guild.id)
+            active_challenge = await self.data_manager.get_active_challenge(interaction.guild.id)
             if not active_challenge:
                 await interaction.followup.send('❌ No active challenge!', ephemeral=True)
                 return
 
-            existing_ticket = self.data_manager.get_user_ticket(interaction.guild.id, interaction.user.id, active_challenge['id'])
+            existing_ticket = await self.data_manager.get_user_ticket(interaction.guild.id, interaction.user.id, active_challenge['id'])
             if existing_ticket:
                 channel = interaction.guild.get_channel(existing_ticket['channel_id'])
                 if channel:
@@ -65,7 +63,7 @@ class Tickets(commands.Cog):
                 'status': 'open',
                 'submitted': False
             }
-            self.data_manager.create_ticket(interaction.guild.id, ticket_data)
+            await self.data_manager.create_ticket(interaction.guild.id, ticket_data)
 
             embed = discord.Embed(
                 title=f'🎯 Submission Ticket - {active_challenge["title"]}',
@@ -90,7 +88,7 @@ class Tickets(commands.Cog):
             )
             embed.set_footer(text=f'{interaction.guild.name} • Good luck! 🚀')
 
-            view = SubmitView(self.data_manager, active_challenge['id'], interaction.guild.id)
+            view = SubmitView(self.bot, active_challenge['id'], interaction.guild.id)
             await ticket_channel.send(embed=embed, view=view)
 
             await interaction.followup.send(f'✅ Created ticket: {ticket_channel.mention}', ephemeral=True)
@@ -107,7 +105,7 @@ class Tickets(commands.Cog):
             await interaction.response.send_message('❌ Use in ticket channels only!', ephemeral=True)
             return
 
-        ticket = self.data_manager.get_ticket_by_channel(interaction.guild.id, interaction.channel.id)
+        ticket = await self.data_manager.get_ticket_by_channel(interaction.guild.id, interaction.channel.id)
         if not ticket:
             await interaction.response.send_message('❌ Ticket not found!', ephemeral=True)
             return
@@ -128,12 +126,12 @@ class Tickets(commands.Cog):
             await interaction.response.send_message('❌ Trainers only!', ephemeral=True)
             return
 
-        active_challenge = self.data_manager.get_active_challenge(interaction.guild.id)
+        active_challenge = await self.data_manager.get_active_challenge(interaction.guild.id)
         if not active_challenge:
             await interaction.response.send_message('❌ No active challenge!', ephemeral=True)
             return
 
-        tickets = self.data_manager.get_tickets_by_challenge(interaction.guild.id, active_challenge['id'])
+        tickets = await self.data_manager.get_tickets_by_challenge(interaction.guild.id, active_challenge['id'])
         
         if not tickets:
             await interaction.response.send_message('📋 No tickets yet!', ephemeral=True)
@@ -168,7 +166,7 @@ class Tickets(commands.Cog):
             await interaction.response.send_message('❌ Use in ticket!', ephemeral=True)
             return
 
-        ticket = self.data_manager.get_ticket_by_channel(interaction.guild.id, interaction.channel.id)
+        ticket = await self.data_manager.get_ticket_by_channel(interaction.guild.id, interaction.channel.id)
         if not ticket:
             await interaction.response.send_message('❌ Ticket not found!', ephemeral=True)
             return
@@ -184,93 +182,40 @@ class Tickets(commands.Cog):
 
 
 class SubmitView(discord.ui.View):
-    def __init__(self, data_manager, challenge_id, guild_id):
+    def __init__(self, bot, challenge_id, guild_id):
         super().__init__(timeout=None)
-        self.data_manager = data_manager
+        self.data_manager = bot.data_manager
         self.challenge_id = challenge_id
         self.guild_id = guild_id
-        self.code_analyzer = CodeAnalyzer()
-        self.xp_calculator = AutoXPCalculator()
-        self.ai_verifier = AIVerifier()
+        # Shared services: one of each for the whole bot, not one per ticket
+        self.verification_scheduler = bot.verification_scheduler
+        self.code_analyzer = bot.code_analyzer
+        self.xp_calculator = bot.xp_calculator
+        self.ai_verifier = bot.ai_verifier
+        # Ticket channels being submitted, from the first click until the ticket is marked submitted
+        self.reviewing = set()
 
     @discord.ui.button(label='Mark as Submitted ✅', style=discord.ButtonStyle.green, custom_id='submit_solution')
     async def submit_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         await interaction.response.defer()
-        
-        ticket = self.data_manager.get_ticket_by_channel(self.guild_id, interaction.channel.id)
-        
-        if not ticket:
-            await interaction.followup.send('❌ Ticket not found!', ephemeral=True)
-            return
-
-        if ticket['user_id'] != interaction.user.id:
-            await interaction.followup.send('❌ Only ticket owner!', ephemeral=True)
-            return
 
-        if ticket['submitted']:
-            await interaction.followup.send('✅ Already submitted!', ephemeral=True)
+        # Claimed until the ticket is marked submitted, so a second click cannot
+        # submit twice; no await between the check and the claim
+        if interaction.channel.id in self.reviewing:
+            await interaction.followup.send('⏳ Your solution is already being reviewed!', ephemeral=True)
             return
-
-        code_content = await self._extract_code(interaction.channel)
-        
-        if not code_content:
-            await interaction.followup.send('❌ No code found! Use \\`\\`\\`python code \\`\\`\\`', ephemeral=True)
-            return
-        
-        print(f"📝 Code found: {len(code_content)} chars")
-        
-        language = self._detect_language(code_content)
-        analysis = self.code_analyzer.analyze(code_content, language)
-        
-        challenge = self.data_manager.get_active_challenge(self.guild_id)
-        if not challenge:
-            await interaction.followup.send('❌ Challenge not found!', ephemeral=True)
+        self.reviewing.add(interaction.channel.id)
+        try:
+            awarded = await self._review_and_record(interaction)
+        finally:
+            self.reviewing.discard(interaction.channel.id)
+        if not awarded:
             return
-        
-        ai_result = self.ai_verifier.verify_solution(
-            challenge_title=challenge['title'],
-            challenge_description=challenge['description'],
-            challenge_difficulty=challenge['difficulty'],
-            submitted_code=code_content,
-            language=language
-        )
-        
-        print(f"🤖 AI: Solves={ai_result['solves_challenge']}, Score={ai_result['overall_score']}")
-        
-        submission_count = len(challenge.get('submissions', []))
-        submission_rank = submission_count + 1
-        
-        xp_result = self.xp_calculator.calculate(
-            code_quality=analysis['overall'],
-            submission_number=submission_rank,
-            total_lines=analysis['line_count'],
-            solves_challenge=ai_result['solves_challenge'],
-            ai_overall_score=ai_result['overall_score']
-        )
-        
+        ai_result, analysis, language = awarded['ai_result'], awarded['analysis'], awarded['language']
+        submission_rank = awarded['rank']
+        xp_result = awarded['xp']
         print(f"⭐ XP: {xp_result['total_xp']}")
         
-        week_key = f"week_{challenge['week']}"
-        self.data_manager.ensure_user(self.guild_id, interaction.user.id, interaction.user.name)
-        self.data_manager.add_xp(self.guild_id, interaction.user.id, xp_result['total_xp'], week_key)
-        
-        self.data_manager.update_ticket(self.guild_id, ticket['id'], {
-            'submitted': True,
-            'quality_score': ai_result['overall_score'],
-            'xp_awarded': xp_result['total_xp']
-        })
-        
-        submission_data = {
-            'user_id': interaction.user.id,
-            'ticket_id': ticket['id'],
-            'channel_id': interaction.channel.id,
-            'submitted_at': datetime.now().isoformat(),
-            'quality_score': ai_result['overall_score'],
-            'xp_awarded': xp_result['total_xp'],
-            'solves_challenge': ai_result['solves_challenge']
-        }
-        self.data_manager.add_submission(self.guild_id, self.challenge_id, submission_data)
-        
         color = discord.Color.green() if ai_result['solves_challenge'] else discord.Color.red()
         
         embed = discord.Embed(title='🤖 AI Code Review Complete!', description=f'Your {language} solution has been analyzed', color=color)
@@ -329,7 +274,100 @@ class SubmitView(discord.ui.View):
         await interaction.message.edit(view=self)
         
         print(f'✅ Complete for {interaction.user.name} in {interaction.guild.name}')
-    
+
+    async def _review_and_record(self, interaction: discord.Interaction):
+        """Review the ticket's code and store the submission; None if it could not be submitted"""
+        ticket = await self.data_manager.get_ticket_by_channel(self.guild_id, interaction.channel.id)
+        
+        if not ticket:
+            await interaction.followup.send('❌ Ticket not found!', ephemeral=True)
+            return None
+
+        if ticket['user_id'] != interaction.user.id:
+            await interaction.followup.send('❌ Only ticket owner!', ephemeral=True)
+            return None
+
+        if ticket['submitted']:
+            await interaction.followup.send('✅ Already submitted!', ephemeral=True)
+            return None
+
+        code_content = await self._extract_code(interaction.channel)
+        
+        if not code_content:
+            await interaction.followup.send('❌ No code found! Use \\`\\`\\`python code \\`\\`\\`', ephemeral=True)
+            return None
+        
+        print(f"📝 Code found: {len(code_content)} chars")
+        
+        language = self._detect_language(code_content)
+        analysis = self.code_analyzer.analyze(code_content, language)
+        
+        challenge = await self.data_manager.get_active_challenge(self.guild_id)
+        if not challenge:
+            await interaction.followup.send('❌ Challenge not found!', ephemeral=True)
+            return None
+
+        review = dict(
+            challenge_title=challenge['title'],
+            challenge_description=challenge['description'],
+            challenge_difficulty=challenge['difficulty'],
+            submitted_code=code_content,
+            language=language
+        )
+        # Identical code was already reviewed: no queue, no Gemini call
+        ai_result = self.ai_verifier.cached_result(**review)
+        if ai_result is None:
+            try:
+                job = self.verification_scheduler.schedule(self.guild_id, lambda: self.ai_verifier.verify_solution_async(**review))
+            except VerificationQueueFull:
+                await interaction.followup.send('⏳ The AI review queue is full right now. Please click the button again in a few minutes!', ephemeral=True)
+                return None
+
+            position = self.verification_scheduler.position(job)
+            if position:
+                await interaction.followup.send(f'⏳ Your solution is queued for AI review (position {position}). The results will be posted here as soon as it is done!')
+            ai_result = await job
+        
+        print(f"🤖 AI: Solves={ai_result['solves_challenge']}, Score={ai_result['overall_score']}")
+        
+        week_key = f"week_{challenge['week']}"
+        awarded = {'ai_result': ai_result, 'analysis': analysis, 'language': language}
+
+        def record_submission(position):
+            # Runs under the guild lock once the submission has its place, so two
+            # reviews finishing together cannot both be ranked first
+            xp_result = self.xp_calculator.calculate(
+                code_quality=analysis['overall'],
+                submission_number=position,
+                total_lines=analysis['line_count'],
+                solves_challenge=ai_result['solves_challenge'],
+                ai_overall_score=ai_result['overall_score']
+            )
+            awarded.update(rank=position, xp=xp_result)
+            txn.add_xp(interaction.user.id, xp_result['total_xp'], week_key, interaction.user.name)
+            txn.update_ticket(ticket['id'], {
+                'submitted': True,
+                'quality_score': ai_result['overall_score'],
+                'xp_awarded': xp_result['total_xp']
+            })
+            return {
+                'user_id': interaction.user.id,
+                'ticket_id': ticket['id'],
+                'channel_id': interaction.channel.id,
+                'submitted_at': datetime.now().isoformat(),
+                'quality_score': ai_result['overall_score'],
+                'xp_awarded': xp_result['total_xp'],
+                'solves_challenge': ai_result['solves_challenge']
+            }
+
+        async with self.data_manager.transaction(self.guild_id) as txn:
+            txn.add_submission(self.challenge_id, record_submission)
+
+        if 'rank' not in awarded:
+            await interaction.followup.send('❌ Challenge not found!', ephemeral=True)
+            return None
+        return awarded
+
     async def _extract_code(self, channel) -> str:
         code_blocks = []
         async for message in channel.history(limit=50):
@@ -436,7 +474,7 @@ class CloseConfirmView(discord.ui.View):
 
     @discord.ui.button(label='Yes, Close', style=discord.ButtonStyle.red)
     async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
-        self.data_manager.update_ticket(self.guild_id, self.ticket_id, {'status': 'closed'})
+        await self.data_manager.update_ticket(self.guild_id, self.ticket_id, {'status': 'closed'})
         await interaction.response.send_message('🔒 Closing...', ephemeral=True)
         import asyncio
         await asyncio.sleep(3)
@@ -0,0 +1,603 @@
+"""
+Tests for the data layer
+Run with: python -m pytest test_data_manager.py
+"""
+
+import asyncio
+import json
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.async_data_manager import AsyncDataManager
+from utils.data_manager import DataManager
+from utils.monthly_reset import MonthlyResetJob
+from utils.sqlite_manager import SQLiteDataManager
+
+GUILDS = [111, 222]
+USERS = 10
+CALLS_PER_GUILD = 300
+
+
+def _make_backend(kind: str, tmp_path):
+    if kind == 'sqlite':
+        return SQLiteDataManager(db_path=str(tmp_path / 'test.db'))
+    return DataManager(data_dir=str(tmp_path), flush_policy='immediate')
+
+
+@pytest.mark.parametrize('kind', ['json', 'sqlite'])
+def test_concurrent_add_xp_has_no_lost_updates(kind, tmp_path):
+    """Hundreds of concurrent add_xp calls across guilds must all be counted"""
+    backend = _make_backend(kind, tmp_path)
+    data_manager = AsyncDataManager(backend, max_workers=8)
+
+    async def run():
+        for guild_id in GUILDS:
+            for user_id in range(USERS):
+                await data_manager.ensure_user(guild_id, user_id, f"user_{user_id}")
+
+        await asyncio.gather(*(
+            data_manager.add_xp(guild_id, i % USERS, 1, 'week_1')
+            for guild_id in GUILDS
+            for i in range(CALLS_PER_GUILD)
+        ))
+        return {guild_id: await data_manager.get_leaderboard(guild_id) for guild_id in GUILDS}
+
+    leaderboards = asyncio.run(run())
+    for guild_id, leaderboard in leaderboards.items():
+        assert sum(user['xp'] for user in leaderboard.values()) == CALLS_PER_GUILD
+        assert all(user['xp'] == CALLS_PER_GUILD // USERS for user in leaderboard.values())
+
+    asyncio.run(data_manager.close())
+
+    if kind == 'json':
+        # Everything must also have reached disk
+        reloaded = DataManager(data_dir=str(tmp_path))
+        for guild_id in GUILDS:
+            assert sum(u['xp'] for u in reloaded.get_leaderboard(guild_id).values()) == CALLS_PER_GUILD
+
+
+def test_guilds_do_not_serialize_on_each_other(tmp_path):
+    """A long transaction in one guild must not block another guild"""
+    data_manager = DataManager(data_dir=str(tmp_path), flush_policy='immediate')
+    data_manager.ensure_user(GUILDS[1], 1, 'user_1')
+
+    inside = threading.Event()
+    release = threading.Event()
+
+    def hold_guild():
+        with data_manager.transaction(GUILDS[0]):
+            inside.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold_guild)
+    holder.start()
+    assert inside.wait(5)
+
+    other = threading.Thread(target=data_manager.add_xp, args=(GUILDS[1], 1, 5, 'week_1'))
+    other.start()
+    other.join(2)
+    finished_while_held = not other.is_alive()
+
+    release.set()
+    holder.join()
+    other.join()
+
+    assert finished_while_held
+    assert data_manager.get_user(GUILDS[1], 1)['xp'] == 5
+    data_manager.close()
+
+
+def test_slow_calls_in_one_guild_leave_workers_for_others(tmp_path):
+    """A burst of blocked calls in one guild must not use up the shared executor"""
+    backend = DataManager(data_dir=str(tmp_path), flush_policy='immediate')
+    backend.ensure_user(GUILDS[1], 1, 'user_1')
+    data_manager = AsyncDataManager(backend, max_workers=4, guild_workers=2)
+    release = threading.Event()
+    get_user = backend.get_user
+
+    def slow_get_user(guild_id, user_id):
+        if guild_id == GUILDS[0]:
+            release.wait(5)
+        return get_user(guild_id, user_id)
+
+    backend.get_user = slow_get_user
+
+    async def run():
+        stuck = [asyncio.ensure_future(data_manager.get_user(GUILDS[0], 1)) for _ in range(8)]
+        await asyncio.sleep(0.05)
+        try:
+            return await asyncio.wait_for(data_manager.get_user(GUILDS[1], 1), 2)
+        finally:
+            release.set()
+            await asyncio.gather(*stuck)
+
+    assert asyncio.run(run())['username'] == 'user_1'
+    asyncio.run(data_manager.close())
+
+
+def test_group_commit_coalesces_concurrent_writes(tmp_path):
+    """Concurrent saves of one file share writes and every change reaches disk"""
+    data_manager = DataManager(data_dir=str(tmp_path), flush_policy='immediate', group_commit=True)
+    ticket_ids = [
+        data_manager.create_ticket(GUILDS[0], {'user_id': t, 'channel_id': t, 'challenge_id': 1, 'status': 'open', 'submitted': False})
+        for t in range(8)
+    ]
+    before = data_manager.get_write_stats()['writes']
+
+    def update(ticket_id):
+        for i in range(20):
+            data_manager.update_ticket(GUILDS[0], ticket_id, {'xp_awarded': i})
+
+    workers = [threading.Thread(target=update, args=(ticket_id,)) for ticket_id in ticket_ids]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert data_manager.get_write_stats()['writes'] - before < len(ticket_ids) * 20
+    # Already durable before close(): read the file with a fresh manager
+    reloaded = DataManager(data_dir=str(tmp_path))
+    assert all(reloaded.get_ticket_by_channel(GUILDS[0], t)['xp_awarded'] == 19 for t in range(8))
+    data_manager.close()
+
+
+def test_corrupt_file_is_moved_aside(tmp_path):
+    server_dir = tmp_path / f'server_{GUILDS[0]}'
+    server_dir.mkdir()
+    (server_dir / 'leaderboard.json').write_text('{"1": {"username": "trunc')
+
+    data_manager = DataManager(data_dir=str(tmp_path), flush_policy='immediate')
+    assert data_manager.get_leaderboard(GUILDS[0]) == {}
+    data_manager.ensure_user(GUILDS[0], 1, 'user_1')
+
+    assert len(list(server_dir.glob('leaderboard.json.corrupt-*'))) == 1
+    assert not list(server_dir.glob('*.tmp'))
+    data_manager.close()
+
+
+def test_failed_write_is_retried_on_the_next_flush(tmp_path, monkeypatch):
+    from utils import file_writer
+
+    dm = DataManager(data_dir=str(tmp_path), flush_policy='shutdown')
+    dm.ensure_user(GUILDS[0], 1, 'user_1')
+    atomic_write = file_writer.atomic_write
+
+    def disk_full(path, payload):
+        raise OSError('No space left on device')
+
+    monkeypatch.setattr(file_writer, 'atomic_write', disk_full)
+    dm.flush()
+    monkeypatch.setattr(file_writer, 'atomic_write', atomic_write)
+    assert dm.flush() == 1
+
+    assert DataManager(data_dir=str(tmp_path)).get_user(GUILDS[0], 1)['username'] == 'user_1'
+    dm.close()
+
+
+@pytest.mark.parametrize('codec', ['json-pretty', 'orjson', 'msgpack'])
+def test_files_written_by_any_codec_are_readable(codec, tmp_path):
+    """Switching DATA_CODEC must not strand existing files"""
+    writer = DataManager(data_dir=str(tmp_path), flush_policy='immediate', codec=codec)
+    writer.create_ticket(GUILDS[0], {'user_id': 1, 'channel_id': 5, 'challenge_id': 1, 'status': 'open'})
+    writer.close()
+
+    reader = DataManager(data_dir=str(tmp_path), flush_policy='immediate', codec='json')
+    assert reader.get_ticket_by_channel(GUILDS[0], 5)['user_id'] == 1
+    assert not list(tmp_path.glob('*/*.corrupt-*'))
+    reader.close()
+
+
+@pytest.mark.parametrize('kind', ['json', 'sqlite'])
+def test_warm_up_preloads_every_guild(kind, tmp_path):
+    backend = _make_backend(kind, tmp_path)
+    for guild_id in GUILDS:
+        backend.ensure_user(guild_id, 1, 'user_1')
+        backend.create_challenge(guild_id, {'status': 'active'})
+    backend.close()
+
+    backend = _make_backend(kind, tmp_path)
+    data_manager = AsyncDataManager(backend)
+    timings = asyncio.run(data_manager.warm_up(GUILDS + [333], concurrency=2))
+
+    assert set(timings) == set(GUILDS + [333])
+    if kind == 'json':
+        assert set(backend.server_data) >= set(GUILDS)
+        assert set(backend._ticket_indexes) == set(GUILDS + [333])
+    asyncio.run(data_manager.close())
+
+
+def test_cold_guilds_are_flushed_and_evicted_over_budget(tmp_path):
+    # Each guild's leaderboard alone exceeds the budget, and with the shutdown
+    # policy the XP below only reaches disk if eviction flushes it
+    data_manager = DataManager(data_dir=str(tmp_path), flush_policy='shutdown', cache_budget_mb=0.004)
+    guild_ids = list(range(1, 6))
+    for guild_id in guild_ids:
+        for user_id in range(50):
+            data_manager.ensure_user(guild_id, user_id, f'user_{user_id}')
+        data_manager.flush(guild_id)
+        data_manager.add_xp(guild_id, 0, guild_id, '2024-W01')
+
+    stats = data_manager.get_cache_stats()
+    assert stats['evictions'] == len(guild_ids) - 1
+    assert stats['resident_guilds'] == 1
+
+    assert [data_manager.get_user(g, 0)['xp'] for g in guild_ids] == guild_ids
+    # Reading them back in turn evicts the previous one each time, guild 5 included
+    assert data_manager.get_cache_stats()['reloads'] == len(guild_ids)
+    data_manager.close()
+
+
+def _ledger_path(tmp_path, guild_id):
+    return DataManager(data_dir=str(tmp_path))._get_ledger(guild_id).path
+
+
+def test_ledger_replays_after_a_restart_without_close(tmp_path):
+    dm = DataManager(data_dir=str(tmp_path), flush_policy='shutdown')
+    for amount in (5, 7, 11):
+        dm.add_xp(GUILDS[0], 1, amount, '2024-W01', 'user_1')
+    # No close(): leaderboard.json was never written, only the ledger was
+    dm._get_ledger(GUILDS[0]).sync()
+
+    reloaded = DataManager(data_dir=str(tmp_path), flush_policy='shutdown')
+    assert reloaded.get_user(GUILDS[0], 1)['xp'] == 23
+    assert reloaded.get_user(GUILDS[0], 1)['username'] == 'user_1'
+    reloaded.add_xp(GUILDS[0], 1, 1, '2024-W01')
+    reloaded.close()
+    assert DataManager(data_dir=str(tmp_path)).get_user(GUILDS[0], 1)['xp'] == 24
+
+
+def test_ledger_skips_a_torn_last_line(tmp_path):
+    dm = DataManager(data_dir=str(tmp_path), flush_policy='shutdown')
+    dm.add_xp(GUILDS[0], 1, 5, '2024-W01', 'user_1')
+    dm._get_ledger(GUILDS[0]).sync()
+    # Crash halfway through appending the next event
+    with open(_ledger_path(tmp_path, GUILDS[0]), 'a', encoding='utf-8') as f:
+        f.write('{"seq":2,"type":"xp_add","user_id":"1","amo')
+
+    reloaded = DataManager(data_dir=str(tmp_path), flush_policy='shutdown')
+    assert reloaded.get_user(GUILDS[0], 1)['xp'] == 5
+    # Events written after the torn line must survive the next restart too
+    reloaded.add_xp(GUILDS[0], 1, 3, '2024-W01')
+    reloaded._get_ledger(GUILDS[0]).sync()
+    assert DataManager(data_dir=str(tmp_path)).get_user(GUILDS[0], 1)['xp'] == 8
+
+
+def test_ledger_is_not_replayed_twice_after_a_crash_before_rotate(tmp_path, monkeypatch):
+    dm = DataManager(data_dir=str(tmp_path), flush_policy='shutdown')
+    dm.add_xp(GUILDS[0], 1, 5, '2024-W01', 'user_1')
+    dm.add_xp(GUILDS[0], 1, 7, '2024-W01')
+
+    def crash():
+        raise OSError('crashed before rotate')
+
+    # The snapshot is written, the segment it covers is still live
+    monkeypatch.setattr(dm._get_ledger(GUILDS[0]), 'rotate', crash)
+    with pytest.raises(OSError):
+        dm.compact_ledger(GUILDS[0], force=True)
+
+    reloaded = DataManager(data_dir=str(tmp_path), flush_policy='shutdown')
+    assert reloaded.get_user(GUILDS[0], 1)['xp'] == 12
+    reloaded.add_xp(GUILDS[0], 1, 1, '2024-W01')
+    reloaded._get_ledger(GUILDS[0]).sync()
+    assert DataManager(data_dir=str(tmp_path)).get_user(GUILDS[0], 1)['xp'] == 13
+
+
+def test_ledger_replays_once_when_an_evicted_guild_reloads(tmp_path):
+    dm = DataManager(data_dir=str(tmp_path), flush_policy='shutdown')
+    for amount in (5, 7):
+        dm.add_xp(GUILDS[0], 1, amount, '2024-W01', 'user_1')
+    with dm._guild_lock(GUILDS[0]):
+        dm._evict_guild(GUILDS[0])
+    assert dm.get_cache_stats()['evictions'] == 1
+
+    assert dm.get_user(GUILDS[0], 1)['xp'] == 12
+    assert dm.get_cache_stats()['reloads'] == 1
+    dm.add_xp(GUILDS[0], 1, 1, '2024-W01')
+    dm.close()
+    assert DataManager(data_dir=str(tmp_path)).get_user(GUILDS[0], 1)['xp'] == 13
+
+
+def test_weekly_xp_rolls_up_and_streaks_count_consecutive_weeks(tmp_path):
+    server_dir = tmp_path / f'server_{GUILDS[0]}'
+    server_dir.mkdir()
+    legacy = {'1': {'username': 'user_1', 'xp': 9, 'total_xp': 9, 'badges': [],
+                    'weekly_xp': {'2023-W01': 4, '2023-W02': 5}}}
+    (server_dir / 'leaderboard.json').write_text(json.dumps(legacy))
+
+    data_manager = DataManager(data_dir=str(tmp_path), flush_policy='immediate')
+    year, week, _ = datetime.now().isocalendar()
+    # Three weeks in a row ending now, after a gap
+    for offset in (2, 1, 0):
+        monday = datetime.fromisocalendar(year, week, 1) - timedelta(weeks=offset)
+        data_manager.add_xp(GUILDS[0], 1, 10, f"{monday.isocalendar()[0]}-W{monday.isocalendar()[1]:02d}")
+
+    user = data_manager.get_user(GUILDS[0], 1)
+    assert 'weekly_xp' not in user
+    assert user['monthly_xp'] == {'2023-01': 9}
+    assert user['weeks']['xp'] == [10, 10, 10]
+    assert data_manager.get_user_streak(GUILDS[0], 1) == 3
+    data_manager.close()
+
+
+@pytest.mark.parametrize('kind', ['json', 'sqlite'])
+def test_ensure_user_writes_only_on_change(kind, tmp_path):
+    backend = _make_backend(kind, tmp_path)
+    assert backend.ensure_user(GUILDS[0], 1, 'user_1')
+    assert not backend.ensure_user(GUILDS[0], 1, 'user_1')
+    if kind == 'json':
+        writes = backend.get_write_stats()['writes']
+        backend.add_xp(GUILDS[0], 1, 10, '2024-W01', 'user_1')
+        assert backend.get_write_stats()['writes'] == writes
+
+    assert backend.rename_user(GUILDS[0], 1, 'renamed')
+    assert not backend.rename_user(GUILDS[0], 2, 'stranger')
+    backend.add_xp(GUILDS[0], 3, 5, '2024-W01', 'user_3')
+    assert backend.get_user(GUILDS[0], 1)['username'] == 'renamed'
+    assert backend.get_user(GUILDS[0], 2) is None
+    assert backend.get_user(GUILDS[0], 3)['xp'] == 5
+    backend.close()
+
+
+@pytest.mark.parametrize('kind', ['json', 'sqlite'])
+def test_monthly_reset_resumes_without_archiving_twice(kind, tmp_path):
+    backend = _make_backend(kind, tmp_path)
+    guild_ids = [1, 2, 3]
+    for guild_id in guild_ids:
+        backend.add_xp(guild_id, 1, 10 * guild_id, '2024-W01', 'user_1')
+    # Crash after the job reset guild 2 but before it recorded it
+    backend.reset_monthly_leaderboard(2, '2024-01', once=True)
+    job = MonthlyResetJob(AsyncDataManager(backend), state_path=str(tmp_path / 'state' / 'reset.json'))
+    (tmp_path / 'state' / 'reset.json').write_text(json.dumps(
+        {'month': '2024-01', 'started_at': '', 'done': [1], 'completed_at': None}))
+    backend.reset_monthly_leaderboard(1, '2024-01', once=True)
+
+    summary = asyncio.run(job.resume(guild_ids))
+    assert summary['skipped'] == 1 and not summary['failed']
+    assert [backend.get_hall_of_fame_month(g, '2024-01')['1']['xp'] for g in guild_ids] == [10, 20, 30]
+    assert all(backend.get_user(g, 1)['xp'] == 0 for g in guild_ids)
+
+    assert asyncio.run(job.resume(guild_ids)) is None
+    assert asyncio.run(job.run('2024-01', guild_ids))['reset'] == 0
+    backend.close()
+
+
+@pytest.mark.parametrize('kind', ['json', 'sqlite'])
+def test_manual_reset_does_not_stop_the_month_end_reset(kind, tmp_path):
+    backend = _make_backend(kind, tmp_path)
+    backend.add_xp(GUILDS[0], 1, 10, '2026-W40', 'user_1')
+    # /resetmonth mid-month, then more XP before the automatic reset
+    assert backend.reset_monthly_leaderboard(GUILDS[0], '2026-10')
+    backend.add_xp(GUILDS[0], 1, 7, '2026-W42', 'user_1')
+
+    assert backend.reset_monthly_leaderboard(GUILDS[0], '2026-10', once=True)
+    assert backend.get_user(GUILDS[0], 1)['xp'] == 0
+    # Both resets' XP is archived under the month and counted all-time
+    assert backend.get_hall_of_fame_month(GUILDS[0], '2026-10') == {'1': {'username': 'user_1', 'xp': 17}}
+    assert backend.get_hall_of_fame_top(GUILDS[0]) == [('1', {'username': 'user_1', 'total_xp': 17})]
+    assert not backend.reset_monthly_leaderboard(GUILDS[0], '2026-10', once=True)
+    backend.close()
+
+
+def test_reset_redone_after_a_crash_archives_once(tmp_path):
+    dm = DataManager(data_dir=str(tmp_path), flush_policy='immediate')
+    dm.add_xp(GUILDS[0], 1, 10, '2026-W40', 'user_1')
+
+    def crash(guild_id, force=False):
+        raise OSError('crashed before the zeroed XP was saved')
+
+    # The Hall of Fame files are written, the leaderboard snapshot is not
+    dm.compact_ledger = crash
+    with pytest.raises(OSError):
+        dm.reset_monthly_leaderboard(GUILDS[0], '2026-10', once=True)
+
+    reloaded = DataManager(data_dir=str(tmp_path), flush_policy='immediate')
+    assert reloaded.get_user(GUILDS[0], 1)['xp'] == 10
+    assert reloaded.reset_monthly_leaderboard(GUILDS[0], '2026-10', once=True)
+    assert reloaded.get_user(GUILDS[0], 1)['xp'] == 0
+    assert reloaded.get_hall_of_fame_month(GUILDS[0], '2026-10')['1']['xp'] == 10
+    assert reloaded.get_hall_of_fame_top(GUILDS[0])[0][1]['total_xp'] == 10
+    reloaded.close()
+
+
+@pytest.mark.parametrize('kind', ['json', 'sqlite'])
+def test_concurrent_submissions_get_distinct_positions(kind, tmp_path):
+    """XP that depends on the position is computed after add_submission assigns it"""
+    backend = _make_backend(kind, tmp_path)
+    data_manager = AsyncDataManager(backend, max_workers=8)
+    challenge_id = backend.create_challenge(GUILDS[0], {'title': 'Race', 'status': 'active'})
+
+    async def submit(user_id):
+        def record(position):
+            txn.add_xp(user_id, 100 - position, 'week_1', f"user_{user_id}")
+            return {'user_id': user_id, 'position': position}
+
+        async with data_manager.transaction(GUILDS[0]) as txn:
+            txn.add_submission(challenge_id, record)
+
+    async def run():
+        await asyncio.gather(*(submit(user_id) for user_id in range(USERS)))
+        return await data_manager.get_submissions(GUILDS[0], challenge_id)
+
+    submissions = asyncio.run(run())
+    assert sorted(s['position'] for s in submissions) == list(range(1, USERS + 1))
+    for submission in submissions:
+        assert backend.get_user(GUILDS[0], submission['user_id'])['xp'] == 100 - submission['position']
+    assert backend.get_challenge_by_id(GUILDS[0], challenge_id)['submission_count'] == USERS
+    assert backend.add_submission(GUILDS[0], challenge_id + 1, {}) is False
+    asyncio.run(data_manager.close())
+
+
+@pytest.mark.parametrize('kind', ['json', 'sqlite'])
+def test_reads_inside_a_transaction_skip_reserved_keys(kind, tmp_path):
+    backend = _make_backend(kind, tmp_path)
+    backend.add_xp(GUILDS[0], 1, 10, '2024-W01', 'user_1')
+    # Writes the leaderboard's _meta record
+    backend.reset_monthly_leaderboard(GUILDS[0], '2024-01', once=True)
+    with backend.transaction(GUILDS[0]):
+        backend.add_xp(GUILDS[0], 2, 5, '2024-W01', 'user_2')
+        assert backend.get_user_count(GUILDS[0]) == 2
+        assert backend.get_user(GUILDS[0], '_meta') is None
+        assert [user_id for user_id, _ in backend.get_top_users(GUILDS[0])] == ['2', '1']
+    assert backend.get_user_count(GUILDS[0]) == 2
+    assert backend.get_user(GUILDS[0], '_meta') is None
+    backend.close()
+
+
+def test_submission_count_is_rebuilt_from_the_log(tmp_path):
+    dm = DataManager(data_dir=str(tmp_path), flush_policy='immediate')
+    challenge_id = dm.create_challenge(GUILDS[0], {'title': 'Count', 'status': 'active'})
+    assert dm.add_submission(GUILDS[0], challenge_id, {'user_id': 1}) == 1
+    dm.close()
+    # Crash after the log line was fsynced but before challenges.json was saved
+    with open(dm._submission_log_path(GUILDS[0], challenge_id), 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'user_id': 2}) + '\n')
+
+    reloaded = DataManager(data_dir=str(tmp_path), flush_policy='immediate')
+    assert reloaded.get_challenge_by_id(GUILDS[0], challenge_id)['submission_count'] == 2
+    assert reloaded.add_submission(GUILDS[0], challenge_id, {'user_id': 3}) == 3
+    reloaded.close()
+    assert DataManager(data_dir=str(tmp_path)).get_active_challenge(GUILDS[0])['submission_count'] == 3
+
+
+def _write_baseline_guild(data_dir, guild_id):
+    """A server_<id>/ tree as the original JSON-only bot left it"""
+    server_dir = data_dir / f'server_{guild_id}'
+    server_dir.mkdir(parents=True)
+
+    def user(username, xp, weekly_xp, total_xp, badges):
+        return {'username': username, 'xp': xp, 'weekly_xp': weekly_xp, 'total_xp': total_xp, 'badges': badges}
+
+    leaderboard = {
+        '1': user('ada', 30, {'week_1': 10, 'week_2': 20}, 50, ['first_blood']),
+        '2': user('bob', 5, {'week_2': 5}, 5, []),
+        'tickets': [
+            {'id': 1, 'user_id': 1, 'challenge_id': 1, 'channel_id': 100, 'status': 'closed', 'submitted': True},
+            {'id': 2, 'user_id': 2, 'challenge_id': 2, 'channel_id': 200, 'status': 'open', 'submitted': False},
+        ],
+    }
+    challenges = [
+        {'id': 1, 'guild_id': guild_id, 'title': 'Sum', 'status': 'closed', 'week': 1,
+         'submissions': [{'user_id': 1, 'xp_awarded': 10}]},
+        {'id': 2, 'guild_id': guild_id, 'title': 'Product', 'status': 'active', 'week': 2,
+         'submissions': [{'user_id': 1, 'xp_awarded': 10}, {'user_id': 2, 'xp_awarded': 7}]},
+    ]
+    # Whole user records copied per month, users without XP included
+    hall_of_fame = {
+        f'2024-0{month}': {
+            '1': user('ada', 10 * month, {'week_1': 10 * month}, 10 * month, []),
+            '2': user('bob', 0, {}, 0, []),
+        }
+        for month in range(1, 6)
+    }
+    for filename, data in (('leaderboard.json', leaderboard), ('challenges.json', challenges),
+                           ('hall_of_fame.json', hall_of_fame)):
+        (server_dir / filename).write_text(json.dumps(data, indent=2))
+
+
+def test_baseline_json_migrates_to_sqlite_without_touching_the_source(tmp_path):
+    from utils.sqlite_manager import migrate_json_to_sqlite
+
+    guild_id = 42
+    data_dir = tmp_path / 'data'
+    _write_baseline_guild(data_dir, guild_id)
+    before = {path: path.read_bytes() for path in data_dir.rglob('*') if path.is_file()}
+    db_path = str(tmp_path / 'migrated.db')
+    assert migrate_json_to_sqlite(str(data_dir), db_path) == 1
+
+    assert {path: path.read_bytes() for path in data_dir.rglob('*') if path.is_file()} == before
+
+    # Loading the baseline tree with DataManager converts it; both backends must agree
+    json_backend = DataManager(data_dir=str(data_dir))
+    sqlite_backend = SQLiteDataManager(db_path=db_path)
+    for backend in (json_backend, sqlite_backend):
+        assert {k: (v['username'], v['xp'], v['total_xp'], v['badges']) for k, v in
+                backend.get_leaderboard(guild_id).items()} == {
+            '1': ('ada', 30, 50, ['first_blood']), '2': ('bob', 5, 5, [])}
+        assert backend.get_user_rank(guild_id, 2) == 2
+
+        assert backend.get_hall_of_fame_months(guild_id) == [f'2024-0{month}' for month in range(1, 6)]
+        assert backend.get_hall_of_fame_month(guild_id, '2024-01') == {'1': {'username': 'ada', 'xp': 10}}
+        assert backend.get_hall_of_fame_month(guild_id, '2024-05') == {'1': {'username': 'ada', 'xp': 50}}
+        assert backend.get_hall_of_fame_top(guild_id) == [('1', {'username': 'ada', 'total_xp': 150})]
+
+        assert backend.get_active_challenge(guild_id)['id'] == 2
+        assert backend.get_latest_challenge(guild_id)['id'] == 2
+        assert [backend.get_challenge_by_id(guild_id, c)['submission_count'] for c in (1, 2)] == [1, 2]
+        assert [s['user_id'] for s in backend.iter_submissions(guild_id, 2)] == [1, 2]
+
+        assert backend.get_ticket_by_channel(guild_id, 200)['id'] == 2
+        assert backend.get_user_ticket(guild_id, 2, 2)['channel_id'] == 200
+        assert [t['id'] for t in backend.get_tickets_by_challenge(guild_id, 1)] == [1]
+
+    assert (json_backend.get_user_streak(guild_id, 1), json_backend.get_user(guild_id, 1)['weeks']) == \
+        (sqlite_backend.get_user_streak(guild_id, 1), sqlite_backend.get_user(guild_id, 1)['weeks'])
+    json_backend.close()
+    sqlite_backend.close()
+
+
+def test_rank_index_matches_a_sorted_list(monkeypatch):
+    import random
+    from utils import rank_index
+
+    # Small blocks so splits, merges and empty blocks all happen
+    monkeypatch.setattr(rank_index, 'BLOCK_SIZE', 4)
+    rng = random.Random(7)
+    index = rank_index.RankIndex({str(u): {'xp': rng.randrange(50)} for u in range(30)})
+    xp = {user_id: index._xp[user_id] for user_id in index._xp}
+    snapshot, frozen = index.ordering(), sorted((-v, k) for k, v in xp.items())
+    for _ in range(2000):
+        user_id = str(rng.randrange(60))
+        if rng.random() < 0.2:
+            index.remove(user_id)
+            xp.pop(user_id, None)
+        else:
+            xp[user_id] = rng.randrange(50)
+            index.update(user_id, xp[user_id])
+        expected = sorted((-v, k) for k, v in xp.items())
+        assert index.ordering().slice(0, len(expected) + 5) == expected
+        assert index.rank(user_id) == (expected.index((-xp[user_id], user_id)) + 1 if user_id in xp else 0)
+    assert index.top(5, 3) == [user_id for _, user_id in expected[3:8]]
+    # A taken ordering never changes afterwards
+    assert snapshot.slice(0, 100) == frozen
+
+
+def test_reads_do_not_wait_for_a_held_guild_lock(tmp_path):
+    dm = DataManager(data_dir=str(tmp_path))
+    dm.ensure_user(GUILDS[0], 1, 'user_1')
+    dm.add_xp(GUILDS[0], 1, 10, '2024-W01')
+    assert dm.get_user_rank(GUILDS[0], 1) == 1
+
+    held, release = threading.Event(), threading.Event()
+
+    def hold_lock():
+        with dm._guild_lock(GUILDS[0]):
+            held.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold_lock)
+    holder.start()
+    held.wait(5)
+    try:
+        # Would still be blocked after the join timeout if reads took the lock
+        reader = threading.Thread(target=lambda: dm.get_top_users(GUILDS[0]))
+        reader.start()
+        reader.join(1)
+        assert not reader.is_alive()
+        assert dm.get_user(GUILDS[0], 1)['xp'] == 10
+    finally:
+        release.set()
+        holder.join()
+
+    with dm.transaction(GUILDS[0]):
+        dm.add_xp(GUILDS[0], 1, 5, '2024-W01')
+        # The transaction sees its own writes; others see them after commit
+        assert dm.get_user(GUILDS[0], 1)['xp'] == 15
+        seen = []
+        other = threading.Thread(target=lambda: seen.append(dm.get_user(GUILDS[0], 1)['xp']))
+        other.start()
+        other.join()
+        assert seen == [10]
+    assert dm.get_user(GUILDS[0], 1)['xp'] == 15
+    dm.close()
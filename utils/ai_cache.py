@@ -0,0 +1,167 @@
+import ast
+import functools
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from utils.constants import DATA_DIR, AI_CACHE_FILE, AI_CACHE_MAX_ENTRIES, AI_CACHE_TTL_HOURS
+from utils.file_writer import atomic_write
+from utils.logger import get_logger
+
+logger = get_logger("ai_cache")
+
+# Bump when the prompt or result format changes so old reviews are not reused
+CACHE_VERSION = 2
+
+HASH_COMMENT = re.compile(r'^\s*#.*$', re.MULTILINE)
+SLASH_COMMENT = re.compile(r'^\s*//.*$', re.MULTILINE)
+DASH_COMMENT = re.compile(r'^\s*--.*$', re.MULTILINE)
+BLOCK_COMMENT = re.compile(r'/\*.*?\*/', re.DOTALL)
+WHITESPACE = re.compile(r'\s+')
+
+C_STYLE = {'javascript', 'typescript', 'java', 'cpp', 'c', 'csharp', 'go', 'rust', 'swift', 'kotlin'}
+
+
+def normalize_code(code: str, language: str) -> str:
+    """Canonical form of submitted code that ignores formatting and comments.
+
+    Python that parses is reduced to its AST dump, which also ignores
+    comments, blank lines and quoting style. Everything else loses whole-line
+    comments (plus /* */ blocks for C-style languages) and has whitespace
+    runs collapsed.
+    """
+    if language == 'python':
+        try:
+            return ast.dump(ast.parse(code))
+        except (SyntaxError, ValueError):
+            pass
+
+    if language in ('python', 'ruby'):
+        code = HASH_COMMENT.sub('', code)
+    elif language == 'php':
+        code = HASH_COMMENT.sub('', SLASH_COMMENT.sub('', BLOCK_COMMENT.sub('', code)))
+    elif language in C_STYLE:
+        code = SLASH_COMMENT.sub('', BLOCK_COMMENT.sub('', code))
+    elif language == 'sql':
+        code = DASH_COMMENT.sub('', BLOCK_COMMENT.sub('', code))
+    return WHITESPACE.sub(' ', code).strip()
+
+
+@functools.lru_cache(maxsize=1024)
+def code_digest(code: str, language: str) -> str:
+    """sha256 of the normalized code; memoized since parsing costs milliseconds and exact resubmissions are common"""
+    return hashlib.sha256(normalize_code(code, language).encode('utf-8')).hexdigest()
+
+
+def review_key(model_name: str, challenge_title: str, challenge_description: str, challenge_difficulty: str,
+               submitted_code: str, language: str) -> str:
+    """sha256 over everything the review depends on"""
+    material = json.dumps([
+        CACHE_VERSION, model_name, challenge_title, challenge_description, challenge_difficulty,
+        language, code_digest(submitted_code, language),
+    ])
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class ReviewCache:
+    """Persistent LRU of AI review results keyed by review_key().
+
+    Entries expire `ttl_hours` after they were stored and the least recently
+    used ones are dropped above `max_entries`. The whole cache is a single
+    JSON file rewritten atomically by save().
+    """
+
+    def __init__(self, path: str = None, max_entries: int = None, ttl_hours: float = None):
+        if max_entries is None:
+            max_entries = int(os.getenv('AI_CACHE_MAX_ENTRIES', AI_CACHE_MAX_ENTRIES))
+        if ttl_hours is None:
+            ttl_hours = float(os.getenv('AI_CACHE_TTL_HOURS', AI_CACHE_TTL_HOURS))
+        self.path = path or os.path.join(DATA_DIR, AI_CACHE_FILE)
+        self.max_entries = max_entries
+        self.ttl = ttl_hours * 3600
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        self._entries = OrderedDict()  # key -> (stored_at, result), least recently used first
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._load()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _load(self):
+        if not self.enabled:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.error(f"Unreadable AI review cache, starting empty | File: {self.path} | Error: {e}")
+            return
+        if payload.get('version') != CACHE_VERSION:
+            logger.info(f"AI review cache is from another version, starting empty | File: {self.path}")
+            return
+        now = time.time()
+        for key, stored_at, result in payload.get('entries', []):
+            if now - stored_at < self.ttl:
+                self._entries[key] = (stored_at, result)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        logger.info(f"AI review cache loaded | Entries: {len(self._entries)}")
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] >= self.ttl:
+                del self._entries[key]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Callers get their own lists
+        return {k: list(v) if isinstance(v, list) else v for k, v in entry[1].items()}
+
+    def put(self, key: str, result: Dict):
+        if not self.enabled:
+            return
+        result = {k: list(v) if isinstance(v, list) else v for k, v in result.items()}
+        with self._lock:
+            self._entries[key] = (time.time(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def save(self):
+        """Write the cache to disk; safe to call from any thread"""
+        if not self.enabled:
+            return
+        with self._save_lock:
+            with self._lock:
+                entries = [[key, stored_at, result] for key, (stored_at, result) in self._entries.items()]
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            payload = json.dumps({'version': CACHE_VERSION, 'entries': entries}, separators=(',', ':'))
+            atomic_write(self.path, payload.encode('utf-8'))
+
+    def get_stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expired': self.expired,
+        }
@@ -1,26 +1,115 @@
+import asyncio
+import json
+import math
+import re
 import google.generativeai as genai
 import os
-from typing import Dict
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from utils.ai_cache import ReviewCache, review_key
+from utils.constants import AI_TIMEOUT_SECONDS
 from utils.logger import get_logger
 
 logger = get_logger("ai_verifier")
 
+MODEL_NAME = 'gemini-2.0-flash-exp'
+
+SCORE_KEYS = ('correctness_score', 'logic_score', 'completeness_score', 'overall_score')
+YES_NO = re.compile(r'\b(YES|NO)\b')
+NUMBER = re.compile(r'\d+')
+LEADING_NUMBER = re.compile(r'^\s*(\d+(?:\.\d+)?)')
+LABELLED_LINE = re.compile(r'^[*#\-\s]*([A-Za-z_]+)[*\s]*:?(.*)$')
+
+_review_cache = None
+
+
+def get_review_cache() -> ReviewCache:
+    """Cache of past reviews shared by every AIVerifier"""
+    global _review_cache
+    if _review_cache is None:
+        _review_cache = ReviewCache()
+    return _review_cache
+
+
+def _coerce_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', 'yes')
+    return value is True
+
+
+def _coerce_score(value) -> int:
+    """0-100 from a number or a string that starts with one ("85", "85/100")"""
+    if isinstance(value, str):
+        number = LEADING_NUMBER.match(value)
+        value = float(number.group(1)) if number else 0
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        return 0
+    return min(max(int(value), 0), 100)
+
+
+def _coerce_text(value) -> str:
+    if isinstance(value, list):
+        return ' '.join(text for text in map(_coerce_text, value) if text)
+    if value is None or isinstance(value, dict):
+        return ''
+    return str(value).strip()
+
+
+def _coerce_items(value) -> list:
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        return []
+    return [text for text in map(_coerce_text, value) if text]
+
+
 class AIVerifier:
+    """Gemini code review. The bot creates one and every ticket shares it.
+
+    The Gemini client is configured on the first review rather than at
+    construction, so startup and tests never touch it.
+    """
+
     def __init__(self):
-        api_key = os.getenv('GEMINI_API_KEY')
-        if api_key:
-            try:
-                genai.configure(api_key=api_key)
-                # Use the correct model name for 2024/2025
-                self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
-                self.enabled = True
-                logger.info('✅ AI Verifier enabled with Gemini 2.0 Flash')
-            except Exception as e:
-                logger.error(f'⚠️ Could not initialize Gemini: {e}')
-                self.enabled = False
+        self.timeout = float(os.getenv('AI_TIMEOUT_SECONDS', AI_TIMEOUT_SECONDS))
+        self._api_key = os.getenv('GEMINI_API_KEY')
+        self._model = None
+        self._model_lock = threading.Lock()
+        self.enabled = bool(self._api_key)
+        if self.enabled:
+            logger.info('✅ AI Verifier enabled with Gemini 2.0 Flash')
         else:
-            self.enabled = False
             logger.warning('⚠️ AI Verifier disabled - no GEMINI_API_KEY')
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    try:
+                        genai.configure(api_key=self._api_key)
+                        # Use the correct model name for 2024/2025
+                        self._model = genai.GenerativeModel(MODEL_NAME, generation_config=self._generation_config())
+                    except Exception as e:
+                        logger.error(f'⚠️ Could not initialize Gemini: {e}')
+                        self.enabled = False
+                        raise
+                    logger.info(f'Gemini model initialized | Model: {MODEL_NAME}')
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
+
+    @staticmethod
+    def _generation_config():
+        """JSON response mode, on SDK versions that support it"""
+        try:
+            return genai.GenerationConfig(response_mime_type='application/json')
+        except TypeError:
+            logger.warning('Gemini SDK has no JSON response mode, relying on the prompt')
+            return None
     
     def verify_solution(self, challenge_title: str, challenge_description: str, challenge_difficulty: str, submitted_code: str, language: str = 'python') -> Dict:
         if not self.enabled:
@@ -29,7 +118,90 @@ class AIVerifier:
 
         try:
             logger.info(f"AI verification started | Challenge: {challenge_title} | Language: {language}")
-            prompt = f"""You are a code review expert. Analyze if this code solves the given challenge.
+            prompt = self._build_prompt(challenge_title, challenge_description, challenge_difficulty, submitted_code)
+            response = self.model.generate_content(prompt)
+            result, cacheable = self._parse_ai_response(response.text)
+            logger.info(f"✅ AI verification complete | Challenge: {challenge_title} | Solves: {result['solves_challenge']} | Score: {result['overall_score']}")
+        except Exception as e:
+            logger.error(f'❌ AI verification failed | Challenge: {challenge_title} | Error: {str(e)[:150]}')
+            return self._basic_verification(submitted_code)
+
+        if not cacheable:
+            return result
+        cache = get_review_cache()
+        cache.put(review_key(MODEL_NAME, challenge_title, challenge_description, challenge_difficulty, submitted_code, language), result)
+        try:
+            cache.save()
+        except OSError as e:
+            logger.error(f'Could not save AI review cache | Error: {e}')
+        return result
+
+    async def verify_solution_async(self, challenge_title: str, challenge_description: str, challenge_difficulty: str, submitted_code: str, language: str = 'python') -> Dict:
+        """verify_solution without blocking the event loop.
+
+        How many run at once is up to the caller; the bot submits reviews
+        through its VerificationScheduler. A review slower than
+        AI_TIMEOUT_SECONDS falls back to basic verification like any other
+        Gemini failure.
+        """
+        if not self.enabled:
+            logger.debug("AI verification disabled, using basic verification")
+            return self._basic_verification(submitted_code)
+
+        prompt = self._build_prompt(challenge_title, challenge_description, challenge_difficulty, submitted_code)
+        started_at = time.perf_counter()
+        try:
+            logger.info(f"AI verification started | Challenge: {challenge_title} | Language: {language}")
+            response = await asyncio.wait_for(self._generate_async(prompt), timeout=self.timeout)
+            result, cacheable = self._parse_ai_response(response.text)
+        except asyncio.TimeoutError:
+            logger.error(f'❌ AI verification timed out | Challenge: {challenge_title} | Timeout: {self.timeout}s')
+            return self._basic_verification(submitted_code)
+        except Exception as e:
+            logger.error(f'❌ AI verification failed | Challenge: {challenge_title} | Error: {str(e)[:150]}')
+            return self._basic_verification(submitted_code)
+
+        logger.info(f"✅ AI verification complete | Challenge: {challenge_title} | Solves: {result['solves_challenge']} | "
+                    f"Score: {result['overall_score']} | Took: {(time.perf_counter() - started_at) * 1000:.0f}ms")
+        if not cacheable:
+            return result
+        cache = get_review_cache()
+        cache.put(review_key(MODEL_NAME, challenge_title, challenge_description, challenge_difficulty, submitted_code, language), result)
+        try:
+            await asyncio.to_thread(cache.save)
+        except OSError as e:
+            logger.error(f'Could not save AI review cache | Error: {e}')
+        return result
+
+    def cached_result(self, challenge_title: str, challenge_description: str, challenge_difficulty: str, submitted_code: str, language: str = 'python') -> Optional[Dict]:
+        """A stored review of the same code for the same challenge, if there is one.
+
+        Code is compared after normalization (see ai_cache.normalize_code), so
+        resubmissions that only change whitespace or comments are hits.
+        """
+        if not self.enabled:
+            return None
+        cache = get_review_cache()
+        if not cache.enabled:
+            return None
+        start = time.perf_counter()
+        key = review_key(MODEL_NAME, challenge_title, challenge_description, challenge_difficulty, submitted_code, language)
+        result = cache.get(key)
+        if result is not None:
+            stats = cache.get_stats()
+            logger.info(f"✅ AI verification cache hit | Challenge: {challenge_title} | Took: {(time.perf_counter() - start) * 1e6:.0f}us | "
+                        f"Hit rate: {stats['hit_rate']:.0%} ({stats['hits']}/{stats['hits'] + stats['misses']})")
+        return result
+
+    async def _generate_async(self, prompt: str):
+        generate = getattr(self.model, 'generate_content_async', None)
+        if generate is not None:
+            return await generate(prompt)
+        # SDKs without the async client: keep the blocking call off the event loop
+        return await asyncio.to_thread(self.model.generate_content, prompt)
+
+    def _build_prompt(self, challenge_title: str, challenge_description: str, challenge_difficulty: str, submitted_code: str) -> str:
+        return f"""You are a code review expert. Analyze if this code solves the given challenge.
 
 CHALLENGE: {challenge_title}
 DESCRIPTION: {challenge_description}
@@ -38,37 +210,63 @@ DIFFICULTY: {challenge_difficulty}
 SUBMITTED CODE:
 {submitted_code}
 
-Respond in EXACTLY this format:
+Respond with ONLY a JSON object, no other text, with exactly these keys:
 
-SOLVES_CHALLENGE: YES or NO
-CORRECTNESS_SCORE: number 0-100
-LOGIC_SCORE: number 0-100
-COMPLETENESS_SCORE: number 0-100
-OVERALL_SCORE: number 0-100
+{{
+  "solves_challenge": true or false,
+  "correctness_score": integer 0-100,
+  "logic_score": integer 0-100,
+  "completeness_score": integer 0-100,
+  "overall_score": integer 0-100,
+  "feedback": "brief explanation of whether the code solves the challenge",
+  "issues": ["issue", ...],
+  "strengths": ["strength", ...]
+}}
 
-FEEDBACK:
-Brief explanation of whether the code solves the challenge
+Be strict: Only set solves_challenge to true if the code actually solves the challenge correctly."""
 
-ISSUES:
-- Issue 1 if any
-- Issue 2 if any
+    def _parse_ai_response(self, text: str) -> Tuple[Dict, bool]:
+        """The result and whether it came from a JSON reply.
 
-STRENGTHS:
-- Strength 1 if any
-- Strength 2 if any
+        Only text with no JSON object in it goes to the old line parser; those
+        results are guesses and are not worth caching.
+        """
+        data = self._decode_json_object(text)
+        if data is None:
+            logger.info("AI response has no JSON object, using the line parser")
+            return self._apply_fallbacks(self._parse_legacy_response(text)), False
+        return self._apply_fallbacks(self._coerce_json_response(data)), True
 
-Be strict: Only say YES if the code actually solves the challenge correctly."""
+    def _decode_json_object(self, text: str) -> Optional[Dict]:
+        text = text.strip()
+        if text.startswith('```'):
+            # ```json ... ``` fences, sometimes added despite JSON mode
+            text = text.strip('`')
+            if text[:4].lower() == 'json':
+                text = text[4:]
+        try:
+            data = json.loads(text)
+        except ValueError:
+            # A JSON object wrapped in prose
+            start, end = text.find('{'), text.rfind('}')
+            try:
+                data = json.loads(text[start:end + 1]) if 0 <= start < end else None
+            except ValueError:
+                return None
+        return data if isinstance(data, dict) else None
 
-            response = self.model.generate_content(prompt)
-            result = self._parse_ai_response(response.text)
-            logger.info(f"✅ AI verification complete | Challenge: {challenge_title} | Solves: {result['solves_challenge']} | Score: {result['overall_score']}")
-            return result
-            
-        except Exception as e:
-            logger.error(f'❌ AI verification failed | Challenge: {challenge_title} | Error: {str(e)[:150]}')
-            return self._basic_verification(submitted_code)
-    
-    def _parse_ai_response(self, text: str) -> Dict:
+    def _coerce_json_response(self, data: Dict) -> Dict:
+        """Each field on its own: a malformed one gets its default, not the whole reply"""
+        result = {'solves_challenge': _coerce_bool(data.get('solves_challenge'))}
+        for key in SCORE_KEYS:
+            result[key] = _coerce_score(data.get(key))
+        result['feedback'] = _coerce_text(data.get('feedback'))
+        for key in ('issues', 'strengths'):
+            result[key] = _coerce_items(data.get(key))
+        return result
+
+    def _parse_legacy_response(self, text: str) -> Dict:
+        """The original SOLVES_CHALLENGE:/FEEDBACK: line format"""
         result = {
             'solves_challenge': False,
             'correctness_score': 0,
@@ -85,47 +283,19 @@ Be strict: Only say YES if the code actually solves the challenge correctly."""
         
         for line in lines:
             line_stripped = line.strip()
-            line_upper = line_stripped.upper()
+            labelled = LABELLED_LINE.match(line_stripped)
+            label, value = (labelled.group(1).upper(), labelled.group(2)) if labelled else ('', '')
             
-            # Parse SOLVES_CHALLENGE
-            if 'SOLVES_CHALLENGE' in line_upper:
-                if 'YES' in line_upper:
-                    result['solves_challenge'] = True
-                elif 'NO' in line_upper:
-                    result['solves_challenge'] = False
+            # Parse SOLVES_CHALLENGE; whole words only, "NOT" or "KNOWN" are not "NO"
+            if label == 'SOLVES_CHALLENGE':
+                answer = YES_NO.search(value.upper())
+                result['solves_challenge'] = bool(answer) and answer.group(1) == 'YES'
             
             # Parse scores
-            elif 'CORRECTNESS_SCORE' in line_upper:
-                try:
-                    numbers = [int(s) for s in line_stripped.split() if s.isdigit()]
-                    if numbers:
-                        result['correctness_score'] = min(max(numbers[0], 0), 100)
-                except:
-                    result['correctness_score'] = 50
-            
-            elif 'LOGIC_SCORE' in line_upper:
-                try:
-                    numbers = [int(s) for s in line_stripped.split() if s.isdigit()]
-                    if numbers:
-                        result['logic_score'] = min(max(numbers[0], 0), 100)
-                except:
-                    result['logic_score'] = 50
-            
-            elif 'COMPLETENESS_SCORE' in line_upper:
-                try:
-                    numbers = [int(s) for s in line_stripped.split() if s.isdigit()]
-                    if numbers:
-                        result['completeness_score'] = min(max(numbers[0], 0), 100)
-                except:
-                    result['completeness_score'] = 50
-            
-            elif 'OVERALL_SCORE' in line_upper:
-                try:
-                    numbers = [int(s) for s in line_stripped.split() if s.isdigit()]
-                    if numbers:
-                        result['overall_score'] = min(max(numbers[0], 0), 100)
-                except:
-                    result['overall_score'] = 50
+            elif label.lower() in SCORE_KEYS:
+                number = NUMBER.search(value)
+                if number:
+                    result[label.lower()] = min(int(number.group()), 100)
             
             # Parse sections
             elif line_stripped == 'FEEDBACK:':
@@ -151,8 +321,9 @@ Be strict: Only say YES if the code actually solves the challenge correctly."""
         
         # Clean up feedback
         result['feedback'] = result['feedback'].strip()
-        
-        # Fallbacks
+        return result
+
+    def _apply_fallbacks(self, result: Dict) -> Dict:
         if not result['feedback']:
             result['feedback'] = 'Code analysis completed.'
         if not result['issues']:
@@ -0,0 +1,239 @@
+import asyncio
+import os
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from utils.constants import DATA_WORKERS, GUILD_WORKERS, WARMUP_CONCURRENCY
+from utils.logger import get_logger
+
+logger = get_logger("async_data_manager")
+
+
+class TransactionBatch:
+    """Mutations queued inside AsyncDataManager.transaction() for one guild.
+
+    Methods mirror DataManager without the guild_id argument and are applied
+    together, in order, when the ``async with`` block exits cleanly.
+    """
+
+    def __init__(self):
+        self.operations = []
+
+    def _queue(self, name: str, *args):
+        self.operations.append((name, args))
+
+    def ensure_user(self, user_id: int, username: str):
+        self._queue('ensure_user', user_id, username)
+
+    def add_xp(self, user_id: int, amount: int, week_key: str, username: str = None):
+        self._queue('add_xp', user_id, amount, week_key, username)
+
+    def remove_xp(self, user_id: int, amount: int):
+        self._queue('remove_xp', user_id, amount)
+
+    def add_badge(self, user_id: int, badge: str):
+        self._queue('add_badge', user_id, badge)
+
+    def update_challenge(self, challenge_id: int, updates: dict):
+        self._queue('update_challenge', challenge_id, updates)
+
+    def add_submission(self, challenge_id: int, submission_data):
+        """submission_data may be a function of the submission's position.
+
+        It is called inside the transaction, under the guild lock, and can
+        queue further mutations on this batch (XP that depends on the
+        position, say); they are applied in the same transaction.
+        """
+        self._queue('add_submission', challenge_id, submission_data)
+
+    def create_ticket(self, ticket_data: dict):
+        self._queue('create_ticket', ticket_data)
+
+    def update_ticket(self, ticket_id: int, updates: dict):
+        self._queue('update_ticket', ticket_id, updates)
+
+
+class AsyncDataManager:
+    """Awaitable facade over a DataManager / SQLiteDataManager.
+
+    Every call runs on a dedicated executor so disk and database work never
+    blocks the event loop (gateway heartbeats, interaction acks). The backend
+    locks per guild, so several workers let different guilds proceed in
+    parallel; each guild may hold only guild_workers of them at once, so a
+    burst of slow calls in one guild cannot starve the others.
+    """
+
+    def __init__(self, backend, max_workers: int = None, guild_workers: int = None):
+        if max_workers is None:
+            max_workers = int(os.getenv("DATA_WORKERS", DATA_WORKERS))
+        if guild_workers is None:
+            guild_workers = int(os.getenv("DATA_GUILD_WORKERS", GUILD_WORKERS))
+        self.backend = backend
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or None, thread_name_prefix="data-io")
+        self.max_workers = self._executor._max_workers
+        self.guild_workers = max(1, min(guild_workers, self.max_workers))
+        # Per event loop, since asyncio semaphores cannot be shared between loops
+        self._lanes = weakref.WeakKeyDictionary()
+        logger.info(f"AsyncDataManager initialized | Backend: {type(backend).__name__} | "
+                    f"Workers: {self.max_workers} | Per guild: {self.guild_workers}")
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def _run_guild(self, func, guild_id: int, *args, **kwargs):
+        """Run func(guild_id, ...) using at most guild_workers workers for that guild"""
+        lanes = self._lanes.setdefault(asyncio.get_running_loop(), {})
+        lane = lanes.get(guild_id)
+        if lane is None:
+            lane = lanes[guild_id] = asyncio.Semaphore(self.guild_workers)
+        async with lane:
+            return await self._run(func, guild_id, *args, **kwargs)
+
+    @asynccontextmanager
+    async def transaction(self, guild_id: int):
+        """Queue mutations and commit them in one backend transaction on exit"""
+        batch = TransactionBatch()
+        yield batch
+        if batch.operations:
+            await self._run_guild(self._apply_batch, guild_id, batch)
+
+    def _apply_batch(self, guild_id: int, batch: TransactionBatch):
+        with self.backend.transaction(guild_id):
+            # By index: operations may queue more operations while they run
+            index = 0
+            while index < len(batch.operations):
+                name, args = batch.operations[index]
+                getattr(self.backend, name)(guild_id, *args)
+                index += 1
+
+    async def warm_up(self, guild_ids, concurrency: int = None):
+        """Preload every guild's cached state, at most `concurrency` guilds at a time.
+
+        Returns {guild_id: seconds}; a guild that fails to load is logged and
+        left to load lazily on its first command.
+        """
+        if concurrency is None:
+            concurrency = int(os.getenv("DATA_WARMUP_CONCURRENCY", WARMUP_CONCURRENCY))
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        timings = {}
+
+        async def load(guild_id):
+            async with semaphore:
+                try:
+                    timings[guild_id] = await self._run_guild(self.backend.warm_up, guild_id)
+                    logger.info(f"Guild warmed up | Guild: {guild_id} | Time: {timings[guild_id] * 1000:.1f}ms")
+                except Exception as e:
+                    logger.error(f"Warm-up failed | Guild: {guild_id} | Error: {e}")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(load(guild_id) for guild_id in guild_ids))
+        elapsed = time.perf_counter() - start
+        slowest = max(timings.values(), default=0)
+        logger.info(f"Warm-up complete | Guilds: {len(timings)}/{len(guild_ids)} | Concurrency: {concurrency} | "
+                    f"Total: {elapsed * 1000:.1f}ms | Slowest guild: {slowest * 1000:.1f}ms")
+        return timings
+
+    def get_month_key(self):
+        # Pure clock read, no I/O
+        return self.backend.get_month_key()
+
+    async def flush(self, guild_id: int = None):
+        return await self._run(self.backend.flush, guild_id)
+
+    async def compact_ledgers(self):
+        return await self._run(self.backend.compact_ledgers)
+
+    async def close(self):
+        await self._run(self.backend.close)
+        self._executor.shutdown(wait=True)
+        logger.info("AsyncDataManager closed")
+
+    async def ensure_user(self, guild_id: int, user_id: int, username: str):
+        return await self._run_guild(self.backend.ensure_user, guild_id, user_id, username)
+
+    async def add_xp(self, guild_id: int, user_id: int, amount: int, week_key: str, username: str = None):
+        return await self._run_guild(self.backend.add_xp, guild_id, user_id, amount, week_key, username)
+
+    async def rename_user(self, guild_id: int, user_id: int, username: str):
+        return await self._run_guild(self.backend.rename_user, guild_id, user_id, username)
+
+    async def remove_xp(self, guild_id: int, user_id: int, amount: int):
+        return await self._run_guild(self.backend.remove_xp, guild_id, user_id, amount)
+
+    async def add_badge(self, guild_id: int, user_id: int, badge: str):
+        return await self._run_guild(self.backend.add_badge, guild_id, user_id, badge)
+
+    async def get_user(self, guild_id: int, user_id: int):
+        return await self._run_guild(self.backend.get_user, guild_id, user_id)
+
+    async def get_leaderboard(self, guild_id: int):
+        return await self._run_guild(self.backend.get_leaderboard, guild_id)
+
+    async def get_user_rank(self, guild_id: int, user_id: int):
+        return await self._run_guild(self.backend.get_user_rank, guild_id, user_id)
+
+    async def get_top_users(self, guild_id: int, limit: int = 10, offset: int = 0):
+        return await self._run_guild(self.backend.get_top_users, guild_id, limit, offset)
+
+    async def get_user_count(self, guild_id: int):
+        return await self._run_guild(self.backend.get_user_count, guild_id)
+
+    async def get_user_streak(self, guild_id: int, user_id: int):
+        return await self._run_guild(self.backend.get_user_streak, guild_id, user_id)
+
+    async def get_hall_of_fame(self, guild_id: int):
+        return await self._run_guild(self.backend.get_hall_of_fame, guild_id)
+
+    async def get_hall_of_fame_months(self, guild_id: int):
+        return await self._run_guild(self.backend.get_hall_of_fame_months, guild_id)
+
+    async def get_hall_of_fame_month(self, guild_id: int, month_key: str):
+        return await self._run_guild(self.backend.get_hall_of_fame_month, guild_id, month_key)
+
+    async def get_hall_of_fame_top(self, guild_id: int, limit: int = 10):
+        return await self._run_guild(self.backend.get_hall_of_fame_top, guild_id, limit)
+
+    async def reset_monthly_leaderboard(self, guild_id: int, month_key: str = None, once: bool = False):
+        return await self._run_guild(self.backend.reset_monthly_leaderboard, guild_id, month_key, once)
+
+    async def create_challenge(self, guild_id: int, challenge_data: dict):
+        return await self._run_guild(self.backend.create_challenge, guild_id, challenge_data)
+
+    async def update_challenge(self, guild_id: int, challenge_id: int, updates: dict):
+        return await self._run_guild(self.backend.update_challenge, guild_id, challenge_id, updates)
+
+    async def get_active_challenge(self, guild_id: int):
+        return await self._run_guild(self.backend.get_active_challenge, guild_id)
+
+    async def get_latest_challenge(self, guild_id: int):
+        return await self._run_guild(self.backend.get_latest_challenge, guild_id)
+
+    async def get_challenge_by_id(self, guild_id: int, challenge_id: int):
+        return await self._run_guild(self.backend.get_challenge_by_id, guild_id, challenge_id)
+
+    async def add_submission(self, guild_id: int, challenge_id: int, submission_data: dict):
+        return await self._run_guild(self.backend.add_submission, guild_id, challenge_id, submission_data)
+
+    async def get_submissions(self, guild_id: int, challenge_id: int):
+        return await self._run_guild(self._list_submissions, guild_id, challenge_id)
+
+    def _list_submissions(self, guild_id: int, challenge_id: int):
+        return list(self.backend.iter_submissions(guild_id, challenge_id))
+
+    async def create_ticket(self, guild_id: int, ticket_data: dict):
+        return await self._run_guild(self.backend.create_ticket, guild_id, ticket_data)
+
+    async def update_ticket(self, guild_id: int, ticket_id: int, updates: dict):
+        return await self._run_guild(self.backend.update_ticket, guild_id, ticket_id, updates)
+
+    async def get_user_ticket(self, guild_id: int, user_id: int, challenge_id: int):
+        return await self._run_guild(self.backend.get_user_ticket, guild_id, user_id, challenge_id)
+
+    async def get_ticket_by_channel(self, guild_id: int, channel_id: int):
+        return await self._run_guild(self.backend.get_ticket_by_channel, guild_id, channel_id)
+
+    async def get_tickets_by_challenge(self, guild_id: int, challenge_id: int):
+        return await self._run_guild(self.backend.get_tickets_by_challenge, guild_id, challenge_id)
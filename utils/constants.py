@@ -10,7 +10,63 @@ XP_VALUES = {
 DATA_DIR = 'data'
 LEADERBOARD_FILE = 'leaderboard.json'
 HALL_OF_FAME_FILE = 'hall_of_fame.json'
+HALL_OF_FAME_TOTALS_FILE = 'hall_of_fame_totals.json'
 CHALLENGES_FILE = 'challenges.json'
+CHALLENGES_ARCHIVE_FILE = 'challenges_archive.json'
+SUBMISSIONS_DIR = 'submissions'        # one challenge_<id>.jsonl log per challenge
+TICKETS_FILE = 'tickets.json'
+TICKETS_ARCHIVE_FILE = 'tickets_archive.jsonl'
+SQLITE_DB_FILE = 'talait.db'
+XP_LEDGER_FILE = 'xp_ledger.jsonl'
+
+# Storage backends (DATA_BACKEND in .env)
+BACKEND_JSON = 'json'
+BACKEND_SQLITE = 'sqlite'
+
+# Data file codec (DATA_CODEC in .env): json, json-pretty, orjson or msgpack.
+# Files in any of these formats are read regardless of the setting.
+DATA_CODEC = 'json'
+
+# Data flush policies
+FLUSH_IMMEDIATE = 'immediate'   # write the file after every change
+FLUSH_DEBOUNCED = 'debounced'   # write once changes settle for FLUSH_DEBOUNCE_SECONDS
+FLUSH_ON_SHUTDOWN = 'shutdown'  # only write on flush() / close()
+FLUSH_POLICIES = [FLUSH_IMMEDIATE, FLUSH_DEBOUNCED, FLUSH_ON_SHUTDOWN]
+FLUSH_DEBOUNCE_SECONDS = 2.0
+GROUP_COMMIT_WINDOW_MS = 0      # extra wait before a group commit write to gather more changes
+CACHE_BUDGET_MB = 0             # evict least recently used guilds above this (DATA_CACHE_BUDGET_MB, 0 = unlimited)
+WARMUP_CONCURRENCY = 4          # guilds preloaded in parallel at startup (DATA_WARMUP_CONCURRENCY)
+DATA_WORKERS = 0                # threads for data calls (DATA_WORKERS, 0 = min(32, CPUs + 4))
+GUILD_WORKERS = 2               # of those, how many one guild may hold at once (DATA_GUILD_WORKERS)
+
+# Monthly reset job
+MONTHLY_RESET_STATE_FILE = 'monthly_reset.json'  # progress of the last automatic reset, in DATA_DIR
+MONTHLY_RESET_CONCURRENCY = 4   # guilds reset in parallel (DATA_RESET_CONCURRENCY)
+
+# XP ledger
+LEDGER_FSYNC_BATCH = 16         # fsync the ledger every N appended events
+LEDGER_COMPACT_EVENTS = 1000    # compact once the live segment holds this many events
+LEDGER_COMPACT_MINUTES = 10     # ...or on this timer
+
+# Weekly XP
+WEEKLY_XP_RETENTION_WEEKS = 26  # weeks kept per user, older XP is summed per month
+
+# Hall of Fame
+HALL_OF_FAME_TOP_K = 25         # all-time ranking kept precomputed for /halloffame
+HALL_OF_FAME_RECENT_MONTHS = 3  # months kept in hall_of_fame.json, older ones are archived
+HALL_OF_FAME_ARCHIVE_DIR = 'hall_of_fame_archive'  # one <month>.json.gz per archived month
+
+# AI verification
+AI_MAX_CONCURRENCY = 8          # Gemini reviews in flight at once across all guilds (AI_MAX_CONCURRENCY)
+AI_TIMEOUT_SECONDS = 30.0       # give up on a review after this long and fall back (AI_TIMEOUT_SECONDS)
+AI_RATE_PER_MINUTE = 60         # reviews started per minute, match the Gemini quota (AI_RATE_PER_MINUTE)
+AI_RATE_BURST = 10              # reviews that may start back to back before the rate applies (AI_RATE_BURST)
+AI_QUEUE_MAX = 200              # reviews waiting across all guilds before new ones are refused (AI_QUEUE_MAX)
+AI_QUEUE_MAX_PER_GUILD = 50     # ...and per guild, so one guild cannot fill the queue (AI_QUEUE_MAX_PER_GUILD)
+AI_STATS_MINUTES = 5            # verification queue stats are logged this often while there is activity
+AI_CACHE_FILE = 'ai_cache.json' # reviews of identical submissions, in DATA_DIR
+AI_CACHE_MAX_ENTRIES = 2000     # least recently used reviews are dropped above this (AI_CACHE_MAX_ENTRIES, 0 = off)
+AI_CACHE_TTL_HOURS = 168        # a cached review is reused for this long (AI_CACHE_TTL_HOURS)
 
 # Role permissions
 ALLOWED_ROLES = ['formateur', 'admin', 'moderator']
@@ -1,241 +1,1335 @@
+import gzip
+import heapq
 import json
 import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
-from utils.constants import DATA_DIR, LEADERBOARD_FILE, HALL_OF_FAME_FILE, CHALLENGES_FILE
+from functools import wraps
+from utils.constants import (
+    DATA_DIR, LEADERBOARD_FILE, HALL_OF_FAME_FILE, HALL_OF_FAME_TOTALS_FILE, CHALLENGES_FILE, XP_LEDGER_FILE,
+    CHALLENGES_ARCHIVE_FILE, SUBMISSIONS_DIR, TICKETS_FILE, TICKETS_ARCHIVE_FILE,
+    FLUSH_IMMEDIATE, FLUSH_DEBOUNCED, FLUSH_POLICIES, FLUSH_DEBOUNCE_SECONDS,
+    LEDGER_FSYNC_BATCH, LEDGER_COMPACT_EVENTS, GROUP_COMMIT_WINDOW_MS, DATA_CODEC, CACHE_BUDGET_MB,
+    HALL_OF_FAME_TOP_K, HALL_OF_FAME_ARCHIVE_DIR, HALL_OF_FAME_RECENT_MONTHS
+)
+from utils.file_writer import GroupCommitWriter
 from utils.logger import get_logger
+from utils.rank_index import RankIndex
+from utils.read_snapshot import MISSING, GuildSnapshot, LiveUsers, UserMap, freeze
+from utils.serializers import get_serializer, load_payload
+from utils.ticket_index import TicketIndex
+from utils.weekly_xp import new_weeks, add_week_xp, week_index, format_week, current_streak, migrate_weekly_xp
+from utils.xp_ledger import XPLedger
 
 logger = get_logger("data_manager")
 
+# Keys in leaderboard.json that are not user records
+META_KEY = '_meta'
+RESERVED_KEYS = (META_KEY,)
+
+
+def synchronized(method):
+    """Run a method while holding the instance-wide lock"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def guild_synchronized(method):
+    """Run a DataManager method while holding the lock of its guild (first argument).
+
+    Writes deferred by the immediate flush policy are committed once the
+    outermost call releases the lock, so concurrent callers can share them.
+    Changes are published to the guild's read snapshot just before that.
+    """
+    @wraps(method)
+    def wrapper(self, guild_id, *args, **kwargs):
+        held = self._held_guilds()
+        try:
+            with self._guild_lock(guild_id):
+                held[guild_id] = held.get(guild_id, 0) + 1
+                try:
+                    return method(self, guild_id, *args, **kwargs)
+                finally:
+                    held[guild_id] -= 1
+                    if not held[guild_id]:
+                        del held[guild_id]
+                        self._publish(guild_id)
+        finally:
+            if guild_id not in held:
+                if self._take_deferred_flush(guild_id):
+                    self.flush(guild_id)
+                if self.cache_budget:
+                    self._touch_guild(guild_id)
+                    self._enforce_cache_budget()
+    return wrapper
+
+
 class DataManager:
-    def __init__(self):
-        self.data_dir = DATA_DIR
+    def __init__(self, data_dir: str = None, flush_policy: str = None, flush_delay: float = None,
+                 group_commit: bool = None, group_commit_window: float = None, codec: str = None,
+                 cache_budget_mb: float = None):
+        if flush_policy is None:
+            flush_policy = os.getenv("DATA_FLUSH_POLICY", FLUSH_IMMEDIATE)
+        if flush_delay is None:
+            flush_delay = float(os.getenv("DATA_FLUSH_DELAY", FLUSH_DEBOUNCE_SECONDS))
+        if group_commit is None:
+            group_commit = os.getenv("DATA_GROUP_COMMIT", "1").lower() not in ("0", "false", "no")
+        if group_commit_window is None:
+            group_commit_window = float(os.getenv("DATA_GROUP_COMMIT_WINDOW_MS", GROUP_COMMIT_WINDOW_MS)) / 1000
+        if codec is None:
+            codec = os.getenv("DATA_CODEC", DATA_CODEC)
+        if cache_budget_mb is None:
+            cache_budget_mb = float(os.getenv("DATA_CACHE_BUDGET_MB", CACHE_BUDGET_MB))
+        if flush_policy not in FLUSH_POLICIES:
+            logger.warning(f"Unknown flush policy '{flush_policy}', falling back to {FLUSH_IMMEDIATE}")
+            flush_policy = FLUSH_IMMEDIATE
+
+        self.data_dir = data_dir or DATA_DIR
         os.makedirs(self.data_dir, exist_ok=True)
+        self.flush_policy = flush_policy
+        self.flush_delay = flush_delay
+        self.group_commit = group_commit
+        self.group_commit_window = group_commit_window
+        self.serializer = get_serializer(codec)
+        self.cache_budget = int(cache_budget_mb * 1024 * 1024)
+
+        # In-memory cache: {guild_id: {filename: data}}. Reads are served from
+        # here, writes mutate the cached object and mark (guild_id, filename) dirty.
         self.server_data = {}
-        logger.info(f"DataManager initialized | Data directory: {self.data_dir}")
+        self._dirty = set()
+        # Each guild's data is guarded by its own lock so guilds never wait on
+        # each other; _lock only covers the shared bookkeeping below.
+        self._guild_locks = {}
+        self._lock = threading.RLock()
+        self._flush_timer = None
+        self._ledgers = {}
+        self._transactions = {}
+        self._rank_indexes = {}
+        self._ticket_indexes = {}
+        self._ticket_archives = {}
+        # Group commit: one writer per file, plus per-thread lock depth so an
+        # immediate flush waits until the outermost call releases the guild
+        self._writers = {}
+        self._local = threading.local()
+        # Server directories known to exist, so lookups skip the filesystem
+        self._server_dirs = set()
+        # Memory budget: cached guilds in least recently used order, each with
+        # the serialized size of its cached files as its footprint
+        self._lru = OrderedDict()
+        self._resident = {}
+        self._resident_bytes = 0
+        self._evicted = set()
+        self._evictions = 0
+        self._reloads = 0
+        # Copy-on-write read views: {guild_id: GuildSnapshot}, replaced after
+        # each commit; _unpublished collects what changed since the last one
+        self._snapshots = {}
+        self._unpublished = {}
+        logger.info(f"DataManager initialized | Data directory: {self.data_dir} | Flush policy: {self.flush_policy} | Group commit: {self.group_commit} | Codec: {self.serializer.name} | Cache budget: {cache_budget_mb or 'unlimited'}MB")
+    
+    def _guild_lock(self, guild_id: int) -> threading.RLock:
+        lock = self._guild_locks.get(guild_id)
+        if lock is None:
+            with self._lock:
+                lock = self._guild_locks.setdefault(guild_id, threading.RLock())
+        return lock
     
+    def _held_guilds(self) -> dict:
+        """{guild_id: lock depth} for the calling thread"""
+        held = getattr(self._local, 'held', None)
+        if held is None:
+            held = self._local.held = {}
+        return held
+
+    def _take_deferred_flush(self, guild_id: int) -> bool:
+        deferred = getattr(self._local, 'deferred', None)
+        if deferred and guild_id in deferred:
+            deferred.discard(guild_id)
+            return True
+        return False
+
+    def _defer_flush(self, guild_id: int):
+        deferred = getattr(self._local, 'deferred', None)
+        if deferred is None:
+            deferred = self._local.deferred = set()
+        deferred.add(guild_id)
+
+    def _writer(self, guild_id: int, filename: str) -> GroupCommitWriter:
+        writers = self._writers.get(guild_id)
+        writer = writers.get(filename) if writers else None
+        if writer is None:
+            path = os.path.join(self._get_server_dir(guild_id), filename)
+            with self._lock:
+                writers = self._writers.setdefault(guild_id, {})
+                writer = writers.setdefault(filename, GroupCommitWriter(path, self.group_commit_window))
+        return writer
+
+    @guild_synchronized
+    def warm_up(self, guild_id: int) -> float:
+        """Load a guild's leaderboard, rank index, challenges and ticket index into the cache.
+
+        Returns the seconds it took, so startup can report slow guilds.
+        """
+        start = time.perf_counter()
+        self._snapshot_part(guild_id, 'ranking')
+        self._snapshot_part(guild_id, 'active_challenge')
+        self._ticket_index(guild_id)
+        return time.perf_counter() - start
+
+    def _note_resident(self, guild_id: int, filename: str, size: int):
+        with self._lock:
+            sizes = self._resident.setdefault(guild_id, {})
+            self._resident_bytes += size - sizes.get(filename, 0)
+            sizes[filename] = size
+
+    def _touch_guild(self, guild_id: int):
+        with self._lock:
+            if guild_id in self.server_data:
+                self._lru[guild_id] = None
+                self._lru.move_to_end(guild_id)
+
+    def _enforce_cache_budget(self):
+        """Evict least recently used guilds until the cache fits the budget.
+
+        Runs after the caller released its guild lock. Guilds another thread
+        is using, or that change while being flushed, are skipped this round.
+        """
+        with self._lock:
+            if self._resident_bytes <= self.cache_budget:
+                return
+            candidates = list(self._lru)[:-1]  # never the guild just used
+        held = self._held_guilds()
+        for guild_id in candidates:
+            with self._lock:
+                if self._resident_bytes <= self.cache_budget:
+                    return
+            lock = self._guild_lock(guild_id)
+            if guild_id in held or guild_id in self._transactions or not lock.acquire(blocking=False):
+                continue
+            try:
+                self._evict_guild(guild_id)
+            finally:
+                lock.release()
+
+    def _evict_guild(self, guild_id: int):
+        # Caller holds the guild lock
+        self.flush(guild_id)
+        if self._has_dirty(guild_id):
+            return
+        with self._lock:
+            freed = sum(self._resident.get(guild_id, {}).values())
+        self._discard_guild(guild_id)
+        with self._lock:
+            self._evicted.add(guild_id)
+            self._evictions += 1
+        logger.debug(f"Evicted guild from cache | Guild: {guild_id} | Freed: {freed / 1024:.0f}KB")
+
+    def _mark_unpublished(self, guild_id: int, part: str, user_id: str = None):
+        """Note a change the next publish must carry into the read snapshot"""
+        self._unpublished.setdefault(guild_id, set()).add((part, user_id))
+
+    def _build_part(self, guild_id: int, part: str) -> dict:
+        """Fields of GuildSnapshot for `part`, computed from the live cache (guild lock held)"""
+        if part == 'users':
+            leaderboard = self._load_server_data(guild_id, LEADERBOARD_FILE)
+            return {'users': UserMap.build({k: v for k, v in leaderboard.items() if k not in RESERVED_KEYS})}
+        if part == 'ranking':
+            return {'ranking': self._rank_index(guild_id).ordering()}
+        if part == 'active_challenge':
+            return {'active_challenge': freeze(self._active_challenge(guild_id))}
+        totals = self._hall_of_fame_totals(guild_id)
+        return {'hall_of_fame_top': tuple((user_id, freeze(totals['users'][user_id])) for user_id in totals['top'])}
+
+    def _publish(self, guild_id: int):
+        """Replace the guild's read snapshot with one that includes its committed changes.
+
+        Called with the guild lock held once the outermost call or transaction
+        finishes. For users only the changed records are copied; the ranking
+        is just marked stale and taken again, O(blocks), on the next rank read.
+        """
+        if guild_id in self._transactions:
+            return
+        changes = self._unpublished.pop(guild_id, None)
+        snapshot = self._snapshots.get(guild_id)
+        if not changes or snapshot is None:
+            return
+
+        fields = {}
+        user_ids = {user_id for part, user_id in changes if part == 'users' and user_id is not None}
+        if ('users', None) in changes:
+            # Every record changed (monthly reset); rebuilt on the next read
+            fields.update(users=MISSING, ranking=MISSING)
+        elif user_ids and snapshot.users is not MISSING:
+            leaderboard = self._load_server_data(guild_id, LEADERBOARD_FILE)
+            fields['users'] = snapshot.users.with_changes({user_id: leaderboard.get(user_id) for user_id in user_ids})
+            fields['ranking'] = MISSING
+        for part in ('active_challenge', 'hall_of_fame_top'):
+            if (part, None) in changes and getattr(snapshot, part) is not MISSING:
+                fields.update(self._build_part(guild_id, part))
+        if fields:
+            self._snapshots[guild_id] = snapshot._replace(**fields)
+
+    @guild_synchronized
+    def _snapshot_part(self, guild_id: int, part: str) -> GuildSnapshot:
+        snapshot = self._snapshots.get(guild_id) or GuildSnapshot()
+        # The ranking is read together with the users it ranks
+        for needed in (('users', 'ranking') if part == 'ranking' else (part,)):
+            if getattr(snapshot, needed) is MISSING:
+                snapshot = snapshot._replace(**self._build_part(guild_id, needed))
+        self._snapshots[guild_id] = snapshot
+        return snapshot
+
+    @guild_synchronized
+    def _live_view(self, guild_id: int, part: str) -> GuildSnapshot:
+        if part in ('users', 'ranking'):
+            # Live records rather than frozen copies, so the caller sees its own changes
+            return GuildSnapshot(users=LiveUsers(self._load_server_data(guild_id, LEADERBOARD_FILE), RESERVED_KEYS),
+                                 ranking=self._rank_index(guild_id).ordering() if part == 'ranking' else MISSING)
+        return GuildSnapshot(**self._build_part(guild_id, part))
+
+    def _read_view(self, guild_id: int, part: str) -> GuildSnapshot:
+        """Latest published snapshot with `part` built, read without the guild lock.
+
+        A thread inside its own transaction or guild call gets a view of the
+        live cache instead, so it sees its uncommitted changes.
+        """
+        txn = self._transactions.get(guild_id)
+        if guild_id in self._held_guilds() or (txn is not None and txn['owner'] == threading.get_ident()):
+            return self._live_view(guild_id, part)
+        snapshot = self._snapshots.get(guild_id)
+        if snapshot is None or getattr(snapshot, part) is MISSING:
+            snapshot = self._snapshot_part(guild_id, part)
+        elif self.cache_budget:
+            self._touch_guild(guild_id)
+        return snapshot
+
+    def get_cache_stats(self) -> dict:
+        """Resident footprint (serialized size of cached files), evictions and reloads of evicted guilds"""
+        with self._lock:
+            return {
+                'resident_bytes': self._resident_bytes,
+                'resident_guilds': len(self.server_data),
+                'budget_bytes': self.cache_budget,
+                'evictions': self._evictions,
+                'reloads': self._reloads,
+            }
+
+    def get_write_stats(self) -> dict:
+        """Atomic file writes performed and writes coalesced into another one"""
+        with self._lock:
+            writers = [w for guild_writers in self._writers.values() for w in guild_writers.values()]
+        return {
+            'writes': sum(w.writes for w in writers),
+            'coalesced': sum(w.coalesced for w in writers),
+        }
+
     def _get_server_dir(self, guild_id: int) -> str:
         server_dir = os.path.join(self.data_dir, f'server_{guild_id}')
+        if guild_id in self._server_dirs:
+            return server_dir
         if not os.path.exists(server_dir):
             os.makedirs(server_dir, exist_ok=True)
             logger.debug(f"Created server directory | Guild: {guild_id}")
+        with self._lock:
+            self._server_dirs.add(guild_id)
         return server_dir
     
-    def _load_server_data(self, guild_id: int, filename: str):
+    def _read_server_file(self, guild_id: int, filename: str):
         server_dir = self._get_server_dir(guild_id)
         filepath = os.path.join(server_dir, filename)
 
         try:
             if os.path.exists(filepath):
-                with open(filepath, 'r') as f:
-                    data = json.load(f)
-                    logger.debug(f"Loaded {filename} | Guild: {guild_id}")
-                    return data
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON decode error in {filename} | Guild: {guild_id} | Error: {e}")
+                with open(filepath, 'rb') as f:
+                    payload = f.read()
+                # Any codec's output is accepted, so DATA_CODEC can change at any time
+                data = load_payload(payload)
+                self._note_resident(guild_id, filename, len(payload))
+                logger.debug(f"Loaded {filename} | Guild: {guild_id}")
+                return data
+        except ValueError as e:
+            # Keep the damaged file for inspection instead of overwriting it
+            # with empty data on the next save
+            corrupt_path = f"{filepath}.corrupt-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+            try:
+                os.replace(filepath, corrupt_path)
+            except OSError:
+                corrupt_path = filepath
+            logger.error(f"Decode error in {filename} | Guild: {guild_id} | Moved to: {corrupt_path} | Error: {e}")
         except Exception as e:
             logger.error(f"Error loading {filename} | Guild: {guild_id} | Error: {e}")
 
         logger.debug(f"File not found or error, returning empty data | {filename} | Guild: {guild_id}")
-        if filename == CHALLENGES_FILE:
-            return []
         return {}
     
-    def _save_server_data(self, guild_id: int, filename: str, data):
-        server_dir = self._get_server_dir(guild_id)
-        filepath = os.path.join(server_dir, filename)
+    def _stage_server_file(self, guild_id: int, filename: str, data):
+        """Serialize data for the file's writer; returns its generation (None on error)"""
+        try:
+            payload = self.serializer.dumps(data)
+            self._note_resident(guild_id, filename, len(payload))
+            return self._writer(guild_id, filename).stage(payload)
+        except Exception as e:
+            logger.error(f"Error saving {filename} | Guild: {guild_id} | Error: {e}")
+            self._retry_server_file(guild_id, filename)
+            return None
 
+    def _commit_server_file(self, guild_id: int, filename: str, generation: int) -> bool:
+        """Wait until generation, or a later one, is on disk; False if the write failed"""
         try:
-            with open(filepath, 'w') as f:
-                json.dump(data, f, indent=4)
-            logger.debug(f"Saved {filename} | Guild: {guild_id}")
+            if self._writer(guild_id, filename).commit(generation):
+                logger.debug(f"Saved {filename} | Guild: {guild_id}")
+            return True
         except Exception as e:
             logger.error(f"Error saving {filename} | Guild: {guild_id} | Error: {e}")
+            self._retry_server_file(guild_id, filename)
+            return False
+
+    def _retry_server_file(self, guild_id: int, filename: str):
+        # The dirty mark was taken before the write, so put it back for the next flush
+        with self._lock:
+            self._dirty.add((guild_id, filename))
+
+    def _write_server_file(self, guild_id: int, filename: str, data) -> bool:
+        """Atomically replace the file with data and wait until it is durable"""
+        generation = self._stage_server_file(guild_id, filename, data)
+        return generation is not None and self._commit_server_file(guild_id, filename, generation)
+    
+    @guild_synchronized
+    def _load_server_data(self, guild_id: int, filename: str):
+        guild_cache = self.server_data.get(guild_id)
+        if guild_cache is None:
+            guild_cache = self.server_data[guild_id] = {}
+            if guild_id in self._evicted:
+                with self._lock:
+                    self._evicted.discard(guild_id)
+                    self._reloads += 1
+        if filename not in guild_cache:
+            guild_cache[filename] = self._read_server_file(guild_id, filename)
+            if filename == LEADERBOARD_FILE:
+                self._migrate_weekly_xp(guild_id, guild_cache[filename])
+                self._replay_ledger(guild_id, guild_cache[filename])
+                if 'tickets' in guild_cache[filename]:
+                    self._migrate_legacy_tickets(guild_id, guild_cache[filename])
+            elif filename in (CHALLENGES_FILE, CHALLENGES_ARCHIVE_FILE):
+                self._migrate_nested_submissions(guild_id, filename, guild_cache[filename])
+                if filename == CHALLENGES_FILE:
+                    self._reconcile_submission_counts(guild_id, guild_cache[filename])
+        return guild_cache[filename]
+    
+    @guild_synchronized
+    def _save_server_data(self, guild_id: int, filename: str, data):
+        self.server_data.setdefault(guild_id, {})[filename] = data
+        if filename == CHALLENGES_FILE:
+            self._mark_unpublished(guild_id, 'active_challenge')
+        elif filename == HALL_OF_FAME_TOTALS_FILE:
+            self._mark_unpublished(guild_id, 'hall_of_fame_top')
+        with self._lock:
+            self._dirty.add((guild_id, filename))
+
+        if guild_id in self._transactions:
+            # Persisted once when the transaction commits
+            return
+        if self.flush_policy == FLUSH_IMMEDIATE:
+            if self.group_commit:
+                # Written when the outermost guild_synchronized call returns
+                self._defer_flush(guild_id)
+            else:
+                self.flush(guild_id)
+        elif self.flush_policy == FLUSH_DEBOUNCED:
+            self._schedule_flush()
+    
+    def _schedule_flush(self):
+        # The first change arms the timer; later changes ride along with it, so a
+        # burst of writes is persisted once and a steady stream cannot starve it
+        with self._lock:
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.flush_delay, self._debounced_flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+    
+    def _debounced_flush(self):
+        with self._lock:
+            self._flush_timer = None
+        self.flush()
+    
+    def _take_dirty(self, guild_id: int) -> list:
+        with self._lock:
+            pending = [key for key in self._dirty if key[0] == guild_id]
+            self._dirty.difference_update(pending)
+        return pending
+    
+    def _has_dirty(self, guild_id: int) -> bool:
+        with self._lock:
+            return any(key[0] == guild_id for key in self._dirty)
+    
+    def flush(self, guild_id: int = None):
+        """Write dirty cached files to disk (all guilds, or only guild_id)"""
+        if guild_id is None:
+            with self._lock:
+                guild_ids = {key[0] for key in self._dirty}
+            return sum(self.flush(gid) for gid in guild_ids)
+
+        # Snapshot under the guild lock, write after releasing it so other
+        # threads can keep changing the guild and share the next write
+        with self._guild_lock(guild_id):
+            pending = self._take_dirty(guild_id)
+            for _, filename in pending:
+                data = self.server_data[guild_id][filename]
+                if filename == LEADERBOARD_FILE:
+                    self._stamp_ledger_seq(guild_id, data)
+                generation = self._stage_server_file(guild_id, filename, data)
+                if generation is not None and not self.group_commit:
+                    self._commit_server_file(guild_id, filename, generation)
+            # Snapshots staged by other threads may carry this thread's changes
+            # (they took the dirty mark first), so wait for those too
+            with self._lock:
+                writers = dict(self._writers.get(guild_id, {}))
+            targets = [(filename, writer.staged_gen) for filename, writer in writers.items()]
+        if self.group_commit:
+            for filename, generation in targets:
+                self._commit_server_file(guild_id, filename, generation)
+        return len(pending)
+    
+    def close(self):
+        """Cancel any pending debounced flush and persist everything"""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            ledgers = dict(self._ledgers)
+        compacted = self.compact_ledgers()
+        flushed = self.flush()
+        for guild_id, ledger in ledgers.items():
+            with self._guild_lock(guild_id):
+                ledger.close()
+        stats = self.get_cache_stats()
+        logger.info(f"DataManager closed | Flushed {flushed} file(s) | Compacted {compacted} ledger(s) | "
+                    f"Evictions: {stats['evictions']} | Reloads: {stats['reloads']}")
+    
+    def _get_ledger(self, guild_id: int) -> XPLedger:
+        ledger = self._ledgers.get(guild_id)
+        if ledger is None:
+            path = os.path.join(self._get_server_dir(guild_id), XP_LEDGER_FILE)
+            with self._lock:
+                ledger = self._ledgers.setdefault(guild_id, XPLedger(path, fsync_batch=LEDGER_FSYNC_BATCH))
+        return ledger
+    
+    def _stamp_ledger_seq(self, guild_id: int, leaderboard: dict):
+        # Record which ledger events this snapshot already contains
+        leaderboard.setdefault(META_KEY, {})['ledger_seq'] = self._get_ledger(guild_id).last_seq
+    
+    def _replay_ledger(self, guild_id: int, leaderboard: dict):
+        """Apply ledger events newer than the snapshot's ledger_seq"""
+        ledger = self._get_ledger(guild_id)
+        snapshot_seq = leaderboard.get(META_KEY, {}).get('ledger_seq', 0)
+        ledger.last_seq = max(ledger.last_seq, snapshot_seq)
+
+        replayed = 0
+        for event in ledger.read_since(snapshot_seq):
+            self._apply_ledger_event(leaderboard, event)
+            replayed += 1
+        if replayed:
+            logger.info(f"Replayed {replayed} ledger event(s) | Snapshot seq: {snapshot_seq} | Guild: {guild_id}")
+    
+    def _migrate_weekly_xp(self, guild_id: int, leaderboard: dict):
+        """Convert legacy per-user {'week_N': xp} dicts to the compact weekly record"""
+        # Legacy files may still hold the 'tickets' list, moved out right after
+        migrated = sum(
+            migrate_weekly_xp(user) for user_id, user in leaderboard.items()
+            if user_id not in RESERVED_KEYS and isinstance(user, dict)
+        )
+        if migrated:
+            self._save_server_data(guild_id, LEADERBOARD_FILE, leaderboard)
+            logger.info(f"Weekly XP converted to compact format | Users: {migrated} | Guild: {guild_id}")
+
+    def _new_user(self, username: str) -> dict:
+        return {
+            'username': username,
+            'xp': 0,
+            'weeks': new_weeks(),
+            'total_xp': 0,
+            'badges': []
+        }
+    
+    def _apply_ledger_event(self, leaderboard: dict, event: dict):
+        user_id = event['user_id']
+        if user_id not in leaderboard:
+            # The user was created after the last snapshot; rebuild the record
+            leaderboard[user_id] = self._new_user(event.get('username', ''))
+        user = leaderboard[user_id]
+
+        if event['type'] == 'xp_add':
+            user['xp'] += event['amount']
+            user['total_xp'] += event['amount']
+            # Legacy 'week_N' keys are resolved against the time of the event
+            ts = datetime.fromisoformat(event['ts']) if 'ts' in event else None
+            add_week_xp(user, week_index(event['week'], ts), event['amount'])
+        elif event['type'] == 'xp_remove':
+            user['xp'] = max(0, user['xp'] - event['amount'])
+        elif event['type'] == 'badge':
+            badges = user.setdefault('badges', [])
+            if event['badge'] not in badges:
+                badges.append(event['badge'])
+    
+    def _record(self, guild_id: int, leaderboard: dict, event: dict):
+        """Append an XP event to the guild ledger and apply it to the cached leaderboard"""
+        self._mark_unpublished(guild_id, 'users', event['user_id'])
+        txn = self._transactions.get(guild_id)
+        if txn is not None:
+            # Applied now, appended to the ledger when the transaction commits
+            self._apply_ledger_event(leaderboard, event)
+            self._update_rank(guild_id, event['user_id'], leaderboard[event['user_id']]['xp'])
+            txn['events'].append(event)
+            return
+
+        ledger = self._get_ledger(guild_id)
+        self._apply_ledger_event(leaderboard, ledger.append(event))
+        self._update_rank(guild_id, event['user_id'], leaderboard[event['user_id']]['xp'])
+        if ledger.count >= LEDGER_COMPACT_EVENTS:
+            self.compact_ledger(guild_id)
+    
+    def _rank_index(self, guild_id: int) -> RankIndex:
+        """The guild's XP-ordered index, built from the cached leaderboard on first use"""
+        index = self._rank_indexes.get(guild_id)
+        if index is None:
+            leaderboard = self._load_server_data(guild_id, LEADERBOARD_FILE)
+            index = self._rank_indexes[guild_id] = RankIndex(
+                {k: v for k, v in leaderboard.items() if k not in RESERVED_KEYS}
+            )
+        return index
+    
+    def _update_rank(self, guild_id: int, user_id: str, xp: int):
+        # Indexes not built yet pick the change up when they are
+        index = self._rank_indexes.get(guild_id)
+        if index is not None:
+            index.update(user_id, xp)
+    
+    def _discard_guild(self, guild_id: int):
+        """Drop a guild's cached state so the next access reloads it from disk"""
+        self.server_data.pop(guild_id, None)
+        self._rank_indexes.pop(guild_id, None)
+        self._ticket_indexes.pop(guild_id, None)
+        self._ticket_archives.pop(guild_id, None)
+        self._snapshots.pop(guild_id, None)
+        self._unpublished.pop(guild_id, None)
+        self._take_dirty(guild_id)
+        with self._lock:
+            ledger = self._ledgers.pop(guild_id, None)
+            self._lru.pop(guild_id, None)
+            self._resident_bytes -= sum(self._resident.pop(guild_id, {}).values())
+        if ledger is not None:
+            ledger.close()
+    
+    @contextmanager
+    def transaction(self, guild_id: int):
+        """Apply several mutations to a guild with one load and one commit.
+
+        Files are loaded once, every change inside the block is applied to the
+        cache, and on exit the XP events are appended to the ledger in a single
+        write and each touched file is saved once. If the block raises, the
+        guild's cached state is discarded and reloaded from disk.
+        """
+        with self._guild_lock(guild_id):
+            txn = self._transactions.get(guild_id)
+            if txn is not None:
+                # Nested: fold into the outer transaction
+                yield self
+                return
+
+            # Rollback reloads from disk, so persist earlier unflushed changes first
+            self.flush(guild_id)
+            txn = self._transactions[guild_id] = {
+                'events': [], 'archived': [], 'submissions': [], 'owner': threading.get_ident()
+            }
+            try:
+                yield self
+            except BaseException:
+                del self._transactions[guild_id]
+                self._discard_guild(guild_id)
+                logger.warning(f"Transaction rolled back | Guild: {guild_id}")
+                raise
+            del self._transactions[guild_id]
+            self._commit(guild_id, txn)
+            self._publish(guild_id)
+    
+    def _commit(self, guild_id: int, txn: dict):
+        # Archive closed tickets and log submissions before the stores that
+        # reference them are saved
+        self._append_ticket_archive(guild_id, txn['archived'])
+        for challenge_id, submission_data in txn['submissions']:
+            self._append_submission_log(guild_id, challenge_id, [submission_data])
+        events = txn['events']
+        if events:
+            ledger = self._get_ledger(guild_id)
+            ledger.append_many(events)
+            ledger.sync()
+            if ledger.count >= LEDGER_COMPACT_EVENTS:
+                self.compact_ledger(guild_id)
+
+        if not self._has_dirty(guild_id):
+            return
+        if self.flush_policy == FLUSH_IMMEDIATE:
+            self.flush(guild_id)
+        elif self.flush_policy == FLUSH_DEBOUNCED:
+            self._schedule_flush()
+    
+    @guild_synchronized
+    def compact_ledger(self, guild_id: int, force: bool = False):
+        """Fold the guild's live ledger segment into a fresh leaderboard.json snapshot"""
+        ledger = self._ledgers.get(guild_id)
+        leaderboard = self.server_data.get(guild_id, {}).get(LEADERBOARD_FILE)
+        if ledger is None or leaderboard is None:
+            return False
+        with self._lock:
+            dirty = (guild_id, LEADERBOARD_FILE) in self._dirty
+            self._dirty.discard((guild_id, LEADERBOARD_FILE))
+        if not (force or ledger.count or dirty):
+            return False
+
+        ledger.sync()
+        self._stamp_ledger_seq(guild_id, leaderboard)
+        if not self._write_server_file(guild_id, LEADERBOARD_FILE, leaderboard):
+            # The ledger still holds the events; keep it until a snapshot lands
+            return False
+        events = ledger.count
+        ledger.rotate()
+        logger.debug(f"Compacted XP ledger | Events: {events} | Seq: {ledger.last_seq} | Guild: {guild_id}")
+        return True
+    
+    def compact_ledgers(self):
+        """Compact every loaded guild ledger; returns how many were compacted"""
+        with self._lock:
+            guild_ids = list(self._ledgers)
+        return sum(1 for guild_id in guild_ids if self.compact_ledger(guild_id))
     
     def get_month_key(self):
         now = datetime.now()
         return f"{now.year}-{now.month:02d}"
     
+    @guild_synchronized
     def ensure_user(self, guild_id: int, user_id: int, username: str):
+        """Create the user or refresh their username; saves only if something changed"""
         leaderboard = self._load_server_data(guild_id, LEADERBOARD_FILE)
         user_id = str(user_id)
         
         if user_id not in leaderboard:
-            leaderboard[user_id] = {
-                'username': username,
-                'xp': 0,
-                'weekly_xp': {},
-                'total_xp': 0,
-                'badges': []
-            }
-        else:
+            leaderboard[user_id] = self._new_user(username)
+            self._update_rank(guild_id, user_id, 0)
+        elif leaderboard[user_id]['username'] != username:
             leaderboard[user_id]['username'] = username
+        else:
+            return False
         
+        self._mark_unpublished(guild_id, 'users', user_id)
         self._save_server_data(guild_id, LEADERBOARD_FILE, leaderboard)
+        return True
     
-    def add_xp(self, guild_id: int, user_id: int, amount: int, week_key: str):
+    @guild_synchronized
+    def rename_user(self, guild_id: int, user_id: int, username: str):
+        """Refresh the username of an existing user; unknown users are ignored"""
+        leaderboard = self._load_server_data(guild_id, LEADERBOARD_FILE)
+        if str(user_id) not in leaderboard:
+            return False
+        return self.ensure_user(guild_id, user_id, username)
+    
+    @guild_synchronized
+    def add_xp(self, guild_id: int, user_id: int, amount: int, week_key: str, username: str = None):
+        """Grant XP; with username the user is created (or renamed) first if needed"""
+        if username is not None:
+            self.ensure_user(guild_id, user_id, username)
         leaderboard = self._load_server_data(guild_id, LEADERBOARD_FILE)
         user_id = str(user_id)
 
-        leaderboard[user_id]['xp'] += amount
-        leaderboard[user_id]['total_xp'] += amount
-
-        if week_key not in leaderboard[user_id]['weekly_xp']:
-            leaderboard[user_id]['weekly_xp'][week_key] = 0
-        leaderboard[user_id]['weekly_xp'][week_key] += amount
-
-        self._save_server_data(guild_id, LEADERBOARD_FILE, leaderboard)
+        self._record(guild_id, leaderboard, {
+            'type': 'xp_add',
+            'user_id': user_id,
+            'username': leaderboard[user_id]['username'],
+            'amount': amount,
+            # Stored with its year so the event replays into the same week
+            'week': format_week(week_index(week_key))
+        })
         logger.info(f"Added {amount} XP | User: {leaderboard[user_id]['username']} | Total: {leaderboard[user_id]['xp']} | Guild: {guild_id}")
     
+    @guild_synchronized
     def remove_xp(self, guild_id: int, user_id: int, amount: int):
         leaderboard = self._load_server_data(guild_id, LEADERBOARD_FILE)
         user_id = str(user_id)
         
         if user_id in leaderboard:
-            leaderboard[user_id]['xp'] = max(0, leaderboard[user_id]['xp'] - amount)
-            self._save_server_data(guild_id, LEADERBOARD_FILE, leaderboard)
+            self._record(guild_id, leaderboard, {'type': 'xp_remove', 'user_id': user_id, 'amount': amount})
     
+    @guild_synchronized
     def add_badge(self, guild_id: int, user_id: int, badge: str):
         leaderboard = self._load_server_data(guild_id, LEADERBOARD_FILE)
         user_id = str(user_id)
         
-        if user_id in leaderboard:
-            if 'badges' not in leaderboard[user_id]:
-                leaderboard[user_id]['badges'] = []
-            if badge not in leaderboard[user_id]['badges']:
-                leaderboard[user_id]['badges'].append(badge)
-            self._save_server_data(guild_id, LEADERBOARD_FILE, leaderboard)
+        if user_id in leaderboard and badge not in leaderboard[user_id].get('badges', []):
+            self._record(guild_id, leaderboard, {'type': 'badge', 'user_id': user_id, 'badge': badge})
     
     def get_user(self, guild_id: int, user_id: int):
-        leaderboard = self._load_server_data(guild_id, LEADERBOARD_FILE)
-        return leaderboard.get(str(user_id))
+        return self._read_view(guild_id, 'users').users.get(str(user_id))
     
+    @guild_synchronized
     def get_leaderboard(self, guild_id: int):
         leaderboard = self._load_server_data(guild_id, LEADERBOARD_FILE)
-        return {k: v for k, v in leaderboard.items() if k != 'tickets'}
+        return {k: v for k, v in leaderboard.items() if k not in RESERVED_KEYS}
     
     def get_user_rank(self, guild_id: int, user_id: int):
-        leaderboard_data = self.get_leaderboard(guild_id)
-        sorted_users = sorted(leaderboard_data.items(), key=lambda x: x[1]['xp'], reverse=True)
-        rank = next((i + 1 for i, (uid, _) in enumerate(sorted_users) if uid == str(user_id)), 0)
-        return rank
+        return self._read_view(guild_id, 'ranking').rank(str(user_id))
+    
+    def get_top_users(self, guild_id: int, limit: int = 10, offset: int = 0):
+        """[(user_id, user_data)] ranked offset+1 .. offset+limit by XP"""
+        return self._read_view(guild_id, 'ranking').top(limit, offset)
+    
+    def get_user_count(self, guild_id: int):
+        return len(self._read_view(guild_id, 'users').users)
     
     def get_user_streak(self, guild_id: int, user_id: int):
         user = self.get_user(guild_id, user_id)
         if not user:
             return 0
-        return len(user.get('weekly_xp', {}))
+        return current_streak(user)
     
+    def _hall_of_fame(self, guild_id: int) -> dict:
+        """Compact hall_of_fame.json, converting the legacy layout on first load.
+
+        {'usernames': {user_id: name}, 'months': {month_key: {user_id: xp}},
+         'archived': [month_key, ...]} - only months with XP are kept, older
+        months live in gzip files under HALL_OF_FAME_ARCHIVE_DIR.
+        """
+        hall_of_fame = self._load_server_data(guild_id, HALL_OF_FAME_FILE)
+        if 'months' not in hall_of_fame:
+            legacy = dict(hall_of_fame)
+            hall_of_fame.clear()
+            hall_of_fame.update({'usernames': {}, 'months': {}, 'archived': []})
+            for month_key, users in legacy.items():
+                self._store_hall_of_fame_month(hall_of_fame, month_key, users)
+            self._archive_hall_of_fame_months(guild_id, hall_of_fame)
+            self._save_server_data(guild_id, HALL_OF_FAME_FILE, hall_of_fame)
+            if legacy:
+                logger.info(f"Hall of Fame converted to compact format | Months: {len(legacy)} | Guild: {guild_id}")
+        return hall_of_fame
+
+    def _store_hall_of_fame_month(self, hall_of_fame: dict, month_key: str, users: dict):
+        """Snapshot {user_id: record} as {user_id: xp}, dropping users without XP"""
+        month = {}
+        for user_id, data in users.items():
+            if data.get('xp', 0):
+                month[user_id] = data['xp']
+                hall_of_fame['usernames'][user_id] = data.get('username', '')
+        hall_of_fame['months'][month_key] = month
+
+    def _hall_of_fame_archive_path(self, guild_id: int, month_key: str) -> str:
+        return os.path.join(self._get_server_dir(guild_id), HALL_OF_FAME_ARCHIVE_DIR, f'{month_key}.json.gz')
+
+    def _archive_hall_of_fame_months(self, guild_id: int, hall_of_fame: dict):
+        """Move all but the most recent months out to their own gzip files"""
+        months = hall_of_fame['months']
+        old_months = sorted(months)[:-HALL_OF_FAME_RECENT_MONTHS]
+        if not old_months:
+            return
+        usernames = hall_of_fame['usernames']
+        os.makedirs(os.path.join(self._get_server_dir(guild_id), HALL_OF_FAME_ARCHIVE_DIR), exist_ok=True)
+        for month_key in old_months:
+            month = months[month_key]
+            archive = {'usernames': {user_id: usernames.get(user_id, '') for user_id in month}, 'xp': month}
+            with gzip.open(self._hall_of_fame_archive_path(guild_id, month_key), 'wt', encoding='utf-8') as f:
+                json.dump(archive, f, separators=(',', ':'))
+            del months[month_key]
+            if month_key not in hall_of_fame['archived']:
+                hall_of_fame['archived'].append(month_key)
+        # Only names still referenced by an in-file month stay interned
+        live = set().union(*months.values()) if months else set()
+        hall_of_fame['usernames'] = {user_id: name for user_id, name in usernames.items() if user_id in live}
+        logger.info(f"Hall of Fame months archived | Months: {', '.join(old_months)} | Guild: {guild_id}")
+
+    def _read_hall_of_fame_archive(self, guild_id: int, month_key: str) -> dict:
+        path = self._hall_of_fame_archive_path(guild_id, month_key)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                archive = json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading Hall of Fame archive {month_key} | Guild: {guild_id} | Error: {e}")
+            return {}
+        names = archive['usernames']
+        return {user_id: {'username': names.get(user_id, ''), 'xp': xp} for user_id, xp in archive['xp'].items()}
+
+    @guild_synchronized
+    def get_hall_of_fame_months(self, guild_id: int):
+        hall_of_fame = self._hall_of_fame(guild_id)
+        return sorted(set(hall_of_fame['archived']) | set(hall_of_fame['months']))
+
+    @guild_synchronized
+    def get_hall_of_fame_month(self, guild_id: int, month_key: str):
+        """{user_id: {'username', 'xp'}} for one month; archived months are read from disk"""
+        hall_of_fame = self._hall_of_fame(guild_id)
+        if month_key in hall_of_fame['months']:
+            usernames = hall_of_fame['usernames']
+            return {user_id: {'username': usernames.get(user_id, ''), 'xp': xp}
+                    for user_id, xp in hall_of_fame['months'][month_key].items()}
+        if month_key in hall_of_fame['archived']:
+            return self._read_hall_of_fame_archive(guild_id, month_key)
+        return {}
+
+    @guild_synchronized
     def get_hall_of_fame(self, guild_id: int):
-        return self._load_server_data(guild_id, HALL_OF_FAME_FILE)
+        """Every month, archived ones included; prefer get_hall_of_fame_month"""
+        return {month_key: self.get_hall_of_fame_month(guild_id, month_key)
+                for month_key in self.get_hall_of_fame_months(guild_id)}
     
-    def reset_monthly_leaderboard(self, guild_id: int):
-        month_key = self.get_month_key()
+    def _apply_hall_of_fame_month(self, totals: dict, month: dict):
+        """Add one archived month's XP to the all-time totals"""
+        users = totals['users']
+        for user_id, data in month.items():
+            entry = users.setdefault(user_id, {'username': data.get('username', ''), 'total_xp': 0})
+            entry['username'] = data.get('username', entry['username'])
+            entry['total_xp'] += data.get('xp', 0)
+
+    def _rebuild_hall_of_fame_top(self, totals: dict):
+        users = totals['users']
+        ranked = heapq.nsmallest(HALL_OF_FAME_TOP_K, users, key=lambda user_id: (-users[user_id]['total_xp'], user_id))
+        totals['top'] = ranked
+
+    def _hall_of_fame_totals(self, guild_id: int) -> dict:
+        """All-time totals, backfilled from the monthly archive the first time"""
+        totals = self._load_server_data(guild_id, HALL_OF_FAME_TOTALS_FILE)
+        if 'users' not in totals:
+            hall_of_fame = self.get_hall_of_fame(guild_id)
+            totals.update({'users': {}, 'top': []})
+            for month in hall_of_fame.values():
+                self._apply_hall_of_fame_month(totals, month)
+            self._rebuild_hall_of_fame_top(totals)
+            self._save_server_data(guild_id, HALL_OF_FAME_TOTALS_FILE, totals)
+            logger.info(f"Hall of Fame totals backfilled | Months: {len(hall_of_fame)} | Users: {len(totals['users'])} | Guild: {guild_id}")
+        return totals
+
+    def get_hall_of_fame_top(self, guild_id: int, limit: int = 10):
+        """[(user_id, {'username', 'total_xp'})] for the all-time top `limit`"""
+        if limit <= HALL_OF_FAME_TOP_K:
+            return [(user_id, dict(entry)) for user_id, entry in
+                    self._read_view(guild_id, 'hall_of_fame_top').hall_of_fame_top[:limit]]
+        return self._hall_of_fame_ranking(guild_id, limit)
+
+    @guild_synchronized
+    def _hall_of_fame_ranking(self, guild_id: int, limit: int):
+        # Deeper than the precomputed top list: rank every user
+        totals = self._hall_of_fame_totals(guild_id)
+        users = totals['users']
+        ranked = heapq.nsmallest(limit, users, key=lambda user_id: (-users[user_id]['total_xp'], user_id))
+        return [(user_id, dict(users[user_id])) for user_id in ranked]
+
+    @guild_synchronized
+    def reset_monthly_leaderboard(self, guild_id: int, month_key: str = None, once: bool = False):
+        """Add month XP to the Hall of Fame as month_key (default: this month) and zero it.
+
+        Resetting a month again adds to its snapshot, so XP earned after a
+        /resetmonth is archived next to what that reset took. once=True is for
+        the automatic job: a guild it already reset for month_key is left alone
+        and False is returned. Resets without once (/resetmonth) are not recorded.
+        """
+        month_key = month_key or self.get_month_key()
         leaderboard = self._load_server_data(guild_id, LEADERBOARD_FILE)
-        hall_of_fame = self._load_server_data(guild_id, HALL_OF_FAME_FILE)
+        if once and leaderboard.get(META_KEY, {}).get('reset_month') == month_key:
+            logger.info(f"Monthly reset already done | Month: {month_key} | Guild: {guild_id}")
+            return False
+        totals = self._hall_of_fame_totals(guild_id)
+        hall_of_fame = self._hall_of_fame(guild_id)
 
-        leaderboard_data = {k: v for k, v in leaderboard.items() if k != 'tickets'}
+        leaderboard_data = {k: v for k, v in leaderboard.items() if k not in RESERVED_KEYS}
         user_count = len(leaderboard_data)
-        hall_of_fame[month_key] = dict(leaderboard_data)
-        self._save_server_data(guild_id, HALL_OF_FAME_FILE, hall_of_fame)
+        earned = {user_id: {'username': data.get('username', ''), 'xp': data['xp']}
+                  for user_id, data in leaderboard_data.items() if data.get('xp', 0)}
+        # The Hall of Fame files are written before the zeroed XP, so each
+        # records how many resets it holds; a reset redone after a crash in
+        # between skips the files that already have its XP
+        resets = leaderboard.get(META_KEY, {}).get('resets', 0)
+        if hall_of_fame.get('resets', 0) <= resets:
+            month = self.get_hall_of_fame_month(guild_id, month_key)
+            for user_id, data in earned.items():
+                entry = month.setdefault(user_id, {'username': data['username'], 'xp': 0})
+                entry['username'] = data['username']
+                entry['xp'] += data['xp']
+            self._store_hall_of_fame_month(hall_of_fame, month_key, month)
+            if month_key in hall_of_fame['archived']:
+                hall_of_fame['archived'].remove(month_key)
+            self._archive_hall_of_fame_months(guild_id, hall_of_fame)
+            hall_of_fame['resets'] = resets + 1
+            self._save_server_data(guild_id, HALL_OF_FAME_FILE, hall_of_fame)
+        if totals.get('resets', 0) <= resets:
+            self._apply_hall_of_fame_month(totals, earned)
+            self._rebuild_hall_of_fame_top(totals)
+            totals['resets'] = resets + 1
+            self._save_server_data(guild_id, HALL_OF_FAME_TOTALS_FILE, totals)
+        self.flush(guild_id)
 
         for user_id in leaderboard_data:
             leaderboard[user_id]['xp'] = 0
+        # Everyone is tied at 0 now; rebuild the index on next use
+        self._rank_indexes.pop(guild_id, None)
+        self._mark_unpublished(guild_id, 'users')
+        leaderboard.setdefault(META_KEY, {})['resets'] = resets + 1
+        if once:
+            # Only the automatic job's runs count as done: a manual reset
+            # mid-month must not make the month-end reset skip the guild.
+            # Lands in the same snapshot as the zeroed XP, so a crash before
+            # it leaves the month to be redone rather than archived twice
+            leaderboard.setdefault(META_KEY, {})['reset_month'] = month_key
 
-        self._save_server_data(guild_id, LEADERBOARD_FILE, leaderboard)
+        # The reset is not a ledger event, so snapshot it right away to keep
+        # later ledger events from being replayed onto pre-reset data
+        self.compact_ledger(guild_id, force=True)
         logger.info(f"Monthly leaderboard reset | Month: {month_key} | Users: {user_count} | Guild: {guild_id}")
+        return True
     
+    def _challenge_store(self, guild_id: int) -> dict:
+        """Challenges that are not closed, keyed by id, plus the active/latest pointers.
+
+        {'next_id': int, 'active_id': int | None, 'latest_id': int | None,
+         'challenges': {str(id): challenge}} - closed challenges live in
+        CHALLENGES_ARCHIVE_FILE, which is only read when one is asked for.
+        """
+        store = self._load_server_data(guild_id, CHALLENGES_FILE)
+        if isinstance(store, list):
+            legacy = store
+            store = {
+                'next_id': max((c['id'] for c in legacy), default=0) + 1,
+                'active_id': None,
+                'latest_id': legacy[-1]['id'] if legacy else None,
+                'challenges': {str(c['id']): c for c in legacy if c.get('status') != 'closed'}
+            }
+            store['active_id'] = self._find_active_challenge(store)
+            closed = [c for c in legacy if c.get('status') == 'closed']
+            if closed:
+                archive = self._load_server_data(guild_id, CHALLENGES_ARCHIVE_FILE)
+                archive.update({str(c['id']): c for c in closed})
+                self._write_server_file(guild_id, CHALLENGES_ARCHIVE_FILE, archive)
+            self._save_server_data(guild_id, CHALLENGES_FILE, store)
+            logger.info(f"Challenges converted to id-keyed format | Open: {len(store['challenges'])} | Archived: {len(closed)} | Guild: {guild_id}")
+        elif 'next_id' not in store:
+            store.update({'next_id': 1, 'active_id': None, 'latest_id': None, 'challenges': {}})
+        return store
+
+    def _find_active_challenge(self, store: dict):
+        # Scans only challenges that are not closed, usually one or two
+        active = [c['id'] for c in store['challenges'].values() if c.get('status') == 'active']
+        return max(active, default=None)
+
+    def _archive_challenge(self, guild_id: int, challenge: dict):
+        """Write a closed challenge to the archive.
+
+        The archive is written through before the store drops the challenge,
+        and lookups prefer the store, so a crash in between leaves a harmless
+        duplicate rather than a lost challenge.
+        """
+        archive = self._load_server_data(guild_id, CHALLENGES_ARCHIVE_FILE)
+        archive[str(challenge['id'])] = challenge
+        self._write_server_file(guild_id, CHALLENGES_ARCHIVE_FILE, archive)
+
+    def _all_challenges(self, guild_id: int) -> list:
+        """Open and archived challenges in id order"""
+        store = self._challenge_store(guild_id)
+        challenges = dict(self._load_server_data(guild_id, CHALLENGES_ARCHIVE_FILE))
+        challenges.update(store['challenges'])
+        return sorted(challenges.values(), key=lambda c: c['id'])
+
+    @guild_synchronized
     def create_challenge(self, guild_id: int, challenge_data: dict):
-        challenges = self._load_server_data(guild_id, CHALLENGES_FILE)
-        challenge_id = len(challenges) + 1
+        store = self._challenge_store(guild_id)
+        challenge_id = store['next_id']
+        store['next_id'] += 1
         challenge_data['id'] = challenge_id
         challenge_data['guild_id'] = guild_id
-        challenges.append(challenge_data)
-        self._save_server_data(guild_id, CHALLENGES_FILE, challenges)
+        submissions = challenge_data.pop('submissions', [])
+        if submissions:
+            self._append_submission_log(guild_id, challenge_id, submissions, mode='w')
+        challenge_data['submission_count'] = len(submissions)
+        store['challenges'][str(challenge_id)] = challenge_data
+        store['latest_id'] = challenge_id
+        if challenge_data.get('status') == 'active':
+            store['active_id'] = challenge_id
+        self._save_server_data(guild_id, CHALLENGES_FILE, store)
         logger.info(f"Challenge created | ID: {challenge_id} | Difficulty: {challenge_data.get('difficulty', 'N/A')} | Guild: {guild_id}")
         return challenge_id
     
+    @guild_synchronized
     def update_challenge(self, guild_id: int, challenge_id: int, updates: dict):
-        challenges = self._load_server_data(guild_id, CHALLENGES_FILE)
-        for challenge in challenges:
-            if challenge['id'] == challenge_id:
-                challenge.update(updates)
-                self._save_server_data(guild_id, CHALLENGES_FILE, challenges)
+        store = self._challenge_store(guild_id)
+        key = str(challenge_id)
+        challenge = store['challenges'].get(key)
+        if challenge is None:
+            archive = self._load_server_data(guild_id, CHALLENGES_ARCHIVE_FILE)
+            challenge = archive.get(key)
+            if challenge is None:
+                return False
+            challenge.update(updates)
+            if challenge.get('status') == 'closed':
+                self._write_server_file(guild_id, CHALLENGES_ARCHIVE_FILE, archive)
                 return True
-        return False
+            # Reopened: back into the live store
+            store['challenges'][key] = challenge
+        else:
+            challenge.update(updates)
+            if challenge.get('status') == 'closed':
+                self._archive_challenge(guild_id, challenge)
+                del store['challenges'][key]
+
+        store['active_id'] = self._find_active_challenge(store)
+        self._save_server_data(guild_id, CHALLENGES_FILE, store)
+        return True
     
     def get_active_challenge(self, guild_id: int):
-        challenges = self._load_server_data(guild_id, CHALLENGES_FILE)
-        for challenge in reversed(challenges):
-            if challenge.get('status') == 'active':
-                return challenge
-        return None
+        return self._read_view(guild_id, 'active_challenge').active_challenge
+
+    def _active_challenge(self, guild_id: int):
+        store = self._challenge_store(guild_id)
+        if store['active_id'] is None:
+            return None
+        return store['challenges'][str(store['active_id'])]
     
+    @guild_synchronized
     def get_latest_challenge(self, guild_id: int):
-        challenges = self._load_server_data(guild_id, CHALLENGES_FILE)
-        return challenges[-1] if challenges else None
+        store = self._challenge_store(guild_id)
+        if store['latest_id'] is None:
+            return None
+        return self.get_challenge_by_id(guild_id, store['latest_id'])
     
+    @guild_synchronized
     def get_challenge_by_id(self, guild_id: int, challenge_id: int):
-        challenges = self._load_server_data(guild_id, CHALLENGES_FILE)
-        for challenge in challenges:
-            if challenge['id'] == challenge_id:
-                return challenge
-        return None
-    
-    def add_submission(self, guild_id: int, challenge_id: int, submission_data: dict):
-        challenges = self._load_server_data(guild_id, CHALLENGES_FILE)
-        for challenge in challenges:
-            if challenge['id'] == challenge_id:
-                if 'submissions' not in challenge:
-                    challenge['submissions'] = []
-                challenge['submissions'].append(submission_data)
-                self._save_server_data(guild_id, CHALLENGES_FILE, challenges)
-                return True
-        return False
+        challenge = self._challenge_store(guild_id)['challenges'].get(str(challenge_id))
+        if challenge is None:
+            challenge = self._load_server_data(guild_id, CHALLENGES_ARCHIVE_FILE).get(str(challenge_id))
+        return challenge
+    
+    def _submission_log_path(self, guild_id: int, challenge_id: int) -> str:
+        return os.path.join(self._get_server_dir(guild_id), SUBMISSIONS_DIR, f'challenge_{challenge_id}.jsonl')
+
+    def _append_submission_log(self, guild_id: int, challenge_id: int, submissions: list, mode: str = 'a'):
+        path = self._submission_log_path(guild_id, challenge_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, mode, encoding='utf-8') as f:
+            f.write(''.join(json.dumps(s, separators=(',', ':')) + '\n' for s in submissions))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _count_submission_log(self, guild_id: int, challenge_id: int) -> int:
+        try:
+            with open(self._submission_log_path(guild_id, challenge_id), 'rb') as f:
+                return sum(1 for line in f if line.strip())
+        except FileNotFoundError:
+            return 0
+
+    def _reconcile_submission_counts(self, guild_id: int, store):
+        """Recount open challenges' submissions from their logs.
+
+        A submission's log line is fsynced before challenges.json is saved, so
+        a crash in between leaves submission_count short; the log wins.
+        """
+        if not isinstance(store, dict):
+            return
+        fixed = 0
+        for challenge in store.get('challenges', {}).values():
+            count = self._count_submission_log(guild_id, challenge['id'])
+            if count != challenge.get('submission_count', 0):
+                logger.warning(f"Submission count out of step with its log | Challenge: {challenge['id']} | "
+                               f"Stored: {challenge.get('submission_count', 0)} | Log: {count} | Guild: {guild_id}")
+                challenge['submission_count'] = count
+                fixed += 1
+        if fixed:
+            self._save_server_data(guild_id, CHALLENGES_FILE, store)
+
+    def _migrate_nested_submissions(self, guild_id: int, filename: str, data):
+        """Move legacy challenge['submissions'] lists into per-challenge logs"""
+        if isinstance(data, list):
+            challenges = data
+        elif filename == CHALLENGES_FILE:
+            challenges = data.get('challenges', {}).values()
+        else:
+            challenges = data.values()
+        nested = [c for c in challenges if 'submissions' in c]
+        if not nested:
+            return
+        for challenge in nested:
+            submissions = challenge.pop('submissions')
+            # Overwrite: the nested list stays authoritative until this file is saved
+            self._append_submission_log(guild_id, challenge['id'], submissions, mode='w')
+            challenge['submission_count'] = len(submissions)
+        self._save_server_data(guild_id, filename, data)
+        logger.info(f"Submissions moved to per-challenge logs | File: {filename} | Challenges: {len(nested)} | Guild: {guild_id}")
+
+    @guild_synchronized
+    def add_submission(self, guild_id: int, challenge_id: int, submission_data):
+        """Store a submission and return its 1-based position, or False for an unknown challenge.
+
+        submission_data may be a function of the position returning the dict
+        to store, for records that depend on who came first.
+        """
+        store = self._challenge_store(guild_id)
+        challenge = store['challenges'].get(str(challenge_id))
+        filename = CHALLENGES_FILE
+        if challenge is None:
+            store = self._load_server_data(guild_id, CHALLENGES_ARCHIVE_FILE)
+            challenge = store.get(str(challenge_id))
+            filename = CHALLENGES_ARCHIVE_FILE
+            if challenge is None:
+                return False
+
+        position = challenge.get('submission_count', 0) + 1
+        if callable(submission_data):
+            submission_data = submission_data(position)
+        txn = self._transactions.get(guild_id)
+        if txn is not None:
+            txn['submissions'].append((challenge_id, submission_data))
+        else:
+            self._append_submission_log(guild_id, challenge_id, [submission_data])
+        challenge['submission_count'] = position
+        self._save_server_data(guild_id, filename, store)
+        return position
+
+    def iter_submissions(self, guild_id: int, challenge_id: int):
+        """Stream a challenge's submissions from its log, oldest first"""
+        path = self._submission_log_path(guild_id, challenge_id)
+        if not os.path.exists(path):
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping unreadable submission line | Challenge: {challenge_id} | Line: {line_no} | Guild: {guild_id}")
     
+    def _migrate_legacy_tickets(self, guild_id: int, leaderboard: dict):
+        """Move tickets stored under leaderboard['tickets'] into the ticket store"""
+        legacy = leaderboard.pop('tickets')
+        store = self._load_server_data(guild_id, TICKETS_FILE)
+        if 'next_id' not in store:
+            live = [t for t in legacy if t.get('status') != 'closed']
+            closed = [t for t in legacy if t.get('status') == 'closed']
+            store.update({
+                'next_id': max((t['id'] for t in legacy), default=0) + 1,
+                'tickets': {str(t['id']): t for t in live}
+            })
+            self._append_ticket_archive(guild_id, closed)
+            # Written straight away: the leaderboard copy is dropped below
+            self._write_server_file(guild_id, TICKETS_FILE, store)
+            logger.info(f"Tickets moved out of {LEADERBOARD_FILE} | Open: {len(live)} | Archived: {len(closed)} | Guild: {guild_id}")
+        self._save_server_data(guild_id, LEADERBOARD_FILE, leaderboard)
+
+    def _ticket_store(self, guild_id: int) -> dict:
+        """{'next_id': int, 'tickets': {str(id): ticket}} holding tickets that are not closed"""
+        # Loading the leaderboard migrates any legacy tickets first
+        self._load_server_data(guild_id, LEADERBOARD_FILE)
+        store = self._load_server_data(guild_id, TICKETS_FILE)
+        if 'next_id' not in store:
+            store.update({'next_id': 1, 'tickets': {}})
+        return store
+
+    def _ticket_index(self, guild_id: int) -> TicketIndex:
+        index = self._ticket_indexes.get(guild_id)
+        if index is None:
+            store = self._ticket_store(guild_id)
+            index = self._ticket_indexes[guild_id] = TicketIndex(store['tickets'].values())
+        return index
+
+    def _archive_tickets(self, guild_id: int, tickets: list):
+        txn = self._transactions.get(guild_id)
+        if txn is not None:
+            # Written when the transaction commits
+            txn['archived'].extend(tickets)
+        else:
+            self._append_ticket_archive(guild_id, tickets)
+
+    def _append_ticket_archive(self, guild_id: int, tickets: list):
+        if not tickets:
+            return
+        path = os.path.join(self._get_server_dir(guild_id), TICKETS_ARCHIVE_FILE)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(t, separators=(',', ':')) + '\n' for t in tickets))
+            f.flush()
+            os.fsync(f.fileno())
+        archive = self._ticket_archives.get(guild_id)
+        if archive is not None:
+            for ticket in tickets:
+                archive.setdefault(ticket['challenge_id'], {})[ticket['id']] = ticket
+
+    def _ticket_archive(self, guild_id: int) -> dict:
+        """Closed tickets as {challenge_id: {ticket_id: ticket}}, read on first use"""
+        archive = self._ticket_archives.get(guild_id)
+        if archive is None:
+            archive = {}
+            path = os.path.join(self._get_server_dir(guild_id), TICKETS_ARCHIVE_FILE)
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line_no, line in enumerate(f, 1):
+                        if not line.strip():
+                            continue
+                        try:
+                            ticket = json.loads(line)
+                        except json.JSONDecodeError:
+                            logger.warning(f"Skipping unreadable ticket archive line | Guild: {guild_id} | Line: {line_no}")
+                            continue
+                        archive.setdefault(ticket['challenge_id'], {})[ticket['id']] = ticket
+            self._ticket_archives[guild_id] = archive
+        return archive
+
+    @guild_synchronized
     def create_ticket(self, guild_id: int, ticket_data: dict):
-        leaderboard = self._load_server_data(guild_id, LEADERBOARD_FILE)
-        if 'tickets' not in leaderboard:
-            leaderboard['tickets'] = []
-        ticket_id = len(leaderboard['tickets']) + 1
+        store = self._ticket_store(guild_id)
+        ticket_id = store['next_id']
+        store['next_id'] += 1
         ticket_data['id'] = ticket_id
         ticket_data['guild_id'] = guild_id
-        leaderboard['tickets'].append(ticket_data)
-        self._save_server_data(guild_id, LEADERBOARD_FILE, leaderboard)
+        store['tickets'][str(ticket_id)] = ticket_data
+        self._ticket_index(guild_id).add(ticket_data)
+        self._save_server_data(guild_id, TICKETS_FILE, store)
         return ticket_id
     
+    @guild_synchronized
     def update_ticket(self, guild_id: int, ticket_id: int, updates: dict):
-        leaderboard = self._load_server_data(guild_id, LEADERBOARD_FILE)
-        if 'tickets' not in leaderboard:
+        store = self._ticket_store(guild_id)
+        ticket = store['tickets'].get(str(ticket_id))
+        if ticket is None:
             return False
-        for ticket in leaderboard['tickets']:
-            if ticket['id'] == ticket_id:
-                ticket.update(updates)
-                self._save_server_data(guild_id, LEADERBOARD_FILE, leaderboard)
-                return True
-        return False
+        index = self._ticket_index(guild_id)
+        index.remove(ticket)
+        ticket.update(updates)
+        if ticket['status'] == 'closed':
+            # Closed tickets leave the live store for the append-only archive
+            self._archive_tickets(guild_id, [ticket])
+            del store['tickets'][str(ticket_id)]
+        else:
+            index.add(ticket)
+        self._save_server_data(guild_id, TICKETS_FILE, store)
+        return True
     
+    @guild_synchronized
     def get_user_ticket(self, guild_id: int, user_id: int, challenge_id: int):
-        leaderboard = self._load_server_data(guild_id, LEADERBOARD_FILE)
-        if 'tickets' not in leaderboard:
+        ticket_id = self._ticket_index(guild_id).find(user_id, challenge_id, 'open')
+        if ticket_id is None:
             return None
-        for ticket in leaderboard['tickets']:
-            if (ticket['user_id'] == user_id and 
-                ticket['challenge_id'] == challenge_id and 
-                ticket['status'] == 'open'):
-                return ticket
-        return None
+        return self._ticket_store(guild_id)['tickets'][str(ticket_id)]
     
+    @guild_synchronized
     def get_ticket_by_channel(self, guild_id: int, channel_id: int):
-        leaderboard = self._load_server_data(guild_id, LEADERBOARD_FILE)
-        if 'tickets' not in leaderboard:
+        """The ticket of a channel, as long as the ticket is not closed"""
+        ticket_id = self._ticket_index(guild_id).by_channel(channel_id)
+        if ticket_id is None:
             return None
-        for ticket in leaderboard['tickets']:
-            if ticket['channel_id'] == channel_id:
-                return ticket
-        return None
+        return self._ticket_store(guild_id)['tickets'][str(ticket_id)]
     
+    @guild_synchronized
     def get_tickets_by_challenge(self, guild_id: int, challenge_id: int):
-        leaderboard = self._load_server_data(guild_id, LEADERBOARD_FILE)
-        if 'tickets' not in leaderboard:
-            return []
-        return [t for t in leaderboard['tickets'] if t['challenge_id'] == challenge_id]
\ No newline at end of file
+        """Every ticket of a challenge, closed ones included, in id order"""
+        live = self._ticket_store(guild_id)['tickets']
+        tickets = {ticket_id: live[str(ticket_id)] for ticket_id in self._ticket_index(guild_id).by_challenge(challenge_id)}
+        for ticket_id, ticket in self._ticket_archive(guild_id).get(challenge_id, {}).items():
+            # A crash between archiving and saving the store leaves both copies; the live one wins
+            tickets.setdefault(ticket_id, ticket)
+        return [tickets[ticket_id] for ticket_id in sorted(tickets)]
@@ -1,5 +1,6 @@
 import discord
 from datetime import datetime
+from utils.weekly_xp import weeks_participated, current_streak
 
 def create_challenge_embed(title, description, difficulty, week, posted_by):
     color_map = {
@@ -85,8 +86,8 @@ def create_stats_embed(user_data, rank, discord_user):
     badges = user_data.get('badges', [])
     embed.add_field(name='Badges Earned', value=str(len(badges)), inline=True)
     
-    weekly_xp = user_data.get('weekly_xp', {})
-    embed.add_field(name='Weeks Participated', value=str(len(weekly_xp)), inline=True)
+    embed.add_field(name='Weeks Participated', value=str(weeks_participated(user_data)), inline=True)
+    embed.add_field(name='Week Streak', value=f'🔥 {current_streak(user_data)}', inline=True)
     
     if discord_user.avatar:
         embed.set_thumbnail(url=discord_user.avatar.url)
@@ -0,0 +1,85 @@
+import os
+import threading
+import time
+
+
+def atomic_write(path: str, payload: bytes):
+    """Replace path with payload so readers see either the old or the new file, never a torn one"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(os.path.dirname(path))
+
+
+def _fsync_dir(path: str):
+    # Persists the rename itself; directories cannot be opened for fsync on Windows
+    if os.name != 'posix':
+        return
+    fd = os.open(path or '.', os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class GroupCommitWriter:
+    """Coalesces concurrent writes of one file into as few atomic writes as possible.
+
+    ``stage()`` records the newest payload and returns its generation;
+    ``commit()`` returns once that generation is on disk. One caller at a time
+    writes, always the newest staged payload, and everyone whose generation
+    it covered is woken without touching the disk. An optional window lets
+    the writer wait for more changes before writing.
+    """
+
+    def __init__(self, path: str, window: float = 0.0):
+        self.path = path
+        self.window = window
+        self.written_gen = 0
+        self.writes = 0
+        self.coalesced = 0
+        self._staged_gen = 0
+        self._payload = None
+        self._writing = False
+        self._cond = threading.Condition()
+
+    @property
+    def staged_gen(self) -> int:
+        with self._cond:
+            return self._staged_gen
+
+    def stage(self, payload: bytes) -> int:
+        with self._cond:
+            self._staged_gen += 1
+            self._payload = payload
+            return self._staged_gen
+
+    def commit(self, generation: int) -> bool:
+        """Make generation durable; returns False if another write covered it"""
+        with self._cond:
+            while self._writing and self.written_gen < generation:
+                self._cond.wait()
+            if self.written_gen >= generation:
+                self.coalesced += 1
+                return False
+            self._writing = True
+
+        written = None
+        try:
+            if self.window:
+                time.sleep(self.window)
+            with self._cond:
+                generation, payload = self._staged_gen, self._payload
+            atomic_write(self.path, payload)
+            written = generation
+        finally:
+            with self._cond:
+                self._writing = False
+                if written is not None:
+                    self.written_gen = written
+                    self.writes += 1
+                self._cond.notify_all()
+        return True
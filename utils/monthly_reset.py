@@ -0,0 +1,117 @@
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from utils.constants import DATA_DIR, MONTHLY_RESET_STATE_FILE, MONTHLY_RESET_CONCURRENCY
+from utils.file_writer import atomic_write
+from utils.logger import get_logger
+
+logger = get_logger("monthly_reset")
+
+
+def next_month_start(now: datetime = None) -> datetime:
+    """Midnight of the first day of the month after `now`"""
+    now = now or datetime.now()
+    if now.month == 12:
+        return datetime(now.year + 1, 1, 1)
+    return datetime(now.year, now.month + 1, 1)
+
+
+def month_key_before(boundary: datetime) -> str:
+    """The month that ends at `boundary`, in get_month_key() format"""
+    previous = boundary - timedelta(days=1)
+    return f"{previous.year}-{previous.month:02d}"
+
+
+class MonthlyResetJob:
+    """Resets every guild's monthly leaderboard for one month, resumably.
+
+    Finished guilds are recorded in a small state file after each one, so a
+    restart mid-reset only processes the rest. Resets run on the data
+    manager's executor, at most `concurrency` guilds at a time, and ask the
+    backend to skip guilds it already reset for the month in case the crash
+    came between a reset and its state entry.
+    """
+
+    def __init__(self, data_manager, state_path: str = None, concurrency: int = None):
+        if concurrency is None:
+            concurrency = int(os.getenv("DATA_RESET_CONCURRENCY", MONTHLY_RESET_CONCURRENCY))
+        self.data_manager = data_manager
+        self.state_path = state_path or os.path.join(DATA_DIR, MONTHLY_RESET_STATE_FILE)
+        self.concurrency = max(1, concurrency)
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        self._state_lock = asyncio.Lock()
+
+    def _load_state(self) -> dict:
+        try:
+            with open(self.state_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.error(f"Unreadable monthly reset state, starting over | File: {self.state_path} | Error: {e}")
+            return {}
+
+    async def _save_state(self, state: dict):
+        async with self._state_lock:
+            payload = json.dumps(state, indent=4).encode('utf-8')
+            await asyncio.to_thread(atomic_write, self.state_path, payload)
+
+    async def resume(self, guild_ids):
+        """Finish a reset interrupted by a restart; returns its summary, or None if nothing was pending"""
+        state = self._load_state()
+        if not state or state.get('completed_at'):
+            return None
+        logger.info(f"Resuming interrupted monthly reset | Month: {state['month']} | Done: {len(state['done'])}")
+        return await self.run(state['month'], guild_ids)
+
+    async def run(self, month_key: str, guild_ids) -> dict:
+        """Reset every guild in guild_ids for month_key, skipping those already done"""
+        state = self._load_state()
+        if state.get('month') != month_key:
+            state = {'month': month_key, 'started_at': datetime.now().isoformat(), 'done': [], 'completed_at': None}
+        elif state.get('completed_at'):
+            logger.info(f"Monthly reset already completed | Month: {month_key}")
+            return {'month': month_key, 'reset': 0, 'skipped': len(state['done']), 'failed': [], 'seconds': 0.0}
+
+        done = set(state['done'])
+        pending = [guild_id for guild_id in guild_ids if guild_id not in done]
+        await self._save_state(state)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        timings = {}
+        failed = []
+
+        async def reset(guild_id):
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    await self.data_manager.reset_monthly_leaderboard(guild_id, month_key, once=True)
+                except Exception as e:
+                    failed.append(guild_id)
+                    logger.error(f"Monthly reset failed | Month: {month_key} | Guild: {guild_id} | Error: {e}")
+                    return
+                timings[guild_id] = time.perf_counter() - start
+                state['done'].append(guild_id)
+                await self._save_state(state)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(reset(guild_id) for guild_id in pending))
+        elapsed = time.perf_counter() - start
+
+        if not failed:
+            state['completed_at'] = datetime.now().isoformat()
+            await self._save_state(state)
+
+        slowest = max(timings.values(), default=0)
+        logger.info(f"Monthly reset finished | Month: {month_key} | Reset: {len(timings)} | "
+                    f"Already done: {len(guild_ids) - len(pending)} | Failed: {len(failed)} | "
+                    f"Concurrency: {self.concurrency} | Total: {elapsed:.2f}s | Slowest guild: {slowest * 1000:.0f}ms")
+        return {
+            'month': month_key,
+            'reset': len(timings),
+            'skipped': len(guild_ids) - len(pending),
+            'failed': failed,
+            'seconds': elapsed,
+        }
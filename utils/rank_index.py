@@ -0,0 +1,125 @@
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+# Target entries per block; a block is split once it holds twice as many
+BLOCK_SIZE = 256
+
+
+class Ranking:
+    """Immutable (-xp, user_id) ordering, best first, as returned by RankIndex.ordering().
+
+    Holds the index's blocks, which are tuples and never modified, so taking
+    one costs O(blocks) rather than O(users).
+    """
+
+    __slots__ = ('_blocks', '_maxes', '_offsets')
+
+    def __init__(self, blocks: tuple, maxes: tuple):
+        self._blocks = blocks
+        self._maxes = maxes
+        self._offsets = tuple(accumulate((len(block) for block in blocks), initial=0))
+
+    def __len__(self):
+        return self._offsets[-1]
+
+    def position(self, key: tuple) -> int:
+        """Where key is, or would be inserted: bisect_left over the whole ordering"""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._blocks):
+            return len(self)
+        return self._offsets[i] + bisect_left(self._blocks[i], key)
+
+    def slice(self, start: int, stop: int) -> list:
+        """Entries start .. stop-1"""
+        stop = min(stop, len(self))
+        if start >= stop:
+            return []
+        i = bisect_right(self._offsets, start) - 1
+        entries = []
+        offset = start - self._offsets[i]
+        while len(entries) < stop - start:
+            entries.extend(self._blocks[i][offset:offset + stop - start - len(entries)])
+            i += 1
+            offset = 0
+        return entries
+
+
+class RankIndex:
+    """Users of one guild kept sorted by XP (highest first, ties by user id).
+
+    The order is a list of sorted blocks of about BLOCK_SIZE entries, so an
+    XP change rewrites one block instead of shifting the whole guild, and a
+    snapshot for readers shares the blocks. Rank lookups are a binary search
+    and top-k / page reads walk only the blocks they need.
+    """
+
+    def __init__(self, leaderboard: dict = None):
+        self._xp = {}
+        self._blocks = []
+        self._maxes = []
+        if leaderboard:
+            self._xp = {user_id: user['xp'] for user_id, user in leaderboard.items()}
+            order = sorted((-xp, user_id) for user_id, xp in self._xp.items())
+            self._blocks = [tuple(order[i:i + BLOCK_SIZE]) for i in range(0, len(order), BLOCK_SIZE)]
+            self._maxes = [block[-1] for block in self._blocks]
+
+    def __len__(self):
+        return len(self._xp)
+
+    def _insert(self, key: tuple):
+        if not self._blocks:
+            self._blocks.append((key,))
+            self._maxes.append(key)
+            return
+        i = min(bisect_left(self._maxes, key), len(self._blocks) - 1)
+        block = self._blocks[i]
+        j = bisect_left(block, key)
+        block = block[:j] + (key,) + block[j:]
+        if len(block) > 2 * BLOCK_SIZE:
+            half = len(block) // 2
+            self._blocks[i:i + 1] = [block[:half], block[half:]]
+            self._maxes[i:i + 1] = [block[half - 1], block[-1]]
+        else:
+            self._blocks[i] = block
+            self._maxes[i] = block[-1]
+
+    def _delete(self, key: tuple):
+        i = bisect_left(self._maxes, key)
+        block = self._blocks[i]
+        j = bisect_left(block, key)
+        block = block[:j] + block[j + 1:]
+        if block:
+            self._blocks[i] = block
+            self._maxes[i] = block[-1]
+        else:
+            del self._blocks[i]
+            del self._maxes[i]
+
+    def update(self, user_id: str, xp: int):
+        old_xp = self._xp.get(user_id)
+        if old_xp == xp:
+            return
+        if old_xp is not None:
+            self._delete((-old_xp, user_id))
+        self._xp[user_id] = xp
+        self._insert((-xp, user_id))
+
+    def remove(self, user_id: str):
+        old_xp = self._xp.pop(user_id, None)
+        if old_xp is not None:
+            self._delete((-old_xp, user_id))
+
+    def rank(self, user_id: str) -> int:
+        """1-based rank, or 0 if the user is not ranked"""
+        xp = self._xp.get(user_id)
+        if xp is None:
+            return 0
+        return self.ordering().position((-xp, user_id)) + 1
+
+    def ordering(self) -> Ranking:
+        """Immutable view of the ranking as (-xp, user_id) pairs, best first"""
+        return Ranking(tuple(self._blocks), tuple(self._maxes))
+
+    def top(self, limit: int, offset: int = 0) -> list:
+        """User ids ranked offset+1 .. offset+limit"""
+        return [user_id for _, user_id in self.ordering().slice(offset, offset + limit)]
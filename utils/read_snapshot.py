@@ -0,0 +1,132 @@
+from typing import NamedTuple
+
+# Marks a snapshot part that has not been built yet
+MISSING = object()
+
+BUCKETS = 64
+BUCKET_SIZE = 16
+
+CONTAINERS = (dict, list)
+
+
+def freeze(value):
+    """Deep copy of a JSON-like record, so later in-place writes cannot reach it"""
+    kind = type(value)
+    if kind is dict:
+        return {k: freeze(v) if type(v) in CONTAINERS else v for k, v in value.items()}
+    if kind is list:
+        return [freeze(v) if type(v) in CONTAINERS else v for v in value]
+    return value
+
+
+class UserMap:
+    """Immutable user_id -> record map split into buckets.
+
+    Buckets sit in BUCKETS groups whose width grows with the guild so a
+    bucket holds about BUCKET_SIZE users. ``with_changes()`` copies only the
+    groups and buckets holding changed users and shares the rest, so
+    publishing one XP grant costs the same in a 100k-user guild as in a
+    small one.
+    """
+
+    __slots__ = ('_groups', '_width', '_size')
+
+    def __init__(self, groups: tuple, width: int, size: int):
+        self._groups = groups
+        self._width = width
+        self._size = size
+
+    @classmethod
+    def build(cls, records: dict):
+        width = 1
+        while width * BUCKETS * BUCKET_SIZE < len(records):
+            width *= 2
+        groups = [[{} for _ in range(width)] for _ in range(BUCKETS)]
+        for user_id, record in records.items():
+            group, bucket = cls._slot(user_id, width)
+            groups[group][bucket][user_id] = freeze(record)
+        return cls(tuple(tuple(group) for group in groups), width, len(records))
+
+    @staticmethod
+    def _slot(user_id: str, width: int):
+        h = hash(user_id)
+        return h % BUCKETS, (h // BUCKETS) % width
+
+    def __len__(self):
+        return self._size
+
+    def get(self, user_id: str):
+        group, bucket = self._slot(user_id, self._width)
+        return self._groups[group][bucket].get(user_id)
+
+    def with_changes(self, records: dict):
+        """New map with each user_id set to its record, or removed if it is None"""
+        groups = list(self._groups)
+        copied_groups = {}
+        copied_buckets = set()
+        size = self._size
+        for user_id, record in records.items():
+            group, bucket = self._slot(user_id, self._width)
+            if group not in copied_groups:
+                copied_groups[group] = list(groups[group])
+            buckets = copied_groups[group]
+            if (group, bucket) not in copied_buckets:
+                buckets[bucket] = dict(buckets[bucket])
+                copied_buckets.add((group, bucket))
+            existed = user_id in buckets[bucket]
+            if record is None:
+                buckets[bucket].pop(user_id, None)
+                size -= existed
+            else:
+                buckets[bucket][user_id] = freeze(record)
+                size += not existed
+        for group, buckets in copied_groups.items():
+            groups[group] = tuple(buckets)
+        return UserMap(tuple(groups), self._width, size)
+
+
+class LiveUsers:
+    """The cached leaderboard dict read as a user map, without its reserved keys.
+
+    Used for views of the live cache; it wraps the dict instead of copying it.
+    """
+
+    __slots__ = ('_records', '_reserved')
+
+    def __init__(self, records: dict, reserved: tuple):
+        self._records = records
+        self._reserved = reserved
+
+    def __len__(self):
+        return len(self._records) - sum(1 for key in self._reserved if key in self._records)
+
+    def get(self, user_id: str):
+        if user_id in self._reserved:
+            return None
+        return self._records.get(user_id)
+
+
+class GuildSnapshot(NamedTuple):
+    """Read-only view of one guild as of its last commit.
+
+    Parts are built on first read (MISSING until then) and replaced, never
+    modified, when a commit changes them. Readers use whatever snapshot is
+    current without taking the guild lock. A commit that changes users only
+    marks the ranking stale; the next rank or leaderboard read takes it again
+    from the RankIndex, which shares its blocks rather than copying them.
+    `ranking` is always built from the same version as `users`.
+    """
+
+    users: object = MISSING               # UserMap (LiveUsers in views of the live cache)
+    ranking: object = MISSING             # rank_index.Ranking of (-xp, user_id), best first, matching users
+    active_challenge: object = MISSING    # challenge dict or None
+    hall_of_fame_top: object = MISSING    # tuple of (user_id, {'username', 'total_xp'})
+
+    def rank(self, user_id: str) -> int:
+        user = self.users.get(user_id)
+        if user is None:
+            return 0
+        return self.ranking.position((-user['xp'], user_id)) + 1
+
+    def top(self, limit: int, offset: int = 0) -> list:
+        return [(user_id, self.users.get(user_id)) for _, user_id in self.ranking.slice(offset, offset + limit)]
@@ -0,0 +1,112 @@
+import json
+from utils.logger import get_logger
+
+logger = get_logger("serializers")
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# First byte of every JSON document the data files hold (objects/arrays);
+# anything else is treated as msgpack
+JSON_START = (ord('{'), ord('['))
+
+
+class Serializer:
+    """Turns cached data into file bytes and back for one on-disk format"""
+
+    name = None
+    binary = False
+
+    @classmethod
+    def available(cls) -> bool:
+        return True
+
+    def dumps(self, data) -> bytes:
+        raise NotImplementedError
+
+    def loads(self, payload: bytes):
+        raise NotImplementedError
+
+
+class JSONSerializer(Serializer):
+    """Standard library JSON without indentation"""
+
+    name = 'json'
+
+    def dumps(self, data) -> bytes:
+        return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+    def loads(self, payload: bytes):
+        return json.loads(payload)
+
+
+class PrettyJSONSerializer(JSONSerializer):
+    """The original indent=4 layout, for people who edit the files by hand"""
+
+    name = 'json-pretty'
+
+    def dumps(self, data) -> bytes:
+        return json.dumps(data, indent=4).encode('utf-8')
+
+
+class OrjsonSerializer(Serializer):
+    name = 'orjson'
+
+    @classmethod
+    def available(cls) -> bool:
+        return orjson is not None
+
+    def dumps(self, data) -> bytes:
+        return orjson.dumps(data)
+
+    def loads(self, payload: bytes):
+        return orjson.loads(payload)
+
+
+class MsgpackSerializer(Serializer):
+    name = 'msgpack'
+    binary = True
+
+    @classmethod
+    def available(cls) -> bool:
+        return msgpack is not None
+
+    def dumps(self, data) -> bytes:
+        return msgpack.packb(data, use_bin_type=True)
+
+    def loads(self, payload: bytes):
+        return msgpack.unpackb(payload, raw=False)
+
+
+SERIALIZERS = {cls.name: cls for cls in (JSONSerializer, PrettyJSONSerializer, OrjsonSerializer, MsgpackSerializer)}
+
+
+def get_serializer(name: str) -> Serializer:
+    """Serializer by name, falling back to compact stdlib JSON if unknown or not installed"""
+    cls = SERIALIZERS.get(name)
+    if cls is None:
+        logger.warning(f"Unknown data codec '{name}', falling back to {JSONSerializer.name}")
+        return JSONSerializer()
+    if not cls.available():
+        logger.warning(f"Data codec '{name}' is not installed, falling back to {JSONSerializer.name}")
+        return JSONSerializer()
+    return cls()
+
+
+def load_payload(payload: bytes):
+    """Decode file bytes written by any serializer; raises ValueError if unreadable"""
+    stripped = payload.lstrip()
+    if not stripped:
+        raise ValueError("empty file")
+    if stripped[0] in JSON_START:
+        return orjson.loads(stripped) if orjson is not None else json.loads(stripped)
+    if msgpack is None:
+        raise ValueError("binary (msgpack) data but msgpack is not installed")
+    return msgpack.unpackb(payload, raw=False)
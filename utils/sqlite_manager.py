@@ -0,0 +1,690 @@
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from utils.constants import DATA_DIR, SQLITE_DB_FILE, LEADERBOARD_FILE
+from utils.data_manager import DataManager, META_KEY, RESERVED_KEYS, synchronized
+from utils.logger import get_logger
+from utils.weekly_xp import (
+    new_weeks, add_week_xp, week_index, format_week, weekly_totals, active_weeks, current_streak
+)
+
+logger = get_logger("sqlite_manager")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    guild_id INTEGER NOT NULL,
+    user_id TEXT NOT NULL,
+    username TEXT NOT NULL,
+    xp INTEGER NOT NULL DEFAULT 0,
+    total_xp INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS idx_users_guild_xp ON users (guild_id, xp DESC, user_id);
+
+CREATE TABLE IF NOT EXISTS weekly_xp (
+    guild_id INTEGER NOT NULL,
+    user_id TEXT NOT NULL,
+    week_key TEXT NOT NULL,
+    xp INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, user_id, week_key)
+);
+
+-- Rolled-up XP of weeks imported from JSON after they left its retention window
+CREATE TABLE IF NOT EXISTS monthly_xp (
+    guild_id INTEGER NOT NULL,
+    user_id TEXT NOT NULL,
+    month_key TEXT NOT NULL,
+    xp INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, user_id, month_key)
+);
+
+CREATE TABLE IF NOT EXISTS badges (
+    guild_id INTEGER NOT NULL,
+    user_id TEXT NOT NULL,
+    badge TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, user_id, badge)
+);
+
+CREATE TABLE IF NOT EXISTS hall_of_fame (
+    guild_id INTEGER NOT NULL,
+    month_key TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (guild_id, month_key, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS hall_of_fame_totals (
+    guild_id INTEGER NOT NULL,
+    user_id TEXT NOT NULL,
+    username TEXT NOT NULL,
+    total_xp INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, user_id)
+);
+CREATE TABLE IF NOT EXISTS monthly_resets (
+    guild_id INTEGER NOT NULL,
+    month_key TEXT NOT NULL,
+    PRIMARY KEY (guild_id, month_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_hall_of_fame_totals_rank ON hall_of_fame_totals (guild_id, total_xp DESC, user_id);
+
+CREATE TABLE IF NOT EXISTS challenges (
+    guild_id INTEGER NOT NULL,
+    challenge_id INTEGER NOT NULL,
+    status TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (guild_id, challenge_id)
+);
+CREATE INDEX IF NOT EXISTS idx_challenges_guild_status ON challenges (guild_id, status);
+
+CREATE TABLE IF NOT EXISTS submissions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    guild_id INTEGER NOT NULL,
+    challenge_id INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_submissions_guild_challenge ON submissions (guild_id, challenge_id);
+
+CREATE TABLE IF NOT EXISTS tickets (
+    guild_id INTEGER NOT NULL,
+    ticket_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    challenge_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (guild_id, ticket_id)
+);
+CREATE INDEX IF NOT EXISTS idx_tickets_guild_user ON tickets (guild_id, user_id);
+CREATE INDEX IF NOT EXISTS idx_tickets_guild_channel ON tickets (guild_id, channel_id);
+CREATE INDEX IF NOT EXISTS idx_tickets_guild_status ON tickets (guild_id, status);
+CREATE INDEX IF NOT EXISTS idx_tickets_guild_challenge ON tickets (guild_id, challenge_id);
+"""
+
+
+class SQLiteDataManager:
+    """DataManager backed by a single SQLite database with the same public API.
+
+    Every write touches only the affected rows, so a single-user XP update is an
+    indexed O(log n) update instead of a whole-guild file rewrite.
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or os.path.join(DATA_DIR, SQLITE_DB_FILE)
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._backfill_hall_of_fame_totals()
+        logger.info(f"SQLiteDataManager initialized | Database: {self.db_path}")
+
+    def _execute(self, sql: str, params=()):
+        return self._conn.execute(sql, params)
+
+    def _write(self, statements):
+        """Run (sql, params) pairs in one transaction"""
+        if self._conn.in_transaction:
+            # Already inside transaction(); the outer block commits
+            for sql, params in statements:
+                self._conn.execute(sql, params)
+            return
+        self._conn.execute("BEGIN")
+        try:
+            for sql, params in statements:
+                self._conn.execute(sql, params)
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _user_record(self, row, weekly_xp: dict, monthly_xp: dict, badges: list):
+        # One row per week is kept here; the record is built in the same
+        # compact shape DataManager stores
+        user = {
+            'username': row['username'],
+            'xp': row['xp'],
+            'weeks': new_weeks(),
+            'total_xp': row['total_xp'],
+            'badges': badges
+        }
+        for index, xp in sorted((week_index(key), xp) for key, xp in weekly_xp.items()):
+            add_week_xp(user, index, xp)
+        if monthly_xp:
+            rolled = user.setdefault('monthly_xp', {})
+            for month_key, xp in monthly_xp.items():
+                rolled[month_key] = rolled.get(month_key, 0) + xp
+        return user
+
+    @contextmanager
+    def transaction(self, guild_id: int):
+        """Run several mutations in one SQLite transaction"""
+        with self._lock:
+            if self._conn.in_transaction:
+                yield self
+                return
+            self._conn.execute("BEGIN")
+            try:
+                yield self
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                logger.warning(f"Transaction rolled back | Guild: {guild_id}")
+                raise
+            self._conn.execute("COMMIT")
+
+    def flush(self, guild_id: int = None):
+        """Writes are committed immediately; kept for API parity with DataManager"""
+        return 0
+
+    def compact_ledgers(self):
+        """No XP ledger in SQLite; kept for API parity with DataManager"""
+        return 0
+
+    @synchronized
+    def warm_up(self, guild_id: int) -> float:
+        """Read the guild's users, active challenge and live tickets so their pages are cached"""
+        start = time.perf_counter()
+        self._execute("SELECT user_id, xp FROM users WHERE guild_id = ? ORDER BY xp DESC", (guild_id,)).fetchall()
+        self.get_active_challenge(guild_id)
+        self._execute("SELECT data FROM tickets WHERE guild_id = ? AND status != 'closed'", (guild_id,)).fetchall()
+        return time.perf_counter() - start
+
+    @synchronized
+    def close(self):
+        self._conn.close()
+        logger.info("SQLiteDataManager closed")
+
+    def get_month_key(self):
+        now = datetime.now()
+        return f"{now.year}-{now.month:02d}"
+
+    @synchronized
+    def ensure_user(self, guild_id: int, user_id: int, username: str):
+        return self._execute(
+            "INSERT INTO users (guild_id, user_id, username) VALUES (?, ?, ?) "
+            "ON CONFLICT (guild_id, user_id) DO UPDATE SET username = excluded.username "
+            "WHERE users.username != excluded.username",
+            (guild_id, str(user_id), username)
+        ).rowcount > 0
+
+    @synchronized
+    def rename_user(self, guild_id: int, user_id: int, username: str):
+        return self._execute(
+            "UPDATE users SET username = ? WHERE guild_id = ? AND user_id = ? AND username != ?",
+            (username, guild_id, str(user_id), username)
+        ).rowcount > 0
+
+    @synchronized
+    def add_xp(self, guild_id: int, user_id: int, amount: int, week_key: str, username: str = None):
+        if username is not None:
+            self.ensure_user(guild_id, user_id, username)
+        user_id = str(user_id)
+        if not self._execute("SELECT 1 FROM users WHERE guild_id = ? AND user_id = ?", (guild_id, user_id)).fetchone():
+            # Same contract as DataManager: ensure_user must come first
+            raise KeyError(user_id)
+        self._write([
+            ("UPDATE users SET xp = xp + ?, total_xp = total_xp + ? WHERE guild_id = ? AND user_id = ?",
+             (amount, amount, guild_id, user_id)),
+            ("INSERT INTO weekly_xp (guild_id, user_id, week_key, xp) VALUES (?, ?, ?, ?) "
+             "ON CONFLICT (guild_id, user_id, week_key) DO UPDATE SET xp = xp + excluded.xp",
+             (guild_id, user_id, format_week(week_index(week_key)), amount)),
+        ])
+        row = self._execute("SELECT username, xp FROM users WHERE guild_id = ? AND user_id = ?", (guild_id, user_id)).fetchone()
+        if row:
+            logger.info(f"Added {amount} XP | User: {row['username']} | Total: {row['xp']} | Guild: {guild_id}")
+
+    @synchronized
+    def remove_xp(self, guild_id: int, user_id: int, amount: int):
+        self._execute(
+            "UPDATE users SET xp = MAX(0, xp - ?) WHERE guild_id = ? AND user_id = ?",
+            (amount, guild_id, str(user_id))
+        )
+
+    @synchronized
+    def add_badge(self, guild_id: int, user_id: int, badge: str):
+        user_id = str(user_id)
+        if not self._execute("SELECT 1 FROM users WHERE guild_id = ? AND user_id = ?", (guild_id, user_id)).fetchone():
+            return
+        self._execute(
+            "INSERT OR IGNORE INTO badges (guild_id, user_id, badge, position) "
+            "VALUES (?, ?, ?, (SELECT COUNT(*) FROM badges WHERE guild_id = ? AND user_id = ?))",
+            (guild_id, user_id, badge, guild_id, user_id)
+        )
+
+    @synchronized
+    def get_user(self, guild_id: int, user_id: int):
+        user_id = str(user_id)
+        row = self._execute("SELECT * FROM users WHERE guild_id = ? AND user_id = ?", (guild_id, user_id)).fetchone()
+        if not row:
+            return None
+        weekly_xp = {
+            r['week_key']: r['xp'] for r in self._execute(
+                "SELECT week_key, xp FROM weekly_xp WHERE guild_id = ? AND user_id = ?", (guild_id, user_id))
+        }
+        monthly_xp = {
+            r['month_key']: r['xp'] for r in self._execute(
+                "SELECT month_key, xp FROM monthly_xp WHERE guild_id = ? AND user_id = ?", (guild_id, user_id))
+        }
+        badges = [
+            r['badge'] for r in self._execute(
+                "SELECT badge FROM badges WHERE guild_id = ? AND user_id = ? ORDER BY position", (guild_id, user_id))
+        ]
+        return self._user_record(row, weekly_xp, monthly_xp, badges)
+
+    @synchronized
+    def get_leaderboard(self, guild_id: int):
+        weekly = {}
+        for r in self._execute("SELECT user_id, week_key, xp FROM weekly_xp WHERE guild_id = ?", (guild_id,)):
+            weekly.setdefault(r['user_id'], {})[r['week_key']] = r['xp']
+        monthly = {}
+        for r in self._execute("SELECT user_id, month_key, xp FROM monthly_xp WHERE guild_id = ?", (guild_id,)):
+            monthly.setdefault(r['user_id'], {})[r['month_key']] = r['xp']
+        badges = {}
+        for r in self._execute("SELECT user_id, badge FROM badges WHERE guild_id = ? ORDER BY position", (guild_id,)):
+            badges.setdefault(r['user_id'], []).append(r['badge'])
+
+        return {
+            row['user_id']: self._user_record(
+                row, weekly.get(row['user_id'], {}), monthly.get(row['user_id'], {}), badges.get(row['user_id'], [])
+            )
+            for row in self._execute("SELECT * FROM users WHERE guild_id = ?", (guild_id,))
+        }
+
+    @synchronized
+    def get_user_rank(self, guild_id: int, user_id: int):
+        user_id = str(user_id)
+        row = self._execute("SELECT xp FROM users WHERE guild_id = ? AND user_id = ?", (guild_id, user_id)).fetchone()
+        if not row:
+            return 0
+        # Same ordering as RankIndex: XP descending, ties by user id
+        ahead = self._execute(
+            "SELECT COUNT(*) FROM users WHERE guild_id = ? AND (xp > ? OR (xp = ? AND user_id < ?))",
+            (guild_id, row['xp'], row['xp'], user_id)
+        ).fetchone()[0]
+        return ahead + 1
+
+    @synchronized
+    def get_top_users(self, guild_id: int, limit: int = 10, offset: int = 0):
+        rows = self._execute(
+            "SELECT * FROM users WHERE guild_id = ? ORDER BY xp DESC, user_id LIMIT ? OFFSET ?",
+            (guild_id, limit, offset)
+        ).fetchall()
+        return [(row['user_id'], self.get_user(guild_id, row['user_id'])) for row in rows]
+
+    @synchronized
+    def get_user_count(self, guild_id: int):
+        return self._execute("SELECT COUNT(*) FROM users WHERE guild_id = ?", (guild_id,)).fetchone()[0]
+
+    @synchronized
+    def get_user_streak(self, guild_id: int, user_id: int):
+        user = self.get_user(guild_id, user_id)
+        if not user:
+            return 0
+        return current_streak(user)
+
+    @synchronized
+    def get_hall_of_fame_months(self, guild_id: int):
+        return [r[0] for r in self._execute(
+            "SELECT DISTINCT month_key FROM hall_of_fame WHERE guild_id = ? ORDER BY month_key", (guild_id,))]
+
+    @synchronized
+    def get_hall_of_fame_month(self, guild_id: int, month_key: str):
+        return {
+            r['user_id']: json.loads(r['data']) for r in self._execute(
+                "SELECT user_id, data FROM hall_of_fame WHERE guild_id = ? AND month_key = ?", (guild_id, month_key))
+        }
+
+    @synchronized
+    def get_hall_of_fame(self, guild_id: int):
+        hall_of_fame = {}
+        for r in self._execute("SELECT month_key, user_id, data FROM hall_of_fame WHERE guild_id = ?", (guild_id,)):
+            hall_of_fame.setdefault(r['month_key'], {})[r['user_id']] = json.loads(r['data'])
+        return hall_of_fame
+
+    def _hall_of_fame_deltas(self, guild_id: int, month: dict):
+        """Upserts adding one archived month's XP to the totals"""
+        sql = ("INSERT INTO hall_of_fame_totals (guild_id, user_id, username, total_xp) VALUES (?, ?, ?, ?) "
+               "ON CONFLICT (guild_id, user_id) DO UPDATE SET "
+               "username = excluded.username, total_xp = total_xp + excluded.total_xp")
+        return [
+            (sql, (guild_id, user_id, data.get('username', ''), data.get('xp', 0)))
+            for user_id, data in month.items()
+        ]
+
+    @synchronized
+    def _backfill_hall_of_fame_totals(self):
+        """Build all-time totals for guilds whose history predates the totals table"""
+        guild_ids = [r[0] for r in self._execute(
+            "SELECT DISTINCT guild_id FROM hall_of_fame "
+            "WHERE guild_id NOT IN (SELECT DISTINCT guild_id FROM hall_of_fame_totals)"
+        )]
+        for guild_id in guild_ids:
+            hall_of_fame = self.get_hall_of_fame(guild_id)
+            statements = []
+            for month_key in sorted(hall_of_fame):
+                statements += self._hall_of_fame_deltas(guild_id, hall_of_fame[month_key])
+            self._write(statements)
+            logger.info(f"Hall of Fame totals backfilled | Months: {len(hall_of_fame)} | Guild: {guild_id}")
+
+    @synchronized
+    def get_hall_of_fame_top(self, guild_id: int, limit: int = 10):
+        rows = self._execute(
+            "SELECT user_id, username, total_xp FROM hall_of_fame_totals WHERE guild_id = ? "
+            "ORDER BY total_xp DESC, user_id LIMIT ?",
+            (guild_id, limit)
+        )
+        return [(r['user_id'], {'username': r['username'], 'total_xp': r['total_xp']}) for r in rows]
+
+    @synchronized
+    def reset_monthly_leaderboard(self, guild_id: int, month_key: str = None, once: bool = False):
+        month_key = month_key or self.get_month_key()
+        if once and self._execute(
+                "SELECT 1 FROM monthly_resets WHERE guild_id = ? AND month_key = ?", (guild_id, month_key)).fetchone():
+            logger.info(f"Monthly reset already done | Month: {month_key} | Guild: {guild_id}")
+            return False
+        leaderboard_data = self.get_leaderboard(guild_id)
+        earned = {user_id: {'username': data['username'], 'xp': data['xp']}
+                  for user_id, data in leaderboard_data.items() if data['xp']}
+
+        # Redoing a month adds to its snapshot, see DataManager.reset_monthly_leaderboard
+        month = self.get_hall_of_fame_month(guild_id, month_key)
+        for user_id, data in earned.items():
+            entry = month.setdefault(user_id, {'username': data['username'], 'xp': 0})
+            entry['username'] = data['username']
+            entry['xp'] += data['xp']
+        statements = self._hall_of_fame_deltas(guild_id, earned)
+        statements.append(("DELETE FROM hall_of_fame WHERE guild_id = ? AND month_key = ?", (guild_id, month_key)))
+        # Same compact snapshot as the JSON backend: username and month XP, users with XP only
+        statements += [
+            ("INSERT INTO hall_of_fame (guild_id, month_key, user_id, data) VALUES (?, ?, ?, ?)",
+             (guild_id, month_key, user_id, json.dumps(data)))
+            for user_id, data in month.items()
+        ]
+        statements.append(("UPDATE users SET xp = 0 WHERE guild_id = ?", (guild_id,)))
+        if once:
+            # Only automatic runs are recorded, see DataManager.reset_monthly_leaderboard
+            statements.append(("INSERT OR IGNORE INTO monthly_resets (guild_id, month_key) VALUES (?, ?)", (guild_id, month_key)))
+        self._write(statements)
+        logger.info(f"Monthly leaderboard reset | Month: {month_key} | Users: {len(leaderboard_data)} | Guild: {guild_id}")
+        return True
+
+    def _challenge_record(self, guild_id: int, row):
+        if not row:
+            return None
+        challenge = json.loads(row['data'])
+        # Counted from the (guild_id, challenge_id) index; rows are streamed by iter_submissions
+        challenge['submission_count'] = self._execute(
+            "SELECT COUNT(*) FROM submissions WHERE guild_id = ? AND challenge_id = ?",
+            (guild_id, row['challenge_id'])
+        ).fetchone()[0]
+        return challenge
+
+    @synchronized
+    def create_challenge(self, guild_id: int, challenge_data: dict):
+        challenge_id = self._execute(
+            "SELECT COALESCE(MAX(challenge_id), 0) + 1 FROM challenges WHERE guild_id = ?", (guild_id,)
+        ).fetchone()[0]
+        challenge_data['id'] = challenge_id
+        challenge_data['guild_id'] = guild_id
+        submissions = challenge_data.pop('submissions', [])
+        challenge_data['submission_count'] = len(submissions)
+        stored = {k: v for k, v in challenge_data.items() if k != 'submission_count'}
+
+        statements = [(
+            "INSERT INTO challenges (guild_id, challenge_id, status, data) VALUES (?, ?, ?, ?)",
+            (guild_id, challenge_id, stored.get('status'), json.dumps(stored))
+        )]
+        statements += [
+            ("INSERT INTO submissions (guild_id, challenge_id, data) VALUES (?, ?, ?)",
+             (guild_id, challenge_id, json.dumps(s)))
+            for s in submissions
+        ]
+        self._write(statements)
+        logger.info(f"Challenge created | ID: {challenge_id} | Difficulty: {challenge_data.get('difficulty', 'N/A')} | Guild: {guild_id}")
+        return challenge_id
+
+    @synchronized
+    def update_challenge(self, guild_id: int, challenge_id: int, updates: dict):
+        row = self._execute(
+            "SELECT data FROM challenges WHERE guild_id = ? AND challenge_id = ?", (guild_id, challenge_id)
+        ).fetchone()
+        if not row:
+            return False
+        challenge = json.loads(row['data'])
+        challenge.update({k: v for k, v in updates.items() if k != 'submission_count'})
+        self._execute(
+            "UPDATE challenges SET status = ?, data = ? WHERE guild_id = ? AND challenge_id = ?",
+            (challenge.get('status'), json.dumps(challenge), guild_id, challenge_id)
+        )
+        return True
+
+    @synchronized
+    def get_active_challenge(self, guild_id: int):
+        row = self._execute(
+            "SELECT challenge_id, data FROM challenges WHERE guild_id = ? AND status = 'active' "
+            "ORDER BY challenge_id DESC LIMIT 1", (guild_id,)
+        ).fetchone()
+        return self._challenge_record(guild_id, row)
+
+    @synchronized
+    def get_latest_challenge(self, guild_id: int):
+        row = self._execute(
+            "SELECT challenge_id, data FROM challenges WHERE guild_id = ? ORDER BY challenge_id DESC LIMIT 1", (guild_id,)
+        ).fetchone()
+        return self._challenge_record(guild_id, row)
+
+    @synchronized
+    def get_challenge_by_id(self, guild_id: int, challenge_id: int):
+        row = self._execute(
+            "SELECT challenge_id, data FROM challenges WHERE guild_id = ? AND challenge_id = ?", (guild_id, challenge_id)
+        ).fetchone()
+        return self._challenge_record(guild_id, row)
+
+    @synchronized
+    def add_submission(self, guild_id: int, challenge_id: int, submission_data):
+        """Store a submission and return its 1-based position, or False for an unknown challenge"""
+        if not self._execute(
+            "SELECT 1 FROM challenges WHERE guild_id = ? AND challenge_id = ?", (guild_id, challenge_id)
+        ).fetchone():
+            return False
+        position = self._execute(
+            "SELECT COUNT(*) + 1 FROM submissions WHERE guild_id = ? AND challenge_id = ?", (guild_id, challenge_id)
+        ).fetchone()[0]
+        if callable(submission_data):
+            submission_data = submission_data(position)
+        self._execute(
+            "INSERT INTO submissions (guild_id, challenge_id, data) VALUES (?, ?, ?)",
+            (guild_id, challenge_id, json.dumps(submission_data))
+        )
+        return position
+
+    def iter_submissions(self, guild_id: int, challenge_id: int):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM submissions WHERE guild_id = ? AND challenge_id = ? ORDER BY id",
+                (guild_id, challenge_id)
+            ).fetchall()
+        for row in rows:
+            yield json.loads(row['data'])
+
+    @synchronized
+    def create_ticket(self, guild_id: int, ticket_data: dict):
+        ticket_id = self._execute(
+            "SELECT COALESCE(MAX(ticket_id), 0) + 1 FROM tickets WHERE guild_id = ?", (guild_id,)
+        ).fetchone()[0]
+        ticket_data['id'] = ticket_id
+        ticket_data['guild_id'] = guild_id
+        self._insert_ticket(guild_id, ticket_data)
+        return ticket_id
+
+    def _insert_ticket(self, guild_id: int, ticket: dict):
+        self._execute(
+            "INSERT OR REPLACE INTO tickets (guild_id, ticket_id, user_id, channel_id, challenge_id, status, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (guild_id, ticket['id'], ticket['user_id'], ticket['channel_id'], ticket['challenge_id'],
+             ticket['status'], json.dumps(ticket))
+        )
+
+    @synchronized
+    def update_ticket(self, guild_id: int, ticket_id: int, updates: dict):
+        row = self._execute(
+            "SELECT data FROM tickets WHERE guild_id = ? AND ticket_id = ?", (guild_id, ticket_id)
+        ).fetchone()
+        if not row:
+            return False
+        ticket = json.loads(row['data'])
+        ticket.update(updates)
+        self._insert_ticket(guild_id, ticket)
+        return True
+
+    @synchronized
+    def get_user_ticket(self, guild_id: int, user_id: int, challenge_id: int):
+        row = self._execute(
+            "SELECT data FROM tickets WHERE guild_id = ? AND user_id = ? AND challenge_id = ? AND status = 'open' "
+            "ORDER BY ticket_id LIMIT 1", (guild_id, user_id, challenge_id)
+        ).fetchone()
+        return json.loads(row['data']) if row else None
+
+    @synchronized
+    def get_ticket_by_channel(self, guild_id: int, channel_id: int):
+        row = self._execute(
+            "SELECT data FROM tickets WHERE guild_id = ? AND channel_id = ? AND status != 'closed' "
+            "ORDER BY ticket_id LIMIT 1",
+            (guild_id, channel_id)
+        ).fetchone()
+        return json.loads(row['data']) if row else None
+
+    @synchronized
+    def get_tickets_by_challenge(self, guild_id: int, challenge_id: int):
+        return [
+            json.loads(r['data']) for r in self._execute(
+                "SELECT data FROM tickets WHERE guild_id = ? AND challenge_id = ? ORDER BY ticket_id",
+                (guild_id, challenge_id))
+        ]
+
+
+def migrate_json_to_sqlite(data_dir: str = None, db_path: str = None):
+    """One-shot import of the data/server_<id>/*.json layout into SQLite.
+
+    Returns the number of guilds migrated. Re-running the migration replaces
+    the rows of every guild it finds; the JSON tree itself is not modified.
+    """
+    data_dir = data_dir or DATA_DIR
+    with tempfile.TemporaryDirectory() as scratch:
+        # DataManager upgrades old layouts in place as it loads them, so read
+        # from a copy and leave the source tree untouched
+        copy_dir = os.path.join(scratch, 'data')
+        shutil.copytree(data_dir, copy_dir)
+        source = DataManager(data_dir=copy_dir)
+        target = SQLiteDataManager(db_path=db_path)
+        try:
+            migrated = _migrate_guilds(source, target, copy_dir)
+            target._backfill_hall_of_fame_totals()
+        finally:
+            source.close()
+            target.close()
+    logger.info(f"SQLite migration complete | Guilds: {migrated} | Database: {target.db_path}")
+    return migrated
+
+
+def _migrate_guilds(source: DataManager, target: SQLiteDataManager, data_dir: str) -> int:
+    """Replace the rows of every server_<id> guild found in data_dir; returns the count"""
+    migrated = 0
+
+    for entry in sorted(os.listdir(data_dir)):
+        server_dir = os.path.join(data_dir, entry)
+        if not (entry.startswith('server_') and os.path.isdir(server_dir)):
+            continue
+        try:
+            guild_id = int(entry[len('server_'):])
+        except ValueError:
+            continue
+
+        leaderboard = source._load_server_data(guild_id, LEADERBOARD_FILE)
+        hall_of_fame = source.get_hall_of_fame(guild_id)
+        challenges = source._all_challenges(guild_id)
+        tickets = list(source._ticket_store(guild_id)['tickets'].values())
+        tickets += [t for archived in source._ticket_archive(guild_id).values() for t in archived.values()]
+
+        statements = [(f"DELETE FROM {table} WHERE guild_id = ?", (guild_id,)) for table in
+                      ('users', 'weekly_xp', 'monthly_xp', 'monthly_resets', 'badges', 'hall_of_fame', 'hall_of_fame_totals',
+                       'challenges', 'submissions', 'tickets')]
+
+        reset_month = leaderboard.get(META_KEY, {}).get('reset_month')
+        if reset_month:
+            statements.append(("INSERT INTO monthly_resets (guild_id, month_key) VALUES (?, ?)", (guild_id, reset_month)))
+
+        users = {k: v for k, v in leaderboard.items() if k not in RESERVED_KEYS}
+        for user_id, user in users.items():
+            statements.append((
+                "INSERT INTO users (guild_id, user_id, username, xp, total_xp) VALUES (?, ?, ?, ?, ?)",
+                (guild_id, user_id, user.get('username', ''), user.get('xp', 0), user.get('total_xp', 0))
+            ))
+            weeks = weekly_totals(user)
+            # Weeks only left in the activity bitmask keep streaks intact as zero-XP rows
+            weeks.update({format_week(i): 0 for i in active_weeks(user) if format_week(i) not in weeks})
+            for week_key, xp in weeks.items():
+                statements.append((
+                    "INSERT INTO weekly_xp (guild_id, user_id, week_key, xp) VALUES (?, ?, ?, ?)",
+                    (guild_id, user_id, week_key, xp)
+                ))
+            for month_key, xp in user.get('monthly_xp', {}).items():
+                statements.append((
+                    "INSERT INTO monthly_xp (guild_id, user_id, month_key, xp) VALUES (?, ?, ?, ?)",
+                    (guild_id, user_id, month_key, xp)
+                ))
+            for position, badge in enumerate(dict.fromkeys(user.get('badges', []))):
+                statements.append((
+                    "INSERT INTO badges (guild_id, user_id, badge, position) VALUES (?, ?, ?, ?)",
+                    (guild_id, user_id, badge, position)
+                ))
+
+        for month_key, users in hall_of_fame.items():
+            for user_id, data in users.items():
+                statements.append((
+                    "INSERT INTO hall_of_fame (guild_id, month_key, user_id, data) VALUES (?, ?, ?, ?)",
+                    (guild_id, month_key, user_id, json.dumps(data))
+                ))
+
+        for challenge in challenges:
+            stored = {k: v for k, v in challenge.items() if k != 'submission_count'}
+            statements.append((
+                "INSERT INTO challenges (guild_id, challenge_id, status, data) VALUES (?, ?, ?, ?)",
+                (guild_id, challenge['id'], stored.get('status'), json.dumps(stored))
+            ))
+            for submission in source.iter_submissions(guild_id, challenge['id']):
+                statements.append((
+                    "INSERT INTO submissions (guild_id, challenge_id, data) VALUES (?, ?, ?)",
+                    (guild_id, challenge['id'], json.dumps(submission))
+                ))
+
+        for ticket in tickets:
+            statements.append((
+                "INSERT INTO tickets (guild_id, ticket_id, user_id, channel_id, challenge_id, status, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (guild_id, ticket['id'], ticket['user_id'], ticket['channel_id'], ticket['challenge_id'],
+                 ticket['status'], json.dumps(ticket))
+            ))
+
+        with target._lock:
+            target._write(statements)
+        migrated += 1
+        logger.info(f"Migrated guild to SQLite | Guild: {guild_id} | Users: {len(users)} | Challenges: {len(challenges)} | Tickets: {len(tickets)}")
+    return migrated
+
+
+if __name__ == '__main__':
+    import sys
+    from utils.logger import setup_logging
+
+    setup_logging()
+    migrate_json_to_sqlite(*sys.argv[1:3])
@@ -0,0 +1,55 @@
+from bisect import insort
+
+
+class TicketIndex:
+    """In-memory lookups over a guild's live (not yet closed) tickets.
+
+    Tickets are indexed by channel id, by (user_id, challenge_id, status) and
+    by challenge id, so the ticket commands no longer scan the whole store.
+    Callers remove a ticket before changing an indexed field and add it back
+    afterwards.
+    """
+
+    def __init__(self, tickets=()):
+        self._by_channel = {}
+        self._by_owner = {}
+        self._by_challenge = {}
+        for ticket in tickets:
+            self.add(ticket)
+
+    def __len__(self):
+        return sum(len(ids) for ids in self._by_challenge.values())
+
+    def add(self, ticket: dict):
+        ticket_id = ticket['id']
+        self._by_channel.setdefault(ticket['channel_id'], ticket_id)
+        insort(self._by_owner.setdefault((ticket['user_id'], ticket['challenge_id'], ticket['status']), []), ticket_id)
+        self._by_challenge.setdefault(ticket['challenge_id'], set()).add(ticket_id)
+
+    def remove(self, ticket: dict):
+        ticket_id = ticket['id']
+        if self._by_channel.get(ticket['channel_id']) == ticket_id:
+            del self._by_channel[ticket['channel_id']]
+
+        key = (ticket['user_id'], ticket['challenge_id'], ticket['status'])
+        ids = self._by_owner.get(key, [])
+        if ticket_id in ids:
+            ids.remove(ticket_id)
+            if not ids:
+                del self._by_owner[key]
+
+        ids = self._by_challenge.get(ticket['challenge_id'], set())
+        ids.discard(ticket_id)
+        if not ids:
+            self._by_challenge.pop(ticket['challenge_id'], None)
+
+    def by_channel(self, channel_id: int):
+        return self._by_channel.get(channel_id)
+
+    def find(self, user_id: int, challenge_id: int, status: str):
+        """Lowest ticket id matching all three fields, or None"""
+        ids = self._by_owner.get((user_id, challenge_id, status))
+        return ids[0] if ids else None
+
+    def by_challenge(self, challenge_id: int) -> list:
+        return sorted(self._by_challenge.get(challenge_id, ()))
@@ -0,0 +1,249 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import Counter, deque
+from utils.constants import (AI_MAX_CONCURRENCY, AI_RATE_PER_MINUTE, AI_RATE_BURST,
+                             AI_QUEUE_MAX, AI_QUEUE_MAX_PER_GUILD)
+from utils.logger import get_logger
+
+logger = get_logger("verification_scheduler")
+
+# Recent wait/service times kept for the percentiles in get_stats()
+TIMING_SAMPLES = 1000
+
+
+class VerificationQueueFull(Exception):
+    """Raised by schedule() when the queue, or the guild's share of it, is full"""
+
+
+class TokenBucket:
+    """Allows `rate` starts per second on average, with bursts of up to `burst`"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_take(self) -> bool:
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def delay(self) -> float:
+        """Seconds until the next token is available"""
+        self._refill()
+        return max(0.0, (1 - self._tokens) / self.rate)
+
+
+class VerificationJob:
+    """One queued review; ``await job`` returns the review's result"""
+
+    __slots__ = ('guild_id', 'review', 'tag', 'seq', 'enqueued_at', 'started_at', 'result')
+
+    def __init__(self, guild_id: int, review, tag: float, seq: int):
+        self.guild_id = guild_id
+        self.review = review
+        self.tag = tag
+        self.seq = seq
+        self.enqueued_at = time.perf_counter()
+        self.started_at = None
+        self.result = asyncio.get_running_loop().create_future()
+
+    @property
+    def started(self) -> bool:
+        return self.started_at is not None
+
+    def __lt__(self, other):
+        return (self.tag, self.seq) < (other.tag, other.seq)
+
+    def __await__(self):
+        return self.result.__await__()
+
+
+class VerificationScheduler:
+    """Runs AI reviews with per-guild fairness, a start rate limit and a bounded queue.
+
+    Guilds share review slots by weighted fair queueing: each job is tagged
+    with a virtual finish time (the later of "now" and its guild's previous
+    tag, plus 1/weight) and the smallest tag runs next. A guild submitting a
+    hundred reviews at challenge close therefore interleaves with everyone
+    else instead of going first. Jobs start only while a token bucket sized
+    to the Gemini quota has tokens, at most `concurrency` at a time.
+    """
+
+    def __init__(self, concurrency: int = None, rate_per_minute: float = None, burst: int = None,
+                 max_queue: int = None, max_per_guild: int = None):
+        if concurrency is None:
+            concurrency = int(os.getenv('AI_MAX_CONCURRENCY', AI_MAX_CONCURRENCY))
+        if rate_per_minute is None:
+            rate_per_minute = float(os.getenv('AI_RATE_PER_MINUTE', AI_RATE_PER_MINUTE))
+        if burst is None:
+            burst = int(os.getenv('AI_RATE_BURST', AI_RATE_BURST))
+        if max_queue is None:
+            max_queue = int(os.getenv('AI_QUEUE_MAX', AI_QUEUE_MAX))
+        if max_per_guild is None:
+            max_per_guild = int(os.getenv('AI_QUEUE_MAX_PER_GUILD', AI_QUEUE_MAX_PER_GUILD))
+
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max(1, max_queue)
+        self.max_per_guild = max(1, max_per_guild)
+        self._bucket = TokenBucket(max(rate_per_minute, 0.001) / 60, burst)
+        self._weights = {}
+        self._heap = []
+        self._queued = Counter()
+        self._guild_tags = {}
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+        self._running = set()
+        self._timer = None
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.peak_depth = 0
+        self._wait_times = deque(maxlen=TIMING_SAMPLES)
+        self._service_times = deque(maxlen=TIMING_SAMPLES)
+
+    def set_weight(self, guild_id: int, weight: float):
+        """Give a guild a larger (or smaller) share of review slots; the default is 1"""
+        self._weights[guild_id] = max(weight, 0.01)
+
+    def schedule(self, guild_id: int, review) -> VerificationJob:
+        """Queue `review` (a coroutine function) for guild_id.
+
+        Raises VerificationQueueFull instead of queueing without bound. The
+        job may already be running on return; position() tells the caller
+        whether it is waiting.
+        """
+        if len(self._heap) >= self.max_queue or self._queued[guild_id] >= self.max_per_guild:
+            self.rejected += 1
+            logger.warning(f"Verification queue full | Guild: {guild_id} | Depth: {len(self._heap)} | "
+                           f"Guild depth: {self._queued[guild_id]}")
+            raise VerificationQueueFull(guild_id)
+
+        tag = max(self._virtual_time, self._guild_tags.get(guild_id, 0.0)) + 1 / self._weights.get(guild_id, 1.0)
+        self._guild_tags[guild_id] = tag
+        job = VerificationJob(guild_id, review, tag, next(self._seq))
+        heapq.heappush(self._heap, job)
+        self._queued[guild_id] += 1
+        self.submitted += 1
+        self.peak_depth = max(self.peak_depth, len(self._heap))
+        self._dispatch()
+        return job
+
+    def position(self, job: VerificationJob) -> int:
+        """1-based place of a waiting job in the queue, or 0 once it has started"""
+        if job.started:
+            return 0
+        return 1 + sum(1 for queued in self._heap if queued < job)
+
+    def _dispatch(self):
+        while self._heap and len(self._running) < self.concurrency:
+            if not self._bucket.try_take():
+                # Out of quota: try again when the next token is due
+                if self._timer is None:
+                    self._timer = asyncio.get_running_loop().call_later(self._bucket.delay(), self._on_timer)
+                return
+            job = heapq.heappop(self._heap)
+            self._virtual_time = job.tag
+            self._queued[job.guild_id] -= 1
+            if not self._queued[job.guild_id]:
+                del self._queued[job.guild_id]
+                if self._guild_tags.get(job.guild_id, 0.0) <= self._virtual_time:
+                    del self._guild_tags[job.guild_id]
+            job.started_at = time.perf_counter()
+            self._wait_times.append(job.started_at - job.enqueued_at)
+            task = asyncio.create_task(self._run(job))
+            self._running.add(task)
+            task.add_done_callback(self._on_done)
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+    def _on_done(self, task):
+        self._running.discard(task)
+        self._dispatch()
+
+    async def _run(self, job: VerificationJob):
+        try:
+            result = await job.review()
+        except asyncio.CancelledError:
+            job.result.cancel()
+            raise
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Verification job failed | Guild: {job.guild_id} | Error: {str(e)[:150]}")
+            if not job.result.done():
+                job.result.set_exception(e)
+            return
+        finally:
+            service = time.perf_counter() - job.started_at
+            self._service_times.append(service)
+        self.completed += 1
+        if not job.result.done():
+            job.result.set_result(result)
+        logger.info(f"Verification job done | Guild: {job.guild_id} | "
+                    f"Waited: {(job.started_at - job.enqueued_at) * 1000:.0f}ms | Service: {service * 1000:.0f}ms | "
+                    f"Queue depth: {len(self._heap)}")
+
+    def get_stats(self) -> dict:
+        """Queue depth, counters and wait/service time percentiles (ms) of recent jobs"""
+        def percentiles(samples):
+            ordered = sorted(samples)
+            if not ordered:
+                return {'p50': 0.0, 'p99': 0.0, 'max': 0.0}
+            return {
+                'p50': ordered[len(ordered) // 2] * 1000,
+                'p99': ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+                'max': ordered[-1] * 1000,
+            }
+
+        return {
+            'queue_depth': len(self._heap),
+            'peak_depth': self.peak_depth,
+            'running': len(self._running),
+            'queued_by_guild': dict(self._queued),
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'wait_ms': percentiles(self._wait_times),
+            'service_ms': percentiles(self._service_times),
+        }
+
+    async def close(self):
+        """Cancel waiting and running reviews"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for job in self._heap:
+            job.result.cancel()
+        self._heap.clear()
+        self._queued.clear()
+        running = list(self._running)
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        self.log_stats("VerificationScheduler closed")
+
+    def log_stats(self, label: str = "Verification queue stats") -> dict:
+        """Log a one-line summary of get_stats() and return the stats"""
+        stats = self.get_stats()
+        logger.info(f"{label} | Depth: {stats['queue_depth']} | Running: {stats['running']} | "
+                    f"Completed: {stats['completed']} | Failed: {stats['failed']} | "
+                    f"Rejected: {stats['rejected']} | Peak depth: {stats['peak_depth']} | "
+                    f"Wait p50/p99: {stats['wait_ms']['p50']:.0f}/{stats['wait_ms']['p99']:.0f}ms | "
+                    f"Service p50/p99: {stats['service_ms']['p50']:.0f}/{stats['service_ms']['p99']:.0f}ms")
+        return stats
@@ -0,0 +1,172 @@
+import re
+from datetime import date, datetime, timedelta
+from utils.constants import WEEKLY_XP_RETENTION_WEEKS
+from utils.logger import get_logger
+
+logger = get_logger("weekly_xp")
+
+# Weeks are numbered from the ISO week starting Monday 1970-01-05
+EPOCH_MONDAY = date(1970, 1, 5)
+
+ISO_WEEK_KEY = re.compile(r'^(\d{4})-W(\d{1,2})$')
+LEGACY_WEEK_KEY = re.compile(r'^week_(\d{1,2})$')
+
+
+def new_weeks() -> dict:
+    """Empty per-user weekly record.
+
+    {'start': week index of xp[0], 'xp': [...]} holds the last
+    WEEKLY_XP_RETENTION_WEEKS weeks; 'since' and 'active' (hex bitmask, bit 0 =
+    week 'since') mark every week the user ever earned XP, so streaks outlive
+    the window. Older XP is summed per month in 'monthly_xp' on the user.
+    """
+    return {'start': None, 'xp': [], 'since': None, 'active': '0'}
+
+
+def _iso_week_index(year: int, week: int) -> int:
+    try:
+        monday = date.fromisocalendar(year, week, 1)
+    except ValueError:
+        # week 53 in a 52-week year
+        monday = date.fromisocalendar(year, 52, 1)
+    return (monday - EPOCH_MONDAY).days // 7
+
+
+def week_index(week_key: str, now: datetime = None) -> int:
+    """Absolute week number of 'YYYY-Www' or a legacy 'week_N' key.
+
+    Legacy keys carry no year: they mean the most recent week N that is not
+    after `now`'s week. Unrecognised keys count as `now`'s week.
+    """
+    now = now or datetime.now()
+    match = ISO_WEEK_KEY.match(week_key)
+    if match:
+        return _iso_week_index(int(match.group(1)), int(match.group(2)))
+
+    current_year, current_week, _ = now.isocalendar()
+    match = LEGACY_WEEK_KEY.match(week_key)
+    if match:
+        week = int(match.group(1))
+        return _iso_week_index(current_year if week <= current_week else current_year - 1, week)
+
+    logger.warning(f"Unrecognised week key '{week_key}', using the current week")
+    return _iso_week_index(current_year, current_week)
+
+
+def format_week(index: int) -> str:
+    year, week, _ = (EPOCH_MONDAY + timedelta(weeks=index)).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def current_week_index(now: datetime = None) -> int:
+    year, week, _ = (now or datetime.now()).isocalendar()
+    return _iso_week_index(year, week)
+
+
+def _month_key(index: int) -> str:
+    # An ISO week belongs to the month holding its Thursday
+    thursday = EPOCH_MONDAY + timedelta(weeks=index, days=3)
+    return f"{thursday.year}-{thursday.month:02d}"
+
+
+def _roll_up(user: dict, index: int, amount: int):
+    if amount:
+        monthly = user.setdefault('monthly_xp', {})
+        month = _month_key(index)
+        monthly[month] = monthly.get(month, 0) + amount
+
+
+def add_week_xp(user: dict, index: int, amount: int, retention: int = WEEKLY_XP_RETENTION_WEEKS):
+    """Add amount to week index and mark the week active"""
+    weeks = user.setdefault('weeks', new_weeks())
+
+    since = weeks['since']
+    active = int(weeks['active'], 16)
+    if since is None:
+        since = index
+    elif index < since:
+        active <<= since - index
+        since = index
+    weeks['since'] = since
+    weeks['active'] = format(active | (1 << (index - since)), 'x')
+
+    xp = weeks['xp']
+    start = weeks['start']
+    if not xp:
+        start, xp = index, [0]
+    newest = max(index, start + len(xp) - 1)
+    if index <= newest - retention:
+        # Already outside the window
+        _roll_up(user, index, amount)
+        return
+    if index < start:
+        xp[:0] = [0] * (start - index)
+        start = index
+    elif index >= start + len(xp):
+        xp.extend([0] * (index - start - len(xp) + 1))
+    xp[index - start] += amount
+
+    # Fold weeks that left the window into their months; the window always
+    # starts at a week with XP so the layout does not depend on arrival order
+    drop = max(0, len(xp) - retention)
+    while drop < len(xp) - 1 and not xp[drop]:
+        drop += 1
+    for offset in range(drop):
+        _roll_up(user, start + offset, xp[offset])
+    weeks['start'], weeks['xp'] = start + drop, xp[drop:]
+
+
+def weekly_totals(user: dict) -> dict:
+    """{'YYYY-Www': xp} for the weeks still in the window"""
+    weeks = user.get('weeks') or new_weeks()
+    return {format_week(weeks['start'] + offset): xp for offset, xp in enumerate(weeks['xp']) if xp}
+
+
+def active_weeks(user: dict) -> list:
+    """Indexes of every week with XP, including rolled-up ones"""
+    weeks = user.get('weeks') or new_weeks()
+    active = int(weeks['active'], 16)
+    return [weeks['since'] + bit for bit in range(active.bit_length()) if active >> bit & 1]
+
+
+def weeks_participated(user: dict) -> int:
+    weeks = user.get('weeks') or new_weeks()
+    return bin(int(weeks['active'], 16)).count('1')
+
+
+def current_streak(user: dict, now: datetime = None) -> int:
+    """Consecutive active weeks ending this week, or last week while this one has no XP yet"""
+    weeks = user.get('weeks') or new_weeks()
+    if weeks['since'] is None:
+        return 0
+    active = int(weeks['active'], 16)
+    end = current_week_index(now) - weeks['since']
+    if end >= 0 and not active >> end & 1:
+        end -= 1
+    if end < 0 or not active >> end & 1:
+        return 0
+    # Highest inactive bit at or below `end` bounds the run
+    gaps = ~active & ((1 << (end + 1)) - 1)
+    return end + 1 - gaps.bit_length()
+
+
+def longest_streak(user: dict) -> int:
+    weeks = user.get('weeks') or new_weeks()
+    active = int(weeks['active'], 16)
+    length = 0
+    while active:
+        # Each step shortens every run of ones by one
+        active &= active >> 1
+        length += 1
+    return length
+
+
+def migrate_weekly_xp(user: dict, now: datetime = None) -> bool:
+    """Convert a legacy {'week_N': xp} dict in place; returns True if anything changed"""
+    legacy = user.pop('weekly_xp', None)
+    if legacy is None:
+        return False
+    user.setdefault('weeks', new_weeks())
+    for key, amount in legacy.items():
+        add_week_xp(user, week_index(key, now), amount)
+    return True
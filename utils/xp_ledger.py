@@ -0,0 +1,106 @@
+import json
+import os
+from datetime import datetime
+from utils.logger import get_logger
+
+logger = get_logger("xp_ledger")
+
+
+class XPLedger:
+    """Append-only JSONL log of XP grants, removals and badge awards for one guild.
+
+    Each event gets a monotonically increasing ``seq``. Lines are written to the
+    OS immediately and fsynced every ``fsync_batch`` events; ``rotate()`` moves
+    the current segment aside once a snapshot covers it, keeping it as an audit
+    trail while startup only replays the live tail.
+    """
+
+    def __init__(self, path: str, fsync_batch: int = 16):
+        self.path = path
+        self.fsync_batch = fsync_batch
+        self.last_seq = 0
+        self.count = 0
+        self._unsynced = 0
+        self._file = None
+
+    def read_since(self, seq: int):
+        """Yield events newer than seq from the live segment, tracking last_seq/count"""
+        self.count = 0
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from a crash mid-append
+                    logger.warning(f"Skipping unreadable ledger line | File: {self.path} | Line: {line_no}")
+                    continue
+                self.count += 1
+                self.last_seq = max(self.last_seq, event['seq'])
+                if event['seq'] > seq:
+                    yield event
+
+    def append(self, event: dict) -> dict:
+        return self.append_many([event])[0]
+
+    def append_many(self, events: list) -> list:
+        """Append events with a single write; returns them with seq/ts filled in"""
+        ts = datetime.now().isoformat(timespec='seconds')
+        stamped = []
+        for event in events:
+            self.last_seq += 1
+            stamped.append({'seq': self.last_seq, 'ts': ts, **event})
+
+        if self._file is None:
+            self._drop_torn_tail()
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(''.join(json.dumps(e, separators=(',', ':')) + '\n' for e in stamped))
+        self._file.flush()
+        self.count += len(stamped)
+        self._unsynced += len(stamped)
+        if self._unsynced >= self.fsync_batch:
+            self.sync()
+        return stamped
+
+    def _drop_torn_tail(self):
+        """Cut a partial last line left by a crash mid-append, so the next event starts on a line of its own"""
+        try:
+            f = open(self.path, 'rb+')
+        except FileNotFoundError:
+            return
+        with f:
+            end = pos = f.seek(0, os.SEEK_END)
+            while pos > 0:
+                step = min(4096, pos)
+                f.seek(pos - step)
+                newline = f.read(step).rfind(b'\n')
+                if newline != -1:
+                    pos = pos - step + newline + 1
+                    break
+                pos -= step
+            if pos != end:
+                f.truncate(pos)
+                logger.warning(f"Dropped torn ledger tail | File: {self.path} | Bytes: {end - pos}")
+
+    def sync(self):
+        if self._file is not None and self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def rotate(self):
+        """Archive the live segment (already captured by a snapshot) and start a new one"""
+        self.close()
+        if self.count and os.path.exists(self.path):
+            base, ext = os.path.splitext(self.path)
+            os.replace(self.path, f"{base}.{self.last_seq:010d}{ext}")
+        self.count = 0
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None